@@ -5,9 +5,20 @@
 
 HOST_ID = "127.0.0.1"
 PORT = 4400
+RECEIVER_BUFFER_SIZE = 65535        # max datagram size, batched datagrams exceed the old 4096 bytes
+TCP_RECEIVE_BUFFER_SIZE = 1 << 20   # reusable stream buffer of CSITCPReceiver
 BUFFER_SIZE = 1024
 THRESHOLD_VALUE = 100
 THRESHOLD_DISABLED = -1
+DETECTOR = "threshold"              # or "adaptive": per-subcarrier baseline and hysteresis (csi_motion_detector.py)
+DETECTOR_ON_SCORE = 3.0             # normalized score starting a motion candidate, about 1 on an empty room
+DETECTOR_OFF_SCORE = 2.0            # score under which an episode starts to end
+DETECTOR_MIN_DURATION = 0.3         # seconds above DETECTOR_OFF_SCORE before an episode is reported
+DETECTOR_HOLD = 0.5                 # seconds below DETECTOR_OFF_SCORE that end a candidate or an episode
+DETECTOR_BASELINE_FRAMES = 3000     # effective frame count of the baseline statistics
+DETECTOR_WARMUP_FRAMES = 200        # frames learned before the first detection
+DETECTOR_MAX_EPISODE = 60.0         # seconds, a longer episode is a lasting change of the room: it ends and the
+                                    # baseline is learned again, 0 disables
 MA_WINDOW = 5
 SUBCARRIER = 32
 SUBCARRIER_RANGE = (28, 36)
@@ -15,17 +26,127 @@ SOURCE_DEVICE = "RPi4"  # or "ASUS"
 CHANNEL = "44"
 BANDWIDTH = "80"
 AP_MAC = "24:4B:FE:E6:C0:64"
-PING_FREQUENCY = 0.01
+PING_RATE_HZ = 100                  # probe frames per second towards the AP, 100 to 2000
+PING_PAYLOAD_SIZE = 32              # bytes
+PING_UDP_PORT = 9                   # discard port, used when ICMP datagram sockets are not allowed
+PING_BUSY_WAIT_US = 150             # the generator spins only this long before each deadline
+
+# Resampling macros
+RESAMPLE_RATE_HZ = 100              # uniform grid of the processors, 0 processes frames as they arrive
+RESAMPLE_METHOD = "linear"          # or "nearest"
+RESAMPLE_MAX_GAP = 0.05             # seconds between frames beyond which grid points count as filled
+RESAMPLE_RESTART_GAP = 2.0          # seconds, larger jumps restart the grid instead of filling it
+RESAMPLE_SEQ_MODULO = 4096          # 802.11 sequence numbers are 12 bits
+
+# Decimation macros
+DECIMATE_RATE_HZ = 0                # e.g. 50, anti-aliased rate of the processors after the resampler, 0 disables
+DECIMATE_TAPS = 16                  # filter taps per sample of the slower side (input or output)
+DECIMATE_MAX_DENOMINATOR = 16       # rational factor up / down approximating DECIMATE_RATE_HZ / RESAMPLE_RATE_HZ
+                                    # within 1 %, otherwise an integer stage runs first (csi_decimator.py)
+
+# Doppler macros
+PROCESSING_METHOD = "magnitude"     # "phase" (RPi4, or ASUS CSI ratio, csi_phase_processor.py), "doppler"
+                                    # (RPi4, csi_doppler_processor.py with a spectrogram dock) or "breathing"
+                                    # (csi_breathing_processor.py)
+DOPPLER_WINDOW = 256                # STFT window in samples of the resampled (and decimated) grid
+DOPPLER_HOP = 32                    # samples between STFT frames, overlap is DOPPLER_WINDOW - DOPPLER_HOP
+DOPPLER_MAX_VELOCITY = 2.0          # m/s, velocity range kept in the spectrum
+DOPPLER_STATIC_VELOCITY = 0.1       # m/s, slower bins count as static in the motion share
+DOPPLER_THRESHOLD = 20              # motion share in % raising threshold_exceeded, until the slider sends a value
+SPECTROGRAM_HISTORY = 600           # STFT frames shown
+SPECTROGRAM_DYNAMIC_RANGE = 40      # dB below the running peak mapped to the color scale
+SPECTROGRAM_REFRESH_MS = 100
+
+# Breathing macros
+BREATHING_RATE_HZ = 10              # decimated rate of the sliding DFT bank
+BREATHING_WINDOW = 30.0             # seconds of signal per estimate, 1 / BREATHING_WINDOW Hz resolution
+BREATHING_MIN_HZ = 0.1              # band of the bank, 6 to 120 breaths per minute
+BREATHING_MAX_HZ = 2.0
+BREATHING_BINS = 96                 # filters spread evenly over the band
+BREATHING_MIN_CONFIDENCE = 0.3      # share of the band power in the peak below which no alert is raised
+
+# PCA macros
+PCA_COMPONENTS = 0                  # top components of the RPi4 magnitude stream used as motion signal, 0 disables
+PCA_FORGET = 0.995                  # per frame weight of the past in the covariance, about 200 frames of memory
+PCA_ITERATIONS = 1                  # subspace iterations per batch
+
+# Calibration macros
+CALIBRATION_DIR = "./calibration"   # one profile per processor, device, channel, bandwidth and AP MAC
+CALIBRATION_SECONDS = 10            # static capture recorded by the Calibrate button, keep the room empty
+CALIBRATION_NOISY_FACTOR = 3.0      # subcarriers varying more than this times the median one are masked
+CALIBRATION_THRESHOLD_SIGMA = 5.0   # profile threshold, chart value mean plus this many standard deviations
+
+# Logging macros
+LOG_LEVEL = "info"                  # debug, info, warning or failure
+LOG_RING_SIZE = 8192
+LOG_RATE_LIMIT = 20                 # records per call site per window
+LOG_RATE_WINDOW = 1.0               # seconds
+LOG_FLUSH_INTERVAL = 0.1            # seconds between writer flushes
+LOG_CONSOLE_INTERVAL = 200          # ms between console appends
+LOG_CONSOLE_MAX_LINES = 1000
+LOG_FILE = None                     # e.g. "./logs/csi_app.log" to enable the rotating file sink
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUPS = 3
+
+# Profiling macros
+PROFILE_DIR = "./profiles"
+PROFILE_SAMPLE_INTERVAL = 0.005    # seconds between stack samples
+PROFILE_TRACEMALLOC_FRAMES = 1
+PROFILE_MEMORY_TOP = 50
+
+# SSH macros
+SSH_CONNECT_TIMEOUT = 10            # seconds
+SSH_COMMAND_TIMEOUT = 30            # seconds before a remote command is abandoned
+SSH_EXECUTOR_WORKERS = 1            # per device, one worker keeps control actions in button order
+SSH_KEEPALIVE_INTERVAL = 15         # seconds between keepalive packets on the device transport
+SSH_RECONNECT_MAX_BACKOFF = 30      # seconds, upper bound of the reconnect backoff
+SFTP_TRANSFER_WORKERS = 4           # files fetched at once
+SFTP_CHUNK_SIZE = 256 * 1024        # local read/write size
+SFTP_MAX_REQUESTS = 64              # pipelined sftp read requests per file
+ROUTER_TRANSFER_COMPRESS = True     # gzip pcaps on the router while pulling them
+
+# Sniffer fleet, leave empty for the single SOURCE_DEVICE setup
+# one entry per sniffer, each gets its own ingest port, receiver, parser, buffer and processor
+# RPi entries may override "transport", "mode" and "codec" (RPi_TRANSPORT, RPi_MODE, RPi_CODEC by default),
+# edge mode needs the udp transport
+# the first entry feeds the chart, all of them raise alerts and show in the fleet table
+# SNIFFERS = [
+#     {"name": "rpi-a", "type": "RPi4", "ip": "10.42.0.207", "username": "pi", "password": "raspberry", "port": 4400},
+#     {"name": "rpi-b", "type": "RPi4", "ip": "10.42.0.208", "username": "pi", "password": "raspberry", "port": 4410},
+#     {"name": "asus", "type": "ASUS", "ip": "192.168.50.1", "username": "admin", "password": "admin", "port": 4403},
+# ]
+SNIFFERS = []
 
 # RPi macros
 RPi_IP = "10.42.0.207"
 RPi_ID = "pi"
 RPi_PASSWORD = "raspberry"
+RPi_CONTROL_PORT = 4401             # forwarder control socket, local to the RPi
+RPi_TRANSPORT = "udp"               # or "tcp" for lossless length-prefixed streaming (CSITCPReceiver)
+RPi_BATCH_FRAMES = 16               # CSI frames per datagram, 0 forwards raw datagrams
+RPi_BATCH_DELAY_MS = 5              # max time a frame waits for its batch
+RPi_CODEC = False                   # compact codec on the RPi, parsed by RPI4CodecParser
+RPi_CODEC_FIRST = 0                 # first forwarded subcarrier
+RPi_CODEC_COUNT = 256               # number of forwarded subcarriers
+RPi_CODEC_DELTA = True
+RPi_CODEC_ZLIB = True
+RPi_MODE = "raw"                    # or "edge" to run the magnitude pipeline on the RPi (csi_edge.py)
+RPi_EDGE_PORT = 4402                # local port the forwarder tees raw datagrams to in edge mode
+RPi_EDGE_CONTROL_PORT = 4405        # local port of the edge runtime for threshold updates from the slider
+RPi_SYNC_PORT = 4404                # forwarder clock sync responder, capture times are mapped to the laptop clock
+CLOCK_SYNC_INTERVAL = 1.0           # seconds between sync requests once converged
+CLOCK_SYNC_WINDOW = 64              # samples kept for the offset/drift fit
 
 # Asus Router macros
 Router_IP = "192.168.50.1"
 Router_ID = "TPTPTPTP"
 Router_PASSWORD = "TPTPTPTP"
+ROUTER_LIVE = False                 # stream tcpdump output to the app instead of writing /tmp/stream
+ROUTER_LIVE_MODE = "ssh"            # or "tcp" (tcpdump piped into nc towards Laptop_IP)
+ROUTER_LIVE_PORT = 4403
+STREAM_READ_SIZE = 256 * 1024       # bytes per read of CSIStreamReceiver
+ROUTER_ANTENNAS = 3                 # antennas (cores) per transmission, frames missing one are dropped
+MIMO_REORDER_WINDOW = 16            # transmissions waiting for their remaining cores
 SSID5GHZ = "nope"
 KEY5GHZ = "nopenope"
 SSID24GHZ = "TPTPTPTP"
@@ -0,0 +1,67 @@
+# core/metrics.py
+# thread-safe registry of pipeline counters and gauges (frames, losses, rates, sniffer health)
+# producers call metrics.add("receiver.lost", n) or metrics.set("receiver.loss_pct", x) from any thread
+# main_window reads snapshot() on a timer to fill the status bar
+# instantiate once in main and pass the instance in constructors: def __init__(self, ..., metrics=None)
+# scoped("rpi-a") gives a sniffer pipeline the same interface with its keys prefixed by "rpi-a."
+
+import threading
+
+
+class Metrics:
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, delta=1):
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + delta
+
+    def set(self, name: str, value):
+        with self._lock:
+            self._values[name] = value
+
+    def update(self, values: dict):
+        with self._lock:
+            self._values.update(values)
+
+    def get(self, name: str, default=None):
+        with self._lock:
+            return self._values.get(name, default)
+
+    def snapshot(self, prefix: str = "") -> dict:
+        with self._lock:
+            return {k: v for k, v in self._values.items() if k.startswith(prefix)}
+
+    def reset(self, prefix: str = ""):
+        with self._lock:
+            for key in [k for k in self._values if k.startswith(prefix)]:
+                del self._values[key]
+
+    def scoped(self, prefix: str):
+        return ScopedMetrics(self, prefix)
+
+
+class ScopedMetrics:
+    def __init__(self, metrics, prefix):
+        self._metrics = metrics
+        self._prefix = prefix + "."
+
+    def add(self, name: str, delta=1):
+        self._metrics.add(self._prefix + name, delta)
+
+    def set(self, name: str, value):
+        self._metrics.set(self._prefix + name, value)
+
+    def update(self, values: dict):
+        self._metrics.update({self._prefix + k: v for k, v in values.items()})
+
+    def get(self, name: str, default=None):
+        return self._metrics.get(self._prefix + name, default)
+
+    def snapshot(self, prefix: str = "") -> dict:
+        size = len(self._prefix)
+        return {k[size:]: v for k, v in self._metrics.snapshot(self._prefix + prefix).items()}
+
+    def reset(self, prefix: str = ""):
+        self._metrics.reset(self._prefix + prefix)
@@ -0,0 +1,234 @@
+# core/profiler.py
+# on-demand profiling of every pipeline thread, toggled at runtime from the ui or SIGUSR1
+# cProfile only profiles the thread that enables it, so each thread calls checkpoint(name) in its loop
+# and starts/stops its own profile there, finish(name) dumps it when the thread exits
+# python 3.12+ allows one active cProfile at a time, threads that cannot enable theirs are covered by the
+# stack sampler only for that session
+# a sampling thread walks sys._current_frames() and accumulates flamegraph-compatible collapsed stacks
+# tracemalloc snapshots are taken at start, at stop and on demand (SIGUSR2), each one is diffed with the previous
+# tracemalloc is only stopped if this profiler started it
+# output is written to PROFILE_DIR/<session>/ as <thread>.pstats, stacks.collapsed and memory_<n>.txt
+# instantiate once in main and pass the instance to threads: def __init__(self, ..., profiler=None)
+# threads of a fleet sniffer get profiler.scoped(name), their names are prefixed like the scoped metrics
+# (<sniffer>.receiver.pstats, <sniffer>.parser;... in stacks.collapsed)
+
+import cProfile
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+import config.settings as Settings
+
+
+class Profiler:
+    def __init__(self, logger=None, output_dir=Settings.PROFILE_DIR,
+                 sample_interval=Settings.PROFILE_SAMPLE_INTERVAL):
+        self.logger = logger
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self.active = False
+        self.generation = 0
+        self.session_dir = None
+
+        self._local = threading.local()
+        self._thread_names = {}
+        self._lock = threading.Lock()
+        self._stacks = Counter()
+        self._sampler = None
+        self._sampler_stop = threading.Event()
+        self._snapshots = []
+        self._owns_tracemalloc = False
+
+    def toggle(self):
+        if self.active:
+            self.stop()
+        else:
+            self.start()
+
+    def start(self):
+        if self.active:
+            return
+        try:
+            session = datetime.now().strftime("%Y%m%d_%H%M%S")
+            self.session_dir = os.path.join(self.output_dir, session)
+            os.makedirs(self.session_dir, exist_ok=True)
+
+            with self._lock:
+                self._stacks.clear()
+            self._snapshots = []
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(Settings.PROFILE_TRACEMALLOC_FRAMES)
+                self._owns_tracemalloc = True
+            self._memory_snapshot()
+
+            self.generation += 1
+            self.active = True
+
+            self._sampler_stop.clear()
+            self._sampler = threading.Thread(target=self._sample_loop, name="profiler-sampler", daemon=True)
+            self._sampler.start()
+
+            if self.logger:
+                self.logger.success(__file__, f"<start>: profiling to {self.session_dir}")
+        except Exception as e:
+            self.active = False
+            if self.logger:
+                self.logger.failure(__file__, f"<start>: {e}")
+
+    def stop(self):
+        if not self.active:
+            return
+        self.active = False
+        try:
+            self._sampler_stop.set()
+            if self._sampler:
+                self._sampler.join(1.0)
+                self._sampler = None
+            self._write_collapsed_stacks()
+
+            self._memory_snapshot()
+            self._snapshots = []
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+                self._owns_tracemalloc = False
+
+            if self.logger:
+                self.logger.success(__file__, "<stop>: profiling stopped, per-thread stats are written on next checkpoint")
+        except Exception as e:
+            if self.logger:
+                self.logger.failure(__file__, f"<stop>: {e}")
+
+    def checkpoint(self, name: str):
+        # Hot path, called once per loop iteration by every profiled thread
+        profile = getattr(self._local, "profile", None)
+        if profile is None:
+            if self.active and getattr(self._local, "skipped", None) != self.generation:
+                self._begin_thread(name)
+            return
+        if not self.active or self._local.generation != self.generation:
+            self._end_thread(name)
+
+    def finish(self, name: str):
+        if getattr(self._local, "profile", None) is not None:
+            self._end_thread(name)
+
+    def scoped(self, prefix: str):
+        return ScopedProfiler(self, prefix)
+
+    def take_memory_snapshot(self):
+        # on demand, only while profiling
+        if not self.active:
+            return None
+        return self._memory_snapshot()
+
+    def _memory_snapshot(self):
+        if not tracemalloc.is_tracing() or self.session_dir is None:
+            return None
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        self._snapshots.append(snapshot)
+        if len(self._snapshots) > 1:
+            self._write_memory_diff(self._snapshots[-2], snapshot, len(self._snapshots) - 1)
+        return snapshot
+
+    def _begin_thread(self, name):
+        with self._lock:
+            self._thread_names[threading.get_ident()] = name
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # another thread holds the only profiler slot
+            self._local.skipped = self.generation
+            if self.logger:
+                self.logger.warning(__file__, f"<_begin_thread>: {name} profiled by stack sampling only")
+            return
+        self._local.profile = profile
+        self._local.generation = self.generation
+        self._local.session_dir = self.session_dir
+
+    def _end_thread(self, name):
+        profile = self._local.profile
+        profile.disable()
+        self._local.profile = None
+        try:
+            path = os.path.join(self._local.session_dir, f"{name}.pstats")
+            profile.dump_stats(path)
+            if self.logger:
+                self.logger.success(__file__, f"<_end_thread>: {name} stats written to {path}")
+        except Exception as e:
+            if self.logger:
+                self.logger.failure(__file__, f"<_end_thread>: {name} - {e}")
+
+    def _sample_loop(self):
+        own_ident = threading.get_ident()
+        main_ident = threading.main_thread().ident
+        next_sample = time.perf_counter()
+
+        while not self._sampler_stop.is_set():
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, frame in frames.items():
+                    if ident == own_ident:
+                        continue
+                    if ident == main_ident:
+                        thread_name = "main"
+                    else:
+                        thread_name = self._thread_names.get(ident, f"thread-{ident}")
+                    self._stacks[self._collapse(thread_name, frame)] += 1
+            del frames
+
+            next_sample += self.sample_interval
+            delay = next_sample - time.perf_counter()
+            if delay > 0:
+                self._sampler_stop.wait(delay)
+            else:
+                next_sample = time.perf_counter()
+
+    def _collapse(self, thread_name, frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        names.append(thread_name)
+        names.reverse()
+        return ";".join(names)
+
+    def _write_collapsed_stacks(self):
+        path = os.path.join(self.session_dir, "stacks.collapsed")
+        with self._lock:
+            lines = [f"{stack} {count}\n" for stack, count in self._stacks.most_common()]
+            self._stacks.clear()
+        with open(path, "w") as f:
+            f.writelines(lines)
+        if self.logger:
+            self.logger.success(__file__, f"<_write_collapsed_stacks>: {len(lines)} stacks written to {path}")
+
+    def _write_memory_diff(self, old, new, index):
+        path = os.path.join(self.session_dir, f"memory_{index}.txt")
+        stats = new.compare_to(old, "lineno")
+        total = sum(stat.size_diff for stat in stats)
+        with open(path, "w") as f:
+            f.write(f"total size diff: {total / 1024:.1f} KiB\n")
+            for stat in stats[:Settings.PROFILE_MEMORY_TOP]:
+                f.write(f"{stat}\n")
+        if self.logger:
+            self.logger.success(__file__, f"<_write_memory_diff>: {total / 1024:+.1f} KiB, written to {path}")
+
+
+class ScopedProfiler:
+    def __init__(self, profiler, prefix):
+        self._profiler = profiler
+        self._prefix = prefix + "."
+
+    def checkpoint(self, name: str):
+        self._profiler.checkpoint(self._prefix + name)
+
+    def finish(self, name: str):
+        self._profiler.finish(self._prefix + name)
@@ -9,9 +9,12 @@ class Signals(QObject):
     # Data Signals
     csi_data = pyqtSignal(bytes, float)             # From receiver to parser
     fft_data = pyqtSignal(dict)                     # From processor to chart_view
+    doppler_data = pyqtSignal(dict)                 # From doppler processor to spectrogram_view
 
     # Alert & Status Signals 
     threshold_exceeded = pyqtSignal(str)            # From processor to main_window
+    motion_event = pyqtSignal(dict)                 # From processor to main_window, start and end of an episode
+    calibration = pyqtSignal(dict)                  # From processor to main_window, profile applied
 
     # Configuration Signals 
     threshold_value = pyqtSignal(float)             # From main_window to processor
@@ -22,6 +25,8 @@ class Signals(QObject):
     # Control Signals
     start_app = pyqtSignal()                        # From UI to main
     stop_app = pyqtSignal()                         # From UI to main
+    toggle_profiling = pyqtSignal()                 # From UI to profiler
+    calibrate = pyqtSignal()                        # From UI to processor
 
     # Remote SSH Signals
     toggle_ping = pyqtSignal()                      # From UI to laptop
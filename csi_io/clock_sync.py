@@ -0,0 +1,116 @@
+# csi_io/clock_sync.py
+# NTP-style offset and drift estimation between a sniffer and the laptop
+# requests go to the sync responder of csi_forwarder_tee.py (--sync-port), see the format there
+# per exchange: offset = ((t2 - t1) + (t3 - t4)) / 2, delay = (t4 - t1) - (t3 - t2)
+# queueing only ever adds delay, so the fit uses the lowest-delay quarter of the window:
+# least squares of offset against time gives the offset at a reference time and the drift
+# to_local() maps a capture timestamp of the sniffer to the laptop clock, receivers call it per frame
+# until the first fit the offset comes from the arrival time of the first mapped frame, so the parsers anchor
+# their start_time on the laptop clock and only see a network delay sized step when the model appears
+# publishes clock.offset_ms, clock.drift_ppm and clock.delay_ms to metrics
+
+import socket
+import struct
+import time
+from collections import deque
+import numpy as np
+from PyQt5.QtCore import QThread
+from config.settings import CLOCK_SYNC_INTERVAL, CLOCK_SYNC_WINDOW
+
+
+class ClockSync(QThread):
+    SYNC_MAGIC = b"CS"
+    SYNC_VERSION = 1
+    SYNC_REQUEST = struct.Struct("<2sBBId")
+    SYNC_REPLY = struct.Struct("<2sBBIddd")
+
+    BURST_SAMPLES = 8
+    BURST_INTERVAL = 0.05
+
+    def __init__(self, ip, port, logger, stop_event, metrics=None, interval=CLOCK_SYNC_INTERVAL, window=CLOCK_SYNC_WINDOW):
+        super().__init__()
+        self.address = (ip, port)
+        self.logger = logger
+        self.stop_event = stop_event
+        self.metrics = metrics
+        self.interval = interval
+
+        self.samples = deque(maxlen=window)
+        self.request_id = 0
+        self.model = None           # (offset at reference, drift, reference time), replaced as one tuple
+        self.arrival_offset = None  # remote minus laptop time of the first frame mapped before the first fit
+
+    def run(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.settimeout(0.5)
+        self.samples.clear()
+        if self.logger:
+            self.logger.success(__file__, f"<run>: clock sync with {self.address[0]}:{self.address[1]}")
+
+        try:
+            while not self.stop_event.is_set():
+                if self._exchange(sock):
+                    self._fit()
+                burst = len(self.samples) < self.BURST_SAMPLES
+                self.msleep(int(1000 * (self.BURST_INTERVAL if burst else self.interval)))
+        except Exception as e:
+            if self.logger:
+                self.logger.failure(__file__, f"<run>: {e}")
+        finally:
+            sock.close()
+
+    def _exchange(self, sock):
+        self.request_id = (self.request_id + 1) & 0xFFFFFFFF
+        t1 = time.time()
+        try:
+            sock.sendto(self.SYNC_REQUEST.pack(self.SYNC_MAGIC, self.SYNC_VERSION, 0, self.request_id, t1), self.address)
+            while True:
+                data = sock.recv(64)
+                t4 = time.time()
+                if len(data) != self.SYNC_REPLY.size:
+                    continue
+                _, version, _, request_id, sent, t2, t3 = self.SYNC_REPLY.unpack(data)
+                # replies to timed out requests arrive late, only the current one counts
+                if request_id == self.request_id and sent == t1:
+                    break
+        except (socket.timeout, OSError):
+            return False
+
+        offset = ((t2 - t1) + (t3 - t4)) / 2
+        delay = (t4 - t1) - (t3 - t2)
+        self.samples.append(((t1 + t4) / 2, offset, delay))
+        return True
+
+    def _fit(self):
+        samples = np.array(self.samples)
+        times, offsets, delays = samples[:, 0], samples[:, 1], samples[:, 2]
+        keep = max(3, len(samples) // 4)
+        best = np.argsort(delays)[:keep]
+        reference = times[-1]
+
+        if len(best) >= 3 and np.ptp(times[best]) >= 5 * self.interval:
+            drift, offset = np.polyfit(times[best] - reference, offsets[best], 1)
+        else:
+            drift, offset = 0.0, float(offsets[best[0]])
+
+        self.model = (float(offset), float(drift), float(reference))
+
+        if self.metrics:
+            self.metrics.update({
+                "clock.offset_ms": round(1e3 * offset, 3),
+                "clock.drift_ppm": round(1e6 * drift, 2),
+                "clock.delay_ms": round(1e3 * float(delays[best[0]]), 3),
+            })
+
+    def to_local(self, remote_time: float) -> float:
+        model = self.model
+        if model is None:
+            if self.arrival_offset is None:
+                self.arrival_offset = remote_time - time.time()
+            return remote_time - self.arrival_offset
+        offset, drift, reference = model
+        # drift is fitted against laptop time, remote_time - offset is close enough to evaluate it
+        return remote_time - offset - drift * (remote_time - offset - reference)
+
+    def is_synced(self) -> bool:
+        return self.model is not None
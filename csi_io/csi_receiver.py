@@ -1,60 +1,94 @@
 # csi_io/csi_receiver.py
 # UDP receiver for CSI data packets from Raspberry Pi (protobuf format)
 # receives raw bytes and emits signal to parser
+# batched datagrams (see csi_io/csi_transport.py) are unpacked into frames stamped with the RPi capture time
+# transport losses are counted from the batch sequence numbers and published to metrics
+# with a ClockSync, capture timestamps of the sniffer are mapped to the laptop clock
+# sniffer telemetry records (see csi_io/csi_telemetry.py) go to metrics instead of the parser
 # logs connection status using logger instance
 
 import socket
+import struct
 import time
 from PyQt5.QtCore import QThread
-from config.settings import PORT
+from config.settings import PORT, RECEIVER_BUFFER_SIZE
+from csi_io.csi_transport import BatchDecoder, is_batch
+from csi_io.csi_telemetry import TelemetryDecoder, is_telemetry
 
 
 class CSIReceiver(QThread):
-    def __init__(self, signals, logger, stop_event):
+    def __init__(self, signals, logger, stop_event, profiler=None, metrics=None, port=PORT, clock=None):
         super().__init__()
+        self.clock = clock
+        self.port = port
+        self.packets = 0
+        self.bytes = 0
         self.signals = signals
         self.logger = logger
         self.stop_event = stop_event
+        self.profiler = profiler
+        self.metrics = metrics
         self.first_packet_logged = False
+        self.batch_decoder = BatchDecoder()
+        self.telemetry_decoder = TelemetryDecoder()
+        self.last_metrics_time = 0.0
 
     def run(self):
         if self.logger:
-            self.logger.success(__file__, f"<run>: starting UDP listener on port {PORT}")
+            self.logger.success(__file__, f"<run>: starting UDP listener on port {self.port}")
 
         try:
             sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            sock.bind(("0.0.0.0", PORT))
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+            sock.bind(("0.0.0.0", self.port))
             sock.settimeout(1.0)
 
             if self.logger:
-                self.logger.success(__file__, f"<run>: bound to 0.0.0.0:{PORT}")
+                self.logger.success(__file__, f"<run>: bound to 0.0.0.0:{self.port}")
 
             last_packet_time = None
             start_time = time.time()
+            self.batch_decoder.reset()
             last_no_data_log = start_time
 
             while not self.stop_event.is_set():
+                if self.profiler:
+                    self.profiler.checkpoint("receiver")
                 current_time = time.time()
                 
                 try:
-                    packet, addr = sock.recvfrom(4096)
+                    packet, addr = sock.recvfrom(RECEIVER_BUFFER_SIZE)
 
                     if packet:
+                        self.packets += 1
+                        self.bytes += len(packet)
                         if not self.first_packet_logged and self.logger:
                             self.logger.success(__file__, f"<run>: first packet received ({len(packet)} bytes) from {addr}")
                             self.first_packet_logged = True
 
-                        self.signals.csi_data.emit(packet, current_time)
+                        if is_batch(packet):
+                            self._emit_batch(packet)
+                        elif is_telemetry(packet):
+                            self.telemetry_decoder.publish(packet, self.metrics)
+                        else:
+                            self.signals.csi_data.emit(packet, current_time)
                         last_packet_time = current_time
 
                 except socket.timeout:
                     pass
+                except (ValueError, struct.error) as e:
+                    if self.logger:
+                        self.logger.failure(__file__, f"<run>: malformed batch - {e}")
                 except Exception as e:
                     if self.logger:
                         self.logger.failure(__file__, f"<run>: socket error - {e}")
                     break
 
+                if current_time - self.last_metrics_time >= 1.0:
+                    self._publish_metrics()
+                    self.last_metrics_time = current_time
+
                 if last_packet_time is None:
                     time_since_start = current_time - start_time
                     if time_since_start >= 5 and (current_time - last_no_data_log) >= 5:
@@ -69,10 +103,42 @@ class CSIReceiver(QThread):
                         last_no_data_log = current_time
 
             sock.close()
+            if self.profiler:
+                self.profiler.finish("receiver")
 
             if self.logger:
                 self.logger.success(__file__, "<run>: UDP listener stopped")
 
         except Exception as e:
             if self.logger:
-                self.logger.failure(__file__, f"<run>: fatal error - {e}")
\ No newline at end of file
+                self.logger.failure(__file__, f"<run>: fatal error - {e}")
+
+    def _emit_batch(self, packet):
+        lost_before = self.batch_decoder.lost
+        to_local = self.clock.to_local if self.clock else None
+        for frame, capture_time in self.batch_decoder.decode(packet):
+            if is_telemetry(frame):
+                self.telemetry_decoder.publish(frame, self.metrics)
+                continue
+            self.signals.csi_data.emit(frame, to_local(capture_time) if to_local else capture_time)
+
+        lost = self.batch_decoder.lost - lost_before
+        if lost and self.logger:
+            self.logger.failure(__file__, f"<_emit_batch>: {lost} datagrams lost (total {self.batch_decoder.lost})")
+
+    def _publish_metrics(self):
+        if not self.metrics:
+            return
+        self.metrics.update({
+            "receiver.packets": self.packets,
+            "receiver.mbytes": round(self.bytes / 1e6, 2),
+        })
+        if not self.batch_decoder.datagrams:
+            return
+        self.metrics.update({
+            "receiver.datagrams": self.batch_decoder.datagrams,
+            "receiver.frames": self.batch_decoder.frames,
+            "receiver.lost": self.batch_decoder.lost,
+            "receiver.late": self.batch_decoder.late,
+            "receiver.loss_pct": round(100.0 * self.batch_decoder.loss_ratio(), 2),
+        })
@@ -0,0 +1,126 @@
+# csi_io/csi_record_reader.py
+# streaming reader for framed CSI recordings written by nexmon_rpi/csi_forwarder_tee.py
+# file layout: header <4sHHd> (magic "CSIR", version, flags, start time)
+# then records <IdI> (payload length, capture timestamp, seq) followed by the raw protobuf payload
+# reads the file in large chunks and yields RecordBatch objects of at most batch_size records, the next chunk is
+# only read once fewer than batch_size complete records are pending, so memory stays around one chunk
+# timestamps, seqs, offsets and lengths are NumPy arrays, payloads are views into one uint8 array
+# usage: for batch in CSIRecordReader(path): parser.on_new_data(batch.payload(i), batch.timestamps[i])
+
+import struct
+from collections import namedtuple
+import numpy as np
+
+
+class RecordBatch(namedtuple("RecordBatch", ["timestamps", "seqs", "offsets", "lengths", "data"])):
+    __slots__ = ()
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def payload(self, index: int) -> bytes:
+        start = self.offsets[index]
+        return self.data[start:start + self.lengths[index]].tobytes()
+
+    def payloads(self):
+        return [self.payload(i) for i in range(len(self.timestamps))]
+
+
+class CSIRecordReader:
+    MAGIC = b"CSIR"
+    VERSION = 1
+    FILE_HEADER = struct.Struct("<4sHHd")
+    RECORD_HEADER = struct.Struct("<IdI")
+
+    def __init__(self, path: str, batch_size: int = 1024, chunk_size: int = 1 << 20):
+        self.path = path
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.start_time = 0.0
+        self.version = 0
+
+    def __iter__(self):
+        with open(self.path, 'rb') as f:
+            self._read_header(f)
+            pending = bytearray()
+            eof = False
+
+            while True:
+                batch, consumed = self._split_records(pending)
+                if batch is not None:
+                    del pending[:consumed]
+                    yield batch
+                    if eof or len(batch) == self.batch_size:
+                        # more complete records may be pending, read only once they run short
+                        continue
+                elif eof:
+                    # trailing bytes of a record cut by a crash or an unclean stop
+                    break
+
+                chunk = f.read(self.chunk_size)
+                if chunk:
+                    pending += chunk
+                else:
+                    eof = True
+
+    def read_all(self):
+        batches = list(self)
+        if not batches:
+            return RecordBatch(np.empty(0), np.empty(0, dtype=np.uint32),
+                               np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64),
+                               np.empty(0, dtype=np.uint8))
+        data_parts = []
+        offsets = []
+        base = 0
+        for batch in batches:
+            data_parts.append(batch.data)
+            offsets.append(batch.offsets + base)
+            base += len(batch.data)
+        return RecordBatch(np.concatenate([b.timestamps for b in batches]),
+                           np.concatenate([b.seqs for b in batches]),
+                           np.concatenate(offsets),
+                           np.concatenate([b.lengths for b in batches]),
+                           np.concatenate(data_parts))
+
+    def _read_header(self, f):
+        header = f.read(self.FILE_HEADER.size)
+        if len(header) < self.FILE_HEADER.size:
+            raise ValueError(f"{self.path}: file too short for a CSI recording header")
+        magic, version, _, start_time = self.FILE_HEADER.unpack(header)
+        if magic != self.MAGIC:
+            raise ValueError(f"{self.path}: not a framed CSI recording (magic={magic!r})")
+        if version != self.VERSION:
+            raise ValueError(f"{self.path}: unsupported recording version {version}")
+        self.version = version
+        self.start_time = start_time
+
+    def _split_records(self, pending):
+        header_size = self.RECORD_HEADER.size
+        unpack_from = self.RECORD_HEADER.unpack_from
+        available = len(pending)
+
+        timestamps = []
+        seqs = []
+        offsets = []
+        lengths = []
+        pos = 0
+        while len(timestamps) < self.batch_size and pos + header_size <= available:
+            length, timestamp, seq = unpack_from(pending, pos)
+            if pos + header_size + length > available:
+                break
+            timestamps.append(timestamp)
+            seqs.append(seq)
+            offsets.append(pos + header_size)
+            lengths.append(length)
+            pos += header_size + length
+
+        if not timestamps:
+            return None, 0
+
+        data = np.frombuffer(bytes(pending[:pos]), dtype=np.uint8)
+        batch = RecordBatch(np.array(timestamps, dtype=np.float64),
+                            np.array(seqs, dtype=np.uint32),
+                            np.array(offsets, dtype=np.int64),
+                            np.array(lengths, dtype=np.int64),
+                            data)
+        return batch, pos
@@ -0,0 +1,112 @@
+# csi_io/csi_stream_receiver.py
+# byte stream receiver for live ASUS captures (tcpdump -U -w - on the router), alternative to CSIReceiver
+# ROUTER_LIVE_MODE "ssh": RouterDevice attaches the SSH channel running tcpdump with attach()
+# ROUTER_LIVE_MODE "tcp": the router pipes tcpdump into nc, the receiver listens on ROUTER_LIVE_PORT
+# large reads return as soon as any bytes are available, so latency stays bounded by tcpdump -U
+# emits the raw pcap chunks with csi_data, BCM4366C0Parser does the record framing
+
+import socket
+import time
+from PyQt5.QtCore import QThread
+from config.settings import ROUTER_LIVE_MODE, ROUTER_LIVE_PORT, STREAM_READ_SIZE
+
+
+class CSIStreamReceiver(QThread):
+    def __init__(self, signals, logger, stop_event, profiler=None, metrics=None, port=ROUTER_LIVE_PORT):
+        super().__init__()
+        self.port = port
+        self.signals = signals
+        self.logger = logger
+        self.stop_event = stop_event
+        self.profiler = profiler
+        self.metrics = metrics
+        self.first_packet_logged = False
+
+        self.source = None
+        self.bytes = 0
+        self.chunks = 0
+        self.last_metrics = 0.0
+
+    def attach(self, source):
+        # source is any object with recv(n) and settimeout(t): a paramiko channel or a socket, None detaches
+        if source is not None:
+            source.settimeout(0.5)
+        self.source = source
+        if self.logger:
+            self.logger.success(__file__, f"<attach>: live stream {'attached' if source else 'detached'}")
+
+    def run(self):
+        server = None
+        try:
+            if ROUTER_LIVE_MODE == "tcp":
+                server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                server.bind(("0.0.0.0", self.port))
+                server.listen(1)
+                server.settimeout(1.0)
+                if self.logger:
+                    self.logger.success(__file__, f"<run>: waiting for the live capture on port {self.port}")
+
+            while not self.stop_event.is_set():
+                if self.profiler:
+                    self.profiler.checkpoint("receiver")
+
+                source = self.source
+                if source is None:
+                    if server is not None:
+                        try:
+                            conn, addr = server.accept()
+                            conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+                            self.attach(conn)
+                        except socket.timeout:
+                            pass
+                    else:
+                        self.msleep(50)
+                    continue
+
+                try:
+                    chunk = source.recv(STREAM_READ_SIZE)
+                except socket.timeout:
+                    continue
+                except OSError as e:
+                    if self.logger:
+                        self.logger.failure(__file__, f"<run>: stream error - {e}")
+                    chunk = b""
+
+                if not chunk:
+                    # tcpdump exited or the channel was closed
+                    if self.source is source:
+                        self.source = None
+                        if server is not None:
+                            source.close()
+                        if self.logger:
+                            self.logger.failure(__file__, "<run>: live stream ended")
+                    continue
+
+                if not self.first_packet_logged and self.logger:
+                    self.logger.success(__file__, f"<run>: first chunk received ({len(chunk)} bytes)")
+                    self.first_packet_logged = True
+
+                self.bytes += len(chunk)
+                self.chunks += 1
+                self.signals.csi_data.emit(chunk, time.time())
+                self._publish_metrics()
+
+            if self.profiler:
+                self.profiler.finish("receiver")
+
+        except Exception as e:
+            if self.logger:
+                self.logger.failure(__file__, f"<run>: fatal error - {e}")
+        finally:
+            if server is not None:
+                server.close()
+
+    def _publish_metrics(self):
+        now = time.time()
+        if self.metrics and now - self.last_metrics >= 1.0:
+            self.last_metrics = now
+            self.metrics.update({
+                "receiver.chunks": self.chunks,
+                "receiver.mbytes": round(self.bytes / 1e6, 2),
+            })
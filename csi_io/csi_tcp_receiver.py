@@ -0,0 +1,181 @@
+# csi_io/csi_tcp_receiver.py
+# TCP receiver for CSI frames from the RPi forwarder (--transport tcp), alternative to CSIReceiver
+# listens on PORT (or the port of its sniffer) and accepts the forwarder connection, when the stream
+# goes idle a newer connection replaces the current one (the forwarder reconnected, the old socket is half-open)
+# stream framing: <Id> (frame length, RPi capture timestamp) followed by the frame bytes
+# large recv_into calls fill one reusable buffer, every complete frame in it is split out at once
+# and the partial tail is moved to the front, no per-frame allocation besides the emitted bytes
+# emits csi_data signal per frame with the capture timestamp, publishes counters to metrics
+# with a ClockSync, capture timestamps of the sniffer are mapped to the laptop clock
+# sniffer telemetry frames (see csi_io/csi_telemetry.py) go to metrics instead of the parser, a telemetry frame
+# that does not decode is counted and dropped, the stream stays up
+
+import socket
+import struct
+import time
+from PyQt5.QtCore import QThread
+from config.settings import PORT, TCP_RECEIVE_BUFFER_SIZE
+from csi_io.csi_telemetry import TelemetryDecoder, is_telemetry
+
+
+class CSITCPReceiver(QThread):
+    FRAME_HEADER = struct.Struct("<Id")
+    MAX_FRAME_SIZE = 1 << 16
+
+    def __init__(self, signals, logger, stop_event, profiler=None, metrics=None, port=PORT, clock=None):
+        super().__init__()
+        self.clock = clock
+        self.port = port
+        self.signals = signals
+        self.logger = logger
+        self.stop_event = stop_event
+        self.profiler = profiler
+        self.metrics = metrics
+        self.first_packet_logged = False
+
+        self.buffer = bytearray(TCP_RECEIVE_BUFFER_SIZE)
+        self.view = memoryview(self.buffer)
+        self.frames = 0
+        self.bytes = 0
+        self.connections = 0
+        self.malformed = 0
+        self.telemetry_decoder = TelemetryDecoder()
+
+    def run(self):
+        if self.logger:
+            self.logger.success(__file__, f"<run>: starting TCP listener on port {self.port}")
+
+        try:
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server.bind(("0.0.0.0", self.port))
+            server.listen(1)
+            server.settimeout(1.0)
+
+            while not self.stop_event.is_set():
+                if self.profiler:
+                    self.profiler.checkpoint("receiver")
+                try:
+                    conn, addr = server.accept()
+                except socket.timeout:
+                    continue
+
+                while conn is not None:
+                    self.connections += 1
+                    if self.logger:
+                        self.logger.success(__file__, f"<run>: forwarder connected from {addr}")
+                    next_connection = self._serve(conn, server)
+                    if self.logger:
+                        self.logger.failure(__file__, f"<run>: forwarder {addr} disconnected, waiting for reconnection")
+                    conn, addr = next_connection if next_connection else (None, None)
+
+            server.close()
+            if self.profiler:
+                self.profiler.finish("receiver")
+
+            if self.logger:
+                self.logger.success(__file__, "<run>: TCP listener stopped")
+
+        except Exception as e:
+            if self.logger:
+                self.logger.failure(__file__, f"<run>: fatal error - {e}")
+
+    def _serve(self, conn, server):
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        conn.settimeout(1.0)
+        filled = 0
+        last_data = time.time()
+        last_metrics = 0.0
+
+        try:
+            while not self.stop_event.is_set():
+                if self.profiler:
+                    self.profiler.checkpoint("receiver")
+
+                current_time = time.time()
+                if current_time - last_metrics >= 1.0:
+                    self._publish_metrics()
+                    last_metrics = current_time
+
+                try:
+                    received = conn.recv_into(self.view[filled:])
+                except socket.timeout:
+                    next_connection = self._pending_connection(server)
+                    if next_connection:
+                        return next_connection
+                    if current_time - last_data >= 5 and self.logger:
+                        self.logger.failure(__file__, "<_serve>: no data received for 5s")
+                        last_data = current_time
+                    continue
+
+                if received == 0:
+                    return None
+                last_data = current_time
+                self.bytes += received
+                filled += received
+
+                if not self.first_packet_logged and self.logger:
+                    self.logger.success(__file__, f"<_serve>: first chunk received ({received} bytes)")
+                    self.first_packet_logged = True
+
+                consumed = self._split_frames(filled)
+                if consumed < 0:
+                    return None
+                if consumed:
+                    remaining = filled - consumed
+                    self.buffer[:remaining] = self.view[consumed:filled]
+                    filled = remaining
+
+        except OSError as e:
+            if self.logger:
+                self.logger.failure(__file__, f"<_serve>: socket error - {e}")
+        finally:
+            conn.close()
+        return None
+
+    def _split_frames(self, filled):
+        header_size = self.FRAME_HEADER.size
+        unpack_from = self.FRAME_HEADER.unpack_from
+        to_local = self.clock.to_local if self.clock else None
+        pos = 0
+        while pos + header_size <= filled:
+            length, capture_time = unpack_from(self.buffer, pos)
+            if length > self.MAX_FRAME_SIZE:
+                if self.logger:
+                    self.logger.failure(__file__, f"<_split_frames>: invalid frame length {length}, dropping connection")
+                return -1
+            end = pos + header_size + length
+            if end > filled:
+                break
+            frame = bytes(self.view[pos + header_size:end])
+            if is_telemetry(frame):
+                try:
+                    self.telemetry_decoder.publish(frame, self.metrics)
+                except (ValueError, struct.error) as e:
+                    self.malformed += 1
+                    if self.logger:
+                        self.logger.failure(__file__, f"<_split_frames>: malformed telemetry - {e}")
+            else:
+                self.signals.csi_data.emit(frame, to_local(capture_time) if to_local else capture_time)
+                self.frames += 1
+            pos = end
+        return pos
+
+    def _pending_connection(self, server):
+        server.settimeout(0.0)
+        try:
+            return server.accept()
+        except (BlockingIOError, socket.timeout):
+            return None
+        finally:
+            server.settimeout(1.0)
+
+    def _publish_metrics(self):
+        if self.metrics:
+            self.metrics.update({
+                "receiver.frames": self.frames,
+                "receiver.mbytes": round(self.bytes / 1e6, 2),
+                "receiver.connections": self.connections,
+                "receiver.malformed": self.malformed,
+            })
@@ -0,0 +1,50 @@
+# csi_io/csi_telemetry.py
+# laptop side of the sniffer health telemetry (see nexmon_rpi/csi_telemetry.py)
+# record: <2sBBdIIIIIfff> (magic "CT", version, reserved, timestamp, frames in, frames out, dropped,
+# capture socket drops, udp receive buffer errors, cpu %, memory %, temperature in C)
+# receivers pick the records out of the data stream and publish them as sniffer.* metrics,
+# rates are derived from consecutive records
+
+import struct
+
+TELEMETRY_MAGIC = b"CT"
+TELEMETRY_VERSION = 1
+TELEMETRY_RECORD = struct.Struct("<2sBBdIIIIIfff")
+
+
+def is_telemetry(frame) -> bool:
+    return frame[:2] == TELEMETRY_MAGIC and len(frame) == TELEMETRY_RECORD.size
+
+
+class TelemetryDecoder:
+    def __init__(self):
+        self.previous = None
+
+    def publish(self, frame, metrics):
+        (_, version, _, timestamp, frames_in, frames_out, dropped,
+         socket_drops, buffer_errors, cpu, memory, temperature) = TELEMETRY_RECORD.unpack(frame)
+        if version != TELEMETRY_VERSION:
+            raise ValueError(f"unsupported telemetry version {version}")
+
+        values = {
+            "sniffer.frames_in": frames_in,
+            "sniffer.frames_out": frames_out,
+            "sniffer.dropped": dropped,
+            "sniffer.sock_drops": socket_drops,
+            "sniffer.udp_buf_errors": buffer_errors,
+            "sniffer.cpu_pct": round(cpu, 1),
+            "sniffer.mem_pct": round(memory, 1),
+            "sniffer.temp_c": round(temperature, 1),
+        }
+        if self.previous is not None and timestamp > self.previous[0]:
+            elapsed = timestamp - self.previous[0]
+            values["sniffer.rate_in"] = round(((frames_in - self.previous[1]) & 0xFFFFFFFF) / elapsed, 1)
+            values["sniffer.rate_out"] = round(((frames_out - self.previous[2]) & 0xFFFFFFFF) / elapsed, 1)
+        self.previous = (timestamp, frames_in, frames_out)
+
+        if metrics:
+            metrics.update(values)
+        return values
+
+    def reset(self):
+        self.previous = None
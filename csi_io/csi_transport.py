@@ -0,0 +1,76 @@
+# csi_io/csi_transport.py
+# laptop side of the forwarder transport framing (see nexmon_rpi/csi_transport.py)
+# datagram: header <2sBBI> (magic "CB", version, frame count, transport seq)
+# then per frame <Hd> (frame length, RPi capture timestamp) followed by the frame bytes
+# raw nexmon protobuf datagrams start with 0x0a and never collide with the batch magic
+# BatchDecoder unpacks datagrams and counts exact transport losses from the sequence numbers
+
+import struct
+
+BATCH_MAGIC = b"CB"
+BATCH_VERSION = 1
+BATCH_HEADER = struct.Struct("<2sBBI")
+FRAME_HEADER = struct.Struct("<Hd")
+
+SEQ_MODULO = 1 << 32
+
+
+def is_batch(packet: bytes) -> bool:
+    return packet[:2] == BATCH_MAGIC
+
+
+class BatchDecoder:
+    def __init__(self):
+        self.expected_seq = None
+        self.datagrams = 0
+        self.frames = 0
+        self.lost = 0
+        self.late = 0
+
+    def decode(self, packet: bytes):
+        if len(packet) < BATCH_HEADER.size:
+            raise ValueError(f"truncated batch of {len(packet)} bytes")
+        magic, version, count, seq = BATCH_HEADER.unpack_from(packet, 0)
+        if version != BATCH_VERSION:
+            raise ValueError(f"unsupported batch version {version}")
+
+        self._track_seq(seq)
+
+        frames = []
+        view = memoryview(packet)
+        pos = BATCH_HEADER.size
+        end = len(packet)
+        for _ in range(count):
+            if pos + FRAME_HEADER.size > end:
+                raise ValueError(f"truncated batch header at offset {pos}")
+            length, capture_time = FRAME_HEADER.unpack_from(packet, pos)
+            pos += FRAME_HEADER.size
+            if pos + length > end:
+                raise ValueError(f"truncated batch frame at offset {pos}")
+            frames.append((bytes(view[pos:pos + length]), capture_time))
+            pos += length
+
+        self.datagrams += 1
+        self.frames += len(frames)
+        return frames
+
+    def _track_seq(self, seq):
+        if self.expected_seq is not None:
+            gap = (seq - self.expected_seq) % SEQ_MODULO
+            if gap >= SEQ_MODULO // 2:
+                # older than expected, reordered or duplicated datagram
+                self.late += 1
+                return
+            self.lost += gap
+        self.expected_seq = (seq + 1) % SEQ_MODULO
+
+    def loss_ratio(self) -> float:
+        total = self.datagrams + self.lost
+        return self.lost / total if total else 0.0
+
+    def reset(self):
+        self.expected_seq = None
+        self.datagrams = 0
+        self.frames = 0
+        self.lost = 0
+        self.late = 0
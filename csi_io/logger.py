@@ -1,23 +1,52 @@
 # io/logger.py
-# logger class with a logs signal for debugging
+# asynchronous logger class with a logs signal for debugging
 # instantiate Logger once in main_window to avoid multiple instances across threads
 # to use Logger in other classes, import it and pass the instance in their constructor
 # def __init__(self, logger): self.logger = logger
 # use logger.success(__file__, "custom message") or logger.failure(__file__, "error details")
+# debug, info and warning levels are also available, records below LOG_LEVEL are dropped at the call
+# logging threads only append a record to a bounded ring (deque appends are atomic, no lock is taken)
+# a background writer drains the ring, prints, writes the optional rotating file sink and emits one batch per flush
+# each call site (file + line) is rate limited to LOG_RATE_LIMIT records per LOG_RATE_WINDOW seconds
+# extra records are counted and reported as "suppressed N messages" once the window rolls over
+# call close() before exiting to flush pending records
 
 from PyQt5.QtCore import QObject, pyqtSignal
+from collections import deque
 from datetime import datetime
 import os
+import sys
+import threading
+import time
+import config.settings as Settings
 
 
 class Logger(QObject):
     logs = pyqtSignal(str)
 
+    LEVELS = {"debug": 10, "info": 20, "success": 20, "warning": 30, "failure": 40}
+
     def __init__(self):
         super().__init__()
+        self.min_level = self.LEVELS.get(Settings.LOG_LEVEL, 20)
+        self.rate_limit = Settings.LOG_RATE_LIMIT
+        self.rate_window = Settings.LOG_RATE_WINDOW
+
+        self._ring = deque(maxlen=Settings.LOG_RING_SIZE)
+        self._sites = {}
+        self._dropped = 0
+
+        self._file_sink = None
+        if Settings.LOG_FILE:
+            self._file_sink = _RotatingFile(Settings.LOG_FILE, Settings.LOG_FILE_MAX_BYTES, Settings.LOG_FILE_BACKUPS)
 
-    def _format_log(self, filename: str, status: str, msg: str = "") -> str:
-        now = datetime.now()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._writer = threading.Thread(target=self._write_loop, name="logger-writer", daemon=True)
+        self._writer.start()
+
+    def _format_log(self, filename: str, status: str, msg: str = "", timestamp: float = None) -> str:
+        now = datetime.fromtimestamp(timestamp) if timestamp else datetime.now()
         time_str = now.strftime("%H:%M:%S")
         base_name = os.path.basename(filename)
         log = f"[{base_name}:{time_str}:{status}]"
@@ -25,12 +54,126 @@ class Logger(QObject):
             log += f" {msg}"
         return log
 
+    def debug(self, filename: str, msg: str = ""):
+        self._log(filename, "debug", msg)
+
+    def info(self, filename: str, msg: str = ""):
+        self._log(filename, "info", msg)
+
+    def warning(self, filename: str, msg: str = ""):
+        self._log(filename, "warning", msg)
+
     def success(self, filename: str, msg: str = ""):
-        log_str = self._format_log(filename, "success", msg)
-        print(log_str)
-        self.logs.emit(log_str)
+        self._log(filename, "success", msg)
 
     def failure(self, filename: str, msg: str = ""):
-        log_str = self._format_log(filename, "failure", msg)
-        print(log_str)
-        self.logs.emit(log_str)
+        self._log(filename, "failure", msg)
+
+    def _log(self, filename, status, msg):
+        if self.LEVELS[status] < self.min_level:
+            return
+
+        now = time.time()
+        caller = sys._getframe(2)
+        site = (filename, caller.f_lineno)
+
+        # Unlocked per-site counters, a race between threads can only miscount by a few records
+        state = self._sites.get(site)
+        if state is None or now - state[0] >= self.rate_window:
+            if state is not None and state[2]:
+                self._push(now, filename, "warning", f"<{caller.f_code.co_name}>: suppressed {state[2]} messages")
+            self._sites[site] = [now, 1, 0]
+        elif state[1] >= self.rate_limit:
+            state[2] += 1
+            return
+        else:
+            state[1] += 1
+
+        self._push(now, filename, status, msg)
+
+    def _push(self, timestamp, filename, status, msg):
+        if len(self._ring) == self._ring.maxlen:
+            self._dropped += 1
+        self._ring.append((timestamp, filename, status, msg))
+        if status == "failure":
+            self._wake.set()
+
+    def _write_loop(self):
+        while not self._closed.is_set():
+            self._wake.wait(Settings.LOG_FLUSH_INTERVAL)
+            self._wake.clear()
+            self._flush_suppressed()
+            self._drain()
+        self._drain()
+
+    def _flush_suppressed(self):
+        now = time.time()
+        for site, state in list(self._sites.items()):
+            if state[2] and now - state[0] >= self.rate_window:
+                self._push(now, site[0], "warning", f"<line {site[1]}>: suppressed {state[2]} messages")
+                self._sites[site] = [now, 0, 0]
+
+    def _drain(self):
+        lines = []
+        while self._ring:
+            try:
+                timestamp, filename, status, msg = self._ring.popleft()
+            except IndexError:
+                break
+            lines.append(self._format_log(filename, status, msg, timestamp))
+
+        if self._dropped:
+            lines.append(self._format_log(__file__, "warning", f"<_drain>: log ring full, {self._dropped} records dropped"))
+            self._dropped = 0
+
+        if not lines:
+            return
+
+        batch = "\n".join(lines)
+        try:
+            print(batch, flush=True)
+            if self._file_sink:
+                self._file_sink.write(batch + "\n")
+            self.logs.emit(batch)
+        except Exception as e:
+            print(f"[logger.py:failure] <_drain>: {e}")
+
+    def close(self):
+        self._closed.set()
+        self._wake.set()
+        self._writer.join(2.0)
+        if self._file_sink:
+            self._file_sink.close()
+
+
+class _RotatingFile:
+    def __init__(self, path, max_bytes, backups):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "a", buffering=1024 * 64)
+        self.size = self.file.tell()
+
+    def write(self, text):
+        if self.size + len(text) > self.max_bytes:
+            self._rotate()
+        self.file.write(text)
+        self.file.flush()
+        self.size += len(text)
+
+    def _rotate(self):
+        self.file.close()
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        self.file = open(self.path, "w", buffering=1024 * 64)
+        self.size = 0
+
+    def close(self):
+        self.file.close()
@@ -2,6 +2,7 @@
 # chartView displays CSI spectrogram data received from processor via fft_data signal
 # rewritten using pyqtgraph for high-performance rendering
 # connects to fft_data signal and plots dynamically decimated data for performance
+# the Y range before data arrives comes from the calibration profile (set_y_range), 200 to 2000 without one
 
 from PyQt5.QtWidgets import QWidget, QVBoxLayout
 from PyQt5.QtCore import pyqtSlot
@@ -20,13 +21,14 @@ class ChartView(QWidget):
         self.x_width = max(x_width, 1.0)
         self.y_values = set()
         self.t0 = None
+        self.y_range = (200, 2000)
 
         self.data_buffer = []
         self.plot_widget = pg.PlotWidget(title=title)
         self.plot_widget.setBackground('w')
         self.plot_widget.setLabel('bottom', x_name)
         self.plot_widget.setLabel('left', y_name)
-        self.plot_widget.setYRange(200, 2000)
+        self.plot_widget.setYRange(*self.y_range)
         self.plot_widget.enableAutoRange(x=False, y=False)
         self.curve = self.plot_widget.plot([], [], pen=pg.mkPen(color=(0, 0, 100), width=1))  # Dark blue
 
@@ -88,9 +90,14 @@ class ChartView(QWidget):
         self.y_values.clear()
         self.curve.clear()
         self.plot_widget.setXRange(0, 1)
-        self.plot_widget.setYRange(200, 2000)
+        self.plot_widget.setYRange(*self.y_range)
         self.t0 = None
 
+    def set_y_range(self, y_min, y_max):
+        self.y_range = (y_min, y_max)
+        if not self.y_values:
+            self.plot_widget.setYRange(y_min, y_max)
+
     def set_x_width(self, width):
         self.x_width = max(width, 1.0)
         # if self.logger:
@@ -2,26 +2,37 @@
 # MainWindow loads UI, handles user interactions and displays data/alerts
 # connects threshold slider to processor via threshold_value signal
 # receives threshold_exceeded signal from processor to show motion alerts
+# receives motion_event from the adaptive detector, the alert lasts for the whole motion episode
 # displays logs from logger in console and updates chart with CSI data
 # manages start/stop button states and emits start_app/stop_app signals
+# shows pipeline metrics (frames, losses, sniffer health) in the status bar once per second
+# with several sniffers a dock table shows per-device status, rates, loss and health from "<name>.*" metrics
+# with the doppler processor a dock shows the Doppler velocity spectrogram
+# the Calibrate button records a calibration profile, an applied profile sets the slider and the chart range
 
-from PyQt5.QtWidgets import QMainWindow, QMessageBox
-from PyQt5.QtCore import pyqtSlot, QTimer
+from PyQt5.QtWidgets import QMainWindow, QMessageBox, QDockWidget, QTableWidget, QTableWidgetItem, QHeaderView
+from PyQt5.QtCore import pyqtSlot, QTimer, Qt
 from PyQt5.uic import loadUi
 import os
 
 from core.signals import Signals
 from gui.chart_view import ChartView
+from gui.spectrogram_view import SpectrogramView
 import config.settings as Settings
 
 
 class MainWindow(QMainWindow):
-    def __init__(self, signals: Signals, logger):
+    def __init__(self, signals: Signals, logger, metrics=None):
         super().__init__()
 
         self.signals = signals
         self.logger = logger
+        self.metrics = metrics
         self.chart_view = None
+        self.spectrogram_view = None
+        self.fleet_table = None
+        self.fleet_names = []
+        self.fleet_previous = {}
         self.is_running = False
         self.ping_running = False
 
@@ -39,6 +50,18 @@ class MainWindow(QMainWindow):
         self.alert_timer.timeout.connect(self._clear_alert)
         self.alert_timer.setSingleShot(True)
 
+        # Setup console timer (log batches are appended at a fixed rate instead of per record)
+        self.pending_logs = []
+        self.logText.document().setMaximumBlockCount(Settings.LOG_CONSOLE_MAX_LINES)
+        self.console_timer = QTimer()
+        self.console_timer.timeout.connect(self._flush_console)
+        self.console_timer.start(Settings.LOG_CONSOLE_INTERVAL)
+
+        # Setup metrics timer
+        self.metrics_timer = QTimer()
+        self.metrics_timer.timeout.connect(self._update_metrics)
+        self.metrics_timer.start(1000)
+
         # if self.logger:
         #     self.logger.success(__file__, "<__init__>")
 
@@ -86,6 +109,8 @@ class MainWindow(QMainWindow):
             self.defaultThresholdCheckBox.toggled.connect(self._on_no_threshold_toggled)
             self.startButton.clicked.connect(self._on_start_clicked)
             self.stopButton.clicked.connect(self._on_stop_clicked)
+            self.profileButton.clicked.connect(self.signals.toggle_profiling.emit)
+            self.calibrateButton.clicked.connect(self.signals.calibrate.emit)
             self.startStopPingButton.clicked.connect(self.signals.toggle_ping.emit)
             self.connectSnifferButton.clicked.connect(self.signals.connect_sniffer.emit)
             self.setupSnifferButton.clicked.connect(self.signals.setup_sniffer.emit)
@@ -157,31 +182,123 @@ class MainWindow(QMainWindow):
             if self.logger:
                 self.logger.failure(__file__, "<show_threshold_alert> failed to alert")
 
+    @pyqtSlot(dict)
+    def show_motion_event(self, event):
+        # the alert stays up for the whole episode and clears 3 s after its end
+        try:
+            prefix = f"[{event['sniffer']}] " if 'sniffer' in event else ""
+            if event['active']:
+                self.alert_timer.stop()
+                self.alertLineEdit.setText(f"MOTION DETECTED: {prefix}since {event['start']:.2f}s, score={event['score']:.1f}")
+                self.alertLineEdit.setStyleSheet("font-weight: bold; color: #d9534f; background-color: #f2dede;")
+            else:
+                self.alertLineEdit.setText(f"MOTION ENDED: {prefix}{event['duration']:.1f}s, peak={event['peak']:.1f}")
+                self.alert_timer.start(3000)
+
+        except Exception as e:
+            if self.logger:
+                self.logger.failure(__file__, f"<show_motion_event>: {e}")
+
+    @pyqtSlot(dict)
+    def apply_calibration(self, summary):
+        # the slider only shows the profile threshold, moving it sends a value to every processor again
+        try:
+            value = int(round(summary['threshold']))
+            value = min(max(value, self.thresholdSlider.minimum()), self.thresholdSlider.maximum())
+            self.thresholdSlider.blockSignals(True)
+            self.thresholdSlider.setValue(value)
+            self.thresholdSlider.blockSignals(False)
+            self.thresholdValueLabel.setText(str(value))
+            if self.chart_view:
+                self.chart_view.set_y_range(*summary['y_range'])
+            if self.logger:
+                self.logger.success(__file__, f"<apply_calibration>: {summary['key']}, {summary['frames']} frames, "
+                                              f"{summary['masked']} masked, threshold {summary['threshold']:.2f}")
+
+        except Exception as e:
+            if self.logger:
+                self.logger.failure(__file__, f"<apply_calibration>: {e}")
+
     def _clear_alert(self):
         self.alertLineEdit.setText("No motion detected")
         self.alertLineEdit.setStyleSheet("font-weight: bold; color: #5cb85c;")
 
     @pyqtSlot(str)
     def update_console(self, log_message):
+        self.pending_logs.append(log_message)
+        if len(self.pending_logs) > Settings.LOG_CONSOLE_MAX_LINES:
+            del self.pending_logs[:-Settings.LOG_CONSOLE_MAX_LINES]
+
+    def _flush_console(self):
+        if not self.pending_logs:
+            return
         try:
-            self.logText.append(log_message)
+            batch = "\n".join(self.pending_logs)
+            self.pending_logs.clear()
+            self.logText.append(batch)
             cursor = self.logText.textCursor()
             cursor.movePosition(cursor.End)
             self.logText.setTextCursor(cursor)
 
-            if self.logText.document().blockCount() > 1000:
-                cursor.movePosition(cursor.Start)
-                cursor.movePosition(cursor.Down, cursor.KeepAnchor, 100)
-                cursor.removeSelectedText()
-
         except Exception as e:
             if self.logger:
-                self.logger.failure(__file__, "<update_console>: failed to update")
+                self.logger.failure(__file__, "<_flush_console>: failed to update")
+
+    def show_fleet(self, names):
+        columns = ["Status", "MB/s", "Frames/s", "Loss %", "CPU %", "Temp C"]
+        self.fleet_names = names
+        self.fleet_table = QTableWidget(len(names), len(columns))
+        self.fleet_table.setHorizontalHeaderLabels(columns)
+        self.fleet_table.setVerticalHeaderLabels(names)
+        self.fleet_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.fleet_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        dock = QDockWidget("Sniffers", self)
+        dock.setWidget(self.fleet_table)
+        self.addDockWidget(Qt.BottomDockWidgetArea, dock)
+
+    def show_spectrogram(self):
+        self.spectrogram_view = SpectrogramView(self, logger=self.logger)
+        dock = QDockWidget("Doppler", self)
+        dock.setWidget(self.spectrogram_view)
+        self.addDockWidget(Qt.RightDockWidgetArea, dock)
+
+    def _update_fleet(self, snapshot):
+        for row, name in enumerate(self.fleet_names):
+            prefix = name + "."
+            mbytes = snapshot.get(prefix + "receiver.mbytes", 0)
+            frames = snapshot.get(prefix + "receiver.frames", snapshot.get(prefix + "receiver.packets", 0))
+            previous_mbytes, previous_frames = self.fleet_previous.get(name, (mbytes, frames))
+            self.fleet_previous[name] = (mbytes, frames)
+            values = [
+                snapshot.get(prefix + "status", ""),
+                f"{mbytes - previous_mbytes:.2f}",
+                str(frames - previous_frames),
+                str(snapshot.get(prefix + "receiver.loss_pct", "")),
+                str(snapshot.get(prefix + "sniffer.cpu_pct", "")),
+                str(snapshot.get(prefix + "sniffer.temp_c", "")),
+            ]
+            for column, value in enumerate(values):
+                self.fleet_table.setItem(row, column, QTableWidgetItem(value))
+
+    def _update_metrics(self):
+        if not self.metrics:
+            return
+        snapshot = self.metrics.snapshot()
+        if self.fleet_table is not None:
+            self._update_fleet(snapshot)
+            prefixes = tuple(name + "." for name in self.fleet_names)
+            snapshot = {k: v for k, v in snapshot.items() if not k.startswith(prefixes)}
+        if snapshot:
+            self.statusBar().showMessage("  ".join(f"{k}={v}" for k, v in sorted(snapshot.items())))
 
     def update_chart(self, fft_data):
         if self.chart_view:
             self.chart_view.update_chart(fft_data)
 
+    def update_spectrogram(self, doppler_data):
+        if self.spectrogram_view:
+            self.spectrogram_view.update_spectrogram(doppler_data)
+
     def closeEvent(self, event):
         if self.is_running:
             reply = QMessageBox.question(
@@ -0,0 +1,98 @@
+# gui/spectrogram_view.py
+# SpectrogramView displays the Doppler velocity spectrum received from the doppler processor via doppler_data
+# pyqtgraph ImageItem over a preallocated [history, velocities] image, new STFT frames shift in at the right
+# the image is redrawn by a timer every SPECTROGRAM_REFRESH_MS instead of per signal
+# colors span SPECTROGRAM_DYNAMIC_RANGE dB below a slowly decaying peak so they do not flicker
+
+import numpy as np
+from PyQt5.QtWidgets import QWidget, QVBoxLayout
+from PyQt5.QtCore import pyqtSlot, QTimer, QRectF
+import pyqtgraph as pg
+from config.settings import SPECTROGRAM_HISTORY, SPECTROGRAM_DYNAMIC_RANGE, SPECTROGRAM_REFRESH_MS
+
+
+class SpectrogramView(QWidget):
+    def __init__(self, parent=None, logger=None,
+                 title="Doppler Spectrum",
+                 x_name="Time (s)",
+                 y_name="Velocity (m/s)",
+                 history=SPECTROGRAM_HISTORY):
+        super().__init__(parent)
+
+        self.logger = logger
+        self.history = history
+        self.image = None
+        self.times = np.zeros(history)
+        self.velocity = None
+        self.frames = 0
+        self.peak = None
+        self.dirty = False
+
+        self.plot_widget = pg.PlotWidget(title=title)
+        self.plot_widget.setBackground('w')
+        self.plot_widget.setLabel('bottom', x_name)
+        self.plot_widget.setLabel('left', y_name)
+        self.image_item = pg.ImageItem()
+        try:
+            self.image_item.setLookupTable(pg.colormap.get('viridis').getLookupTable())
+        except Exception:
+            pass
+        self.plot_widget.addItem(self.image_item)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.plot_widget)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self._refresh)
+        self.refresh_timer.start(SPECTROGRAM_REFRESH_MS)
+
+    @pyqtSlot(dict)
+    def update_spectrogram(self, doppler_data):
+        try:
+            spectrum = doppler_data['spectrum']
+            velocity = doppler_data['velocity']
+            times = doppler_data['time']
+            if self.image is None or self.image.shape[1] != len(velocity):
+                self.image = np.full((self.history, len(velocity)), np.nan, dtype=np.float32)
+                self.velocity = velocity
+                self.frames = 0
+
+            n = min(len(spectrum), self.history)
+            if not n:
+                return
+            self.image[:-n] = self.image[n:]
+            self.image[-n:] = spectrum[-n:]
+            self.times[:-n] = self.times[n:]
+            self.times[-n:] = times[-n:]
+            self.frames = min(self.frames + n, self.history)
+
+            batch_peak = float(np.max(spectrum))
+            self.peak = batch_peak if self.peak is None else max(batch_peak, self.peak - 0.05 * n)
+            self.dirty = True
+
+        except Exception as e:
+            if self.logger:
+                self.logger.failure(__file__, f"<update_spectrogram>: {e}")
+
+    def _refresh(self):
+        if not self.dirty or self.frames < 2:
+            return
+        self.dirty = False
+        image = np.nan_to_num(self.image, nan=self.peak - SPECTROGRAM_DYNAMIC_RANGE)
+        self.image_item.setImage(image, autoLevels=False, levels=(self.peak - SPECTROGRAM_DYNAMIC_RANGE, self.peak))
+
+        # x spans the buffered history, assuming the frames of the visible part are evenly spaced
+        t_end = self.times[-1]
+        t_step = (t_end - self.times[-self.frames]) / (self.frames - 1)
+        v_min, v_max = float(self.velocity[0]), float(self.velocity[-1])
+        v_step = (v_max - v_min) / max(len(self.velocity) - 1, 1)
+        self.image_item.setRect(QRectF(t_end - t_step * self.history, v_min - v_step / 2,
+                                       t_step * self.history, v_max - v_min + v_step))
+
+    def clear(self):
+        self.image = None
+        self.frames = 0
+        self.peak = None
+        self.dirty = False
+        self.image_item.clear()
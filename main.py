@@ -4,94 +4,214 @@
 # connect signals and slots
 # show main_window and run app
 # thread management is centralized here with simple start/stop functions
+# with Settings.SNIFFERS every sniffer gets its own pipeline (port, receiver, parser, buffer, processor, signals)
+# and SnifferFleet runs the control actions on all devices at once
 
 import sys
+import signal
 import threading
+from functools import partial
 from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import QMutex
+from PyQt5.QtCore import QMutex, QTimer
 from core.signals import Signals
 from core.buffer import CircularBuffer
+from core.profiler import Profiler
+from core.metrics import Metrics
 from gui.main_window import MainWindow
 from csi_io.csi_receiver import CSIReceiver
+from csi_io.csi_tcp_receiver import CSITCPReceiver
+from csi_io.csi_stream_receiver import CSIStreamReceiver
+from csi_io.clock_sync import ClockSync
 from processing.rpi4_parser import RPI4Parser
+from processing.rpi4_codec_parser import RPI4CodecParser
+from processing.edge_parser import EdgeParser
 from processing.bcm4366c0_parser import BCM4366C0Parser
 from csi_io.logger import Logger
 import config.settings as Settings
-if Settings.SOURCE_DEVICE == "RPi4":
-    from processing.csi_magnitude_processor_rpi4 import CSIMagnitudeProcessor
-else:
-    from processing.csi_magnitude_processor_asus import CSIMagnitudeProcessor
+from processing.csi_magnitude_processor_rpi4 import CSIMagnitudeProcessor as RPI4MagnitudeProcessor
+from processing.csi_magnitude_processor_asus import CSIMagnitudeProcessor as ASUSMagnitudeProcessor
+from processing.csi_doppler_processor import CSIDopplerProcessor
+from processing.csi_phase_processor import CSIPhaseProcessor
+from processing.csi_breathing_processor import CSIBreathingProcessor
 from remote.rpi_device import RPiDevice
 from remote.router_device import RouterDevice
+from remote.sniffer_fleet import SnifferFleet
 from remote.laptop_ping import LaptopPing
 
 
 # Thread management state
 stop_event = threading.Event()
 threads = {}
+profiler = None
+fleet = None
 
 def main():
-    global threads
+    global threads, profiler, fleet
 
     app = QApplication(sys.argv)
 
     # Shared instances
     signals = Signals()
     logger = Logger()
-    buffer = CircularBuffer(Settings.BUFFER_SIZE)
-    mutex = QMutex()
+    profiler = Profiler(logger)
+    metrics = Metrics()
 
     # UI
-    main_window = MainWindow(signals, logger)
+    main_window = MainWindow(signals, logger, metrics)
     logger.logs.connect(main_window.update_console)
 
-    # Sniffing device
-    if Settings.SOURCE_DEVICE == "RPi4":
-        sniffer_device = RPiDevice(stop_event, logger)
+    # Pipelines, the first sniffer uses the UI signals and feeds the chart
+    pipelines = {}
+    if Settings.SNIFFERS:
+        for index, config in enumerate(Settings.SNIFFERS):
+            sniffer_signals = signals if index == 0 else Signals()
+            pipelines[config["name"]] = build_pipeline(sniffer_signals, logger, metrics.scoped(config["name"]), config)
+        main_window.show_fleet(list(pipelines))
     else:
-        sniffer_device = RouterDevice(stop_event, logger)
+        pipelines["sniffer"] = build_pipeline(signals, logger, metrics)
+    if any(isinstance(pipeline["processor"], CSIDopplerProcessor) for pipeline in pipelines.values()):
+        main_window.show_spectrogram()
+    if any(isinstance(pipeline["processor"], CSIBreathingProcessor) for pipeline in pipelines.values()):
+        main_window.chart_view.set_title("Breathing rate (breaths/min)")
 
     # Threads
-    threads = {
-        "receiver": CSIReceiver(signals, logger, stop_event),
-        "parser": RPI4Parser(signals, logger, buffer, mutex, stop_event),
-        "processor": CSIMagnitudeProcessor(signals, buffer, mutex, logger, stop_event, ma_window=Settings.MA_WINDOW),
-        "sniffer": sniffer_device,
-        "laptop_ping": LaptopPing(logger, stop_event)
-    }
+    threads = {}
+    for name, pipeline in pipelines.items():
+        prefix = "" if name == "sniffer" else f"{name}."
+        for key in ("receiver", "parser", "processor", "sniffer", "clock"):
+            if pipeline[key] is not None:
+                threads[prefix + key] = pipeline[key]
+    threads["laptop_ping"] = LaptopPing(logger, stop_event, profiler=profiler, metrics=metrics)
+    fleet = SnifferFleet({name: pipeline["sniffer"] for name, pipeline in pipelines.items()}, logger, metrics)
 
     # Signal/slot wiring
     connect_signals(signals, main_window)
+    for name, pipeline in pipelines.items():
+        if pipeline["signals"] is not signals:
+            pipeline["signals"].threshold_exceeded.connect(lambda text, name=name: main_window.show_threshold_alert(f"[{name}] {text}"))
+            pipeline["signals"].motion_event.connect(lambda event, name=name: main_window.show_motion_event(dict(event, sniffer=name)))
+
+    # SIGUSR1 toggles profiling of a live session, SIGUSR2 takes a memory snapshot while profiling,
+    # the timer lets python run signal handlers under the qt loop
+    signal.signal(signal.SIGUSR1, lambda signum, frame: profiler.toggle())
+    signal.signal(signal.SIGUSR2, lambda signum, frame: profiler.take_memory_snapshot())
+    signal_timer = QTimer()
+    signal_timer.timeout.connect(lambda: None)
+    signal_timer.start(250)
 
     # Show UI
     main_window.show()
-    return app.exec_()
+    exit_code = app.exec_()
+    fleet.shutdown()
+    logger.close()
+    return exit_code
+
+def build_pipeline(signals, logger, metrics, config=None):
+    # one sniffer: device, receiver on its port, parser, buffer and processor
+    # config is an entry of Settings.SNIFFERS, None for the single SOURCE_DEVICE setup
+    config = config or {}
+    source_device = config.get("type", Settings.SOURCE_DEVICE)
+    sniffer = config.get("name")
+    sniffer_profiler = profiler.scoped(sniffer) if sniffer else profiler
+    transport = config.get("transport", Settings.RPi_TRANSPORT)
+    mode = config.get("mode", Settings.RPi_MODE)
+    codec = config.get("codec", Settings.RPi_CODEC)
+    if source_device == "RPi4" and mode == "edge" and transport == "tcp":
+        raise ValueError(f"{config.get('name', 'RPi4')}: edge mode sends its results over UDP, set the transport to 'udp'")
+    buffer = CircularBuffer(Settings.BUFFER_SIZE)
+    mutex = QMutex()
+
+    # Clock sync, capture timestamps of an RPi are mapped to the laptop clock so sniffers line up
+    clock = None
+    if source_device == "RPi4":
+        clock = ClockSync(config.get("ip", Settings.RPi_IP), Settings.RPi_SYNC_PORT, logger, stop_event, metrics=metrics)
+
+    # Receiver, TCP trades latency for lossless delivery, live ASUS captures arrive as a pcap byte stream
+    if source_device != "RPi4" and Settings.ROUTER_LIVE:
+        receiver = CSIStreamReceiver(signals, logger, stop_event, profiler=sniffer_profiler, metrics=metrics,
+                                     port=config.get("port", Settings.ROUTER_LIVE_PORT))
+    elif transport == "tcp":
+        receiver = CSITCPReceiver(signals, logger, stop_event, profiler=sniffer_profiler, metrics=metrics,
+                                  port=config.get("port", Settings.PORT), clock=clock)
+    else:
+        receiver = CSIReceiver(signals, logger, stop_event, profiler=sniffer_profiler, metrics=metrics,
+                               port=config.get("port", Settings.PORT), clock=clock)
+
+    # Sniffing device
+    if source_device == "RPi4":
+        sniffer_device = RPiDevice(stop_event, logger, config=config or None)
+    else:
+        sniffer_device = RouterDevice(stop_event, logger, on_stream=getattr(receiver, "attach", None), config=config or None)
+
+    # Parser, the codec variant decodes frames compressed on the RPi, edge mode receives processed values
+    if source_device != "RPi4":
+        parser = BCM4366C0Parser(signals, logger, buffer, mutex, stop_event, profiler=sniffer_profiler)
+    elif mode == "edge":
+        parser = EdgeParser(signals, logger, buffer, mutex, stop_event, profiler=sniffer_profiler, metrics=metrics, clock=clock)
+    elif codec:
+        parser = RPI4CodecParser(signals, logger, buffer, mutex, stop_event, profiler=sniffer_profiler)
+    else:
+        parser = RPI4Parser(signals, logger, buffer, mutex, stop_event, profiler=sniffer_profiler)
+
+    # Processor, phase and Doppler need complex frames (RPi4 raw or codec), phase also works on the CSI ratio
+    # of the ASUS antennas, breathing on any frames but the edge values
+    complex_frames = source_device == "RPi4" and mode != "edge"
+    mimo_frames = source_device != "RPi4" and Settings.ROUTER_ANTENNAS > 1
+    if complex_frames and Settings.PROCESSING_METHOD == "doppler":
+        processor = CSIDopplerProcessor(signals, buffer, mutex, logger, stop_event, profiler=sniffer_profiler, sniffer=sniffer)
+    elif (complex_frames or source_device != "RPi4") and Settings.PROCESSING_METHOD == "breathing":
+        processor = CSIBreathingProcessor(signals, buffer, mutex, logger, stop_event, profiler=sniffer_profiler, sniffer=sniffer)
+    elif (complex_frames or mimo_frames) and Settings.PROCESSING_METHOD == "phase":
+        processor = CSIPhaseProcessor(signals, buffer, mutex, logger, stop_event, ma_window=Settings.MA_WINDOW, profiler=sniffer_profiler, sniffer=sniffer)
+    else:
+        processor_class = RPI4MagnitudeProcessor if source_device == "RPi4" else ASUSMagnitudeProcessor
+        processor = processor_class(signals, buffer, mutex, logger, stop_event, ma_window=Settings.MA_WINDOW, profiler=sniffer_profiler, sniffer=sniffer)
+
+    return {
+        "signals": signals,
+        "receiver": receiver,
+        "parser": parser,
+        "processor": processor,
+        "sniffer": sniffer_device,
+        "clock": clock,
+    }
 
 def connect_signals(signals, main_window):
     # Processing
-    signals.threshold_value.connect(threads["processor"].update_threshold)
+    for key, thread in threads.items():
+        if key.endswith("processor"):
+            signals.threshold_value.connect(thread.update_threshold)
+            signals.calibrate.connect(thread.start_calibration)
+        elif isinstance(thread, RPiDevice):
+            # edge runtimes run their own threshold detection on the RPi
+            signals.threshold_value.connect(thread.update_threshold)
     signals.threshold_exceeded.connect(main_window.show_threshold_alert)
+    signals.motion_event.connect(main_window.show_motion_event)
+    signals.calibration.connect(main_window.apply_calibration)
     signals.fft_data.connect(main_window.chart_view.update_chart)
+    signals.doppler_data.connect(main_window.update_spectrogram)
     signals.logs.connect(main_window.update_console)
 
     # App control
     signals.start_app.connect(start_threads)
     signals.stop_app.connect(stop_threads)
+    signals.toggle_profiling.connect(profiler.toggle)
 
     # Remote devices control
     signals.toggle_ping.connect(threads["laptop_ping"].toggle_ping)
-    signals.connect_sniffer.connect(threads["sniffer"].connect_sniffer)
-    signals.setup_sniffer.connect(threads["sniffer"].setup_sniffer)
-    signals.start_stream.connect(threads["sniffer"].start_stream)
-    signals.stop_stream.connect(threads["sniffer"].stop_stream)
-    signals.disconnect_sniffer.connect(threads["sniffer"].disconnect_sniffer)
-    signals.save_data.connect(threads["sniffer"].save_data)
+    # SSH actions run on the device executors, all sniffers at once, the GUI thread only queues them
+    signals.connect_sniffer.connect(partial(fleet.request, "connect_sniffer"))
+    signals.setup_sniffer.connect(partial(fleet.request, "setup_sniffer"))
+    signals.start_stream.connect(partial(fleet.request, "start_stream"))
+    signals.stop_stream.connect(partial(fleet.request, "stop_stream"))
+    signals.disconnect_sniffer.connect(partial(fleet.request, "disconnect_sniffer"))
+    signals.save_data.connect(partial(fleet.request, "save_data"))
 
 def start_threads():
     stop_event.clear()
     for key, thread in threads.items():
         if not thread.isRunning():
-            if key == "receiver":
+            if key.endswith("receiver"):
                 thread.first_packet_logged = False
             thread.start()
 
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# Compact CSI codec for the forwarder -> laptop link
+# nexmon protobuf frames are decoded with a minimal wire-format parser (no generated csi_pb2 needed)
+# the 256 CSI submessages are decoded in one vectorized pass, every byte of that region belongs
+# to a varint (tags, lengths and values) so all varints are summed at once with np.add.reduceat
+# then subcarriers are selected, quantized to int16 with a per-frame scale and optionally
+# delta coded against the previous reconstructed frame (closed loop, no drift) and zlib compressed
+# frame: header <2sBBIIQhHHHHf> (magic "CZ", version, flags, codec index, reference index,
+# source mac, rssi, fctl, nexmon seq, first subcarrier, subcarrier count, scale)
+# followed by interleaved int16 real/imag values, zlib compressed when FLAG_ZLIB is set
+# a delta frame can only be decoded when the frame with the reference index was decoded
+# must match processing/rpi4_codec_parser.py on the laptop side
+import struct
+import zlib
+import numpy as np
+
+CODEC_MAGIC = b"CZ"
+CODEC_VERSION = 1
+CODEC_HEADER = struct.Struct("<2sBBIIQhHHHHf")
+
+FLAG_DELTA = 0x01
+FLAG_ZLIB = 0x02
+
+INT16_MAX = 32767
+
+
+def _varint(buf, pos):
+    result = 0
+    shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _int32(value):
+    # int32 fields use 10-byte two's complement varints for negative values
+    value &= 0xFFFFFFFF
+    return value - (1 << 32) if value & 0x80000000 else value
+
+
+def _parse_csi_region(data):
+    # CSI submessages (field 1) are serialized first, find their tags by stepping over the lengths
+    # a body holds at most two 10-byte varints plus keys, so its length is a single byte
+    tags = []
+    pos = 0
+    end = len(data)
+    while pos < end and data[pos] == 0x0A:
+        tags.append(pos)
+        pos += 2 + data[pos + 1]
+    if not tags:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32), 0
+
+    buf = np.frombuffer(data, dtype=np.uint8, count=pos)
+    last_byte = (buf & 0x80) == 0
+    byte_token = np.cumsum(last_byte)
+    byte_token -= last_byte
+    token_start = np.flatnonzero(np.diff(byte_token, prepend=-1))
+    shift = (np.arange(pos) - token_start[byte_token]) * 7
+    values = np.add.reduceat((buf & 0x7F).astype(np.uint64) << shift.astype(np.uint64), token_start)
+
+    # tokens of a submessage: tag, length, then key/value pairs
+    tag_token = byte_token[tags]
+    is_tag = np.zeros(len(token_start), dtype=np.int64)
+    is_tag[tag_token] = 1
+    owner = np.cumsum(is_tag) - 1
+    ordinal = np.arange(len(token_start)) - tag_token[owner]
+    value_index = np.flatnonzero((ordinal >= 3) & (ordinal & 1 == 1))
+    keys = values[value_index - 1]
+    as_int32 = (values[value_index] & 0xFFFFFFFF).astype(np.uint32).view(np.int32)
+
+    real = np.zeros(len(tags), dtype=np.int32)
+    imag = np.zeros(len(tags), dtype=np.int32)
+    is_real = keys == 0x08
+    is_imag = keys == 0x10
+    real[owner[value_index[is_real]]] = as_int32[is_real]
+    imag[owner[value_index[is_imag]]] = as_int32[is_imag]
+    return real, imag, pos
+
+
+def parse_nexmon(data):
+    # Returns (real, imag, rssi, fctl, source_mac, seq_num) from a NexmonData protobuf (see csi.proto)
+    real, imag, pos = _parse_csi_region(data)
+    rssi = fctl = source_mac = seq_num = 0
+    end = len(data)
+    while pos < end:
+        key, pos = _varint(data, pos)
+        field = key >> 3
+        wire_type = key & 0x07
+        if wire_type == 2:
+            length, pos = _varint(data, pos)
+            if field == 1:
+                raise ValueError("CSI submessage after scalar fields")
+            pos += length
+        elif wire_type == 0:
+            value, pos = _varint(data, pos)
+            if field == 2:
+                rssi = _int32(value)
+            elif field == 3:
+                fctl = value
+            elif field == 4:
+                source_mac = value
+            elif field == 5:
+                seq_num = value
+        else:
+            raise ValueError(f"unexpected wire type {wire_type} for field {field}")
+    return real, imag, rssi, fctl, source_mac, seq_num
+
+
+class CSIEncoder:
+    def __init__(self, first_subcarrier=0, subcarrier_count=256, delta=False, use_zlib=False,
+                 keyframe_interval=50, zlib_level=1):
+        self.first = first_subcarrier
+        self.count = subcarrier_count
+        self.delta = delta
+        self.use_zlib = use_zlib
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.zlib_level = zlib_level
+
+        self.index = 0
+        self.reference = None
+        self.since_keyframe = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def encode(self, data):
+        real, imag, rssi, fctl, source_mac, seq_num = parse_nexmon(data)
+        n = len(real)
+        if n < self.first + self.count:
+            raise ValueError(f"frame has {n} subcarriers, selection needs {self.first + self.count}")
+
+        current = np.empty(self.count, dtype=np.complex64)
+        current.real = real[self.first:self.first + self.count]
+        current.imag = imag[self.first:self.first + self.count]
+
+        self.index = (self.index + 1) & 0xFFFFFFFF
+        flags = 0
+        reference_index = 0
+        use_delta = self.delta and self.reference is not None and self.since_keyframe < self.keyframe_interval
+        if use_delta:
+            flags |= FLAG_DELTA
+            reference_index = (self.index - 1) & 0xFFFFFFFF
+            values = current - self.reference
+            self.since_keyframe += 1
+        else:
+            values = current
+            self.since_keyframe = 1
+
+        peak = max(float(np.max(np.abs(values.real))), float(np.max(np.abs(values.imag))))
+        scale = peak / INT16_MAX if peak > 0 else 1.0
+        quantized = np.empty(2 * self.count, dtype=np.int16)
+        quantized[0::2] = np.rint(values.real / scale)
+        quantized[1::2] = np.rint(values.imag / scale)
+
+        if self.delta:
+            # keep the decoder's view of the frame so quantization errors do not accumulate
+            restored = (quantized[0::2] + 1j * quantized[1::2]).astype(np.complex64) * np.float32(scale)
+            self.reference = restored + self.reference if use_delta else restored
+
+        payload = quantized.tobytes()
+        if self.use_zlib:
+            flags |= FLAG_ZLIB
+            payload = zlib.compress(payload, self.zlib_level)
+
+        header = CODEC_HEADER.pack(CODEC_MAGIC, CODEC_VERSION, flags, self.index, reference_index,
+                                   source_mac, rssi, fctl & 0xFFFF, seq_num & 0xFFFF,
+                                   self.first, self.count, scale)
+        self.bytes_in += len(data)
+        self.bytes_out += len(header) + len(payload)
+        return header + payload
+
+    def ratio(self):
+        return self.bytes_out / self.bytes_in if self.bytes_in else 1.0
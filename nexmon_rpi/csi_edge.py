@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# Headless edge runtime: runs the magnitude pipeline on the RPi4 next to csi_forwarder_tee.py
+# the forwarder tees raw nexmon datagrams to this process (--edge-port), frames are decoded with
+# csi_codec.parse_nexmon and processed like processing/csi_magnitude_processor_rpi4.py on the laptop:
+# magnitudes with null subcarriers zeroed, moving average over ma_window spectra, mean of a subcarrier
+# range, threshold. Only one value per frame and motion start/end events are sent to the laptop
+# the threshold follows the laptop slider: "THRESHOLD:<value>" or "THRESHOLD:off" on the local control port,
+# answered with "ACK ..." (client: csi_forwarder_tee.py --control-port <port> --control <cmd>)
+# datagram: header <2sBBI> (magic "CE", version, kind, seq), then
+#   kind 1 (values): count x <df> (capture timestamp, filtered value)
+#   kind 2 (event):  <Bdf> (1 = motion start, 0 = motion end, capture timestamp, value)
+#   kind 3 (stats):  <IIff> (frames, events, mean and max processing cost per frame in microseconds)
+# must match processing/edge_parser.py on the laptop side
+import argparse
+import signal
+import socket
+import struct
+import time
+from collections import deque
+import numpy as np
+from csi_codec import parse_nexmon
+
+EDGE_MAGIC = b"CE"
+EDGE_VERSION = 1
+EDGE_HEADER = struct.Struct("<2sBBI")
+VALUE_RECORD = struct.Struct("<df")
+EVENT_RECORD = struct.Struct("<Bdf")
+STATS_RECORD = struct.Struct("<IIff")
+
+KIND_VALUES = 1
+KIND_EVENT = 2
+KIND_STATS = 3
+
+NULL_SUBCARRIERS_256 = [0, 1, 2, 3, 4, 5, 127, 128, 129, 130, 131, 251, 252, 253, 254, 255]
+
+
+class CSIEdgeRuntime:
+    def __init__(self, remote_ip, remote_port, listen_port=4402, ma_window=5,
+                 subcarrier_range=(28, 36), threshold=100.0, flush_interval=0.05, control_port=None):
+        self.remote = (remote_ip, remote_port)
+        self.listen_port = listen_port
+        self.control_port = control_port
+        self.control_sock = None
+        self.ma_window = ma_window
+        self.range_start, self.range_end = subcarrier_range
+        self.threshold = threshold
+        self.flush_interval = flush_interval
+
+        self.ma_history = deque()
+        self.in_motion = False
+        self.pending = bytearray()
+        self.pending_count = 0
+        self.last_flush = time.monotonic()
+        self.seq = 0
+
+        self.frames = 0
+        self.events = 0
+        self.decode_errors = 0
+        self.cost_total = 0.0
+        self.cost_max = 0.0
+        self.cost_frames = 0
+        self.last_stats = time.monotonic()
+
+        self.running = False
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGTERM, self._stop)
+
+    def start(self):
+        recv_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        recv_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        recv_sock.bind(("127.0.0.1", self.listen_port))
+        recv_sock.settimeout(self.flush_interval)
+        self.send_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if self.control_port:
+            self.control_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.control_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.control_sock.bind(("127.0.0.1", self.control_port))
+            self.control_sock.setblocking(False)
+
+        print(f"Edge {self.listen_port} -> {self.remote[0]}:{self.remote[1]}, "
+              f"range={self.range_start}:{self.range_end}, window={self.ma_window}, threshold={self.threshold}")
+        self.running = True
+
+        while self.running:
+            frames = []
+            try:
+                frames.append((recv_sock.recv(8192), time.time()))
+                recv_sock.setblocking(False)
+                while len(frames) < 256:
+                    frames.append((recv_sock.recv(8192), time.time()))
+            except (socket.timeout, BlockingIOError):
+                pass
+            finally:
+                recv_sock.settimeout(self.flush_interval)
+
+            if frames:
+                self.process(frames)
+
+            if self.control_sock:
+                self._on_control()
+
+            now = time.monotonic()
+            if now - self.last_flush >= self.flush_interval:
+                self._flush_values()
+            if now - self.last_stats >= 1.0:
+                self._send_stats()
+
+        self._flush_values()
+        recv_sock.close()
+        self.send_sock.close()
+        if self.control_sock:
+            self.control_sock.close()
+
+    def _on_control(self):
+        while True:
+            try:
+                data, addr = self.control_sock.recvfrom(1024)
+            except (BlockingIOError, OSError):
+                return
+            command = data.decode(errors="replace").strip()
+            if command.startswith("THRESHOLD:"):
+                value = command[len("THRESHOLD:"):]
+                try:
+                    # off never raises an event, an ongoing one ends on the next frame
+                    self.threshold = float("inf") if value == "off" else float(value)
+                    reply = f"ACK THRESHOLD {value}"
+                except ValueError:
+                    reply = f"ERR invalid threshold {value}"
+            else:
+                reply = f"ERR unknown command {command}"
+            try:
+                self.control_sock.sendto(reply.encode(), addr)
+            except OSError:
+                pass
+
+    def process(self, frames):
+        t_start = time.perf_counter()
+
+        rows = []
+        times = []
+        for data, capture_time in frames:
+            try:
+                real, imag, _, _, _, _ = parse_nexmon(data)
+            except Exception:
+                self.decode_errors += 1
+                continue
+            if len(real) != 256:
+                self.decode_errors += 1
+                continue
+            rows.append(real)
+            rows.append(imag)
+            times.append(capture_time)
+        if not times:
+            return
+
+        parts = np.asarray(rows, dtype=np.float32).reshape(len(times), 2, 256)
+        magnitudes = np.hypot(parts[:, 0], parts[:, 1])
+        magnitudes[:, NULL_SUBCARRIERS_256] = 0
+
+        # Same filter as the laptop processor: mean of the last ma_window spectra, then of the range
+        values = magnitudes[:, self.range_start:self.range_end].mean(axis=1)
+        for capture_time, value in zip(times, values):
+            self.ma_history.append(value)
+            if len(self.ma_history) > self.ma_window:
+                self.ma_history.popleft()
+            if len(self.ma_history) < self.ma_window:
+                continue
+            filtered = sum(self.ma_history) / self.ma_window
+            self._push_value(capture_time, filtered)
+            self._detect(capture_time, filtered)
+
+        elapsed = time.perf_counter() - t_start
+        per_frame = elapsed / len(times)
+        self.frames += len(times)
+        self.cost_total += elapsed
+        self.cost_frames += len(times)
+        self.cost_max = max(self.cost_max, per_frame)
+
+    def _detect(self, capture_time, value):
+        above = value > self.threshold
+        if above != self.in_motion:
+            self.in_motion = above
+            self.events += 1
+            self._send(KIND_EVENT, EVENT_RECORD.pack(1 if above else 0, capture_time, value))
+
+    def _push_value(self, capture_time, value):
+        self.pending += VALUE_RECORD.pack(capture_time, value)
+        self.pending_count += 1
+        if len(self.pending) >= 1200:
+            self._flush_values()
+
+    def _flush_values(self):
+        self.last_flush = time.monotonic()
+        if not self.pending_count:
+            return
+        self._send(KIND_VALUES, bytes(self.pending))
+        self.pending.clear()
+        self.pending_count = 0
+
+    def _send_stats(self):
+        self.last_stats = time.monotonic()
+        mean_us = 1e6 * self.cost_total / self.cost_frames if self.cost_frames else 0.0
+        max_us = 1e6 * self.cost_max
+        self._send(KIND_STATS, STATS_RECORD.pack(self.frames, self.events, mean_us, max_us))
+        if self.cost_frames:
+            print(f"frames={self.frames} events={self.events} errors={self.decode_errors} "
+                  f"cost={mean_us:.0f}us/frame (max {max_us:.0f}us)")
+        self.cost_total = 0.0
+        self.cost_max = 0.0
+        self.cost_frames = 0
+
+    def _send(self, kind, payload):
+        header = EDGE_HEADER.pack(EDGE_MAGIC, EDGE_VERSION, kind, self.seq)
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        try:
+            self.send_sock.sendto(header + payload, self.remote)
+        except OSError:
+            pass
+
+    def _stop(self, signum=None, frame=None):
+        self.running = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the CSI magnitude pipeline on the RPi and send results to the laptop")
+    parser.add_argument("remote_ip", nargs="?", default="10.42.0.1")
+    parser.add_argument("remote_port", nargs="?", type=int, default=4400)
+    parser.add_argument("--listen-port", type=int, default=4402, help="port the forwarder tees raw datagrams to")
+    parser.add_argument("--ma-window", type=int, default=5)
+    parser.add_argument("--range", default="28:36", help="subcarrier range start:end")
+    parser.add_argument("--threshold", type=lambda v: float("inf") if v == "off" else float(v), default=100.0,
+                        help="value or off")
+    parser.add_argument("--control-port", type=int, default=None, help="local port for threshold updates")
+    args = parser.parse_args()
+
+    start, end = (int(x) for x in args.range.split(":"))
+    runtime = CSIEdgeRuntime(args.remote_ip, args.remote_port, args.listen_port, args.ma_window,
+                             (start, end), args.threshold, control_port=args.control_port)
+    runtime.start()
+
+if __name__ == "__main__":
+    main()
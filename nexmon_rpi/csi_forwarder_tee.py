@@ -1,26 +1,100 @@
 #!/usr/bin/env python3
+import argparse
+import selectors
 import socket
 import struct
 import sys
 import signal
 import time
-import os
 from datetime import datetime
 from pathlib import Path
 import threading
+from csi_transport import DatagramBatcher, TCPSender
+from csi_telemetry import TelemetrySampler
+
+# Clock sync exchange with csi_io/clock_sync.py on the laptop (NTP-style, RPi side only answers)
+# request <2sBBId> (magic "CS", version, reserved, request id, laptop send time t1)
+# reply <2sBBIddd> (same header, t1, RPi receive time t2, RPi send time t3)
+SYNC_MAGIC = b"CS"
+SYNC_VERSION = 1
+SYNC_REQUEST = struct.Struct("<2sBBId")
+SYNC_REPLY = struct.Struct("<2sBBIddd")
+
+
+class CSIRecordWriter:
+    # Framed recording: file header, then one record header (length, capture timestamp, seq) per datagram
+    # records are staged in a userspace buffer and written on a size or time budget
+    # must match csi_io/csi_record_reader.py on the laptop side
+    MAGIC = b"CSIR"
+    VERSION = 1
+    FILE_HEADER = struct.Struct("<4sHHd")
+    RECORD_HEADER = struct.Struct("<IdI")
+
+    def __init__(self, filename, buffer_size=1 << 20, flush_interval=2.0):
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.buffer = bytearray()
+        self.last_flush = time.time()
+        self.file = open(filename, 'wb', buffering=0)
+        self.file.write(self.FILE_HEADER.pack(self.MAGIC, self.VERSION, 0, self.last_flush))
+
+    def write(self, data, timestamp, seq):
+        self.buffer += self.RECORD_HEADER.pack(len(data), timestamp, seq & 0xFFFFFFFF)
+        self.buffer += data
+        if len(self.buffer) >= self.buffer_size or timestamp - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def poll(self, now):
+        if self.buffer and now - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.buffer.clear()
+        self.last_flush = time.time()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
 
 class CSIForwarderTee:
-    def __init__(self, remote_ip="10.42.0.1", remote_port=4400):
+    def __init__(self, remote_ip="10.42.0.1", remote_port=4400, control_port=4401,
+                 batch_frames=0, batch_delay=0.005, codec=None, edge_port=None, forward=True,
+                 transport="udp", telemetry_interval=1.0, sync_port=None):
         self.local_port = 4400
+        self.control_port = control_port
         self.remote_ip = remote_ip
         self.remote_port = remote_port
+        self.batch_frames = batch_frames
+        self.batch_delay = batch_delay
+        self.batcher = None
+        self.transport = transport
+        self.edge_port = edge_port
+        self.forward = forward
+        self.encoder = None
+        if codec is not None:
+            # numpy is only needed on the RPi when the codec is enabled
+            from csi_codec import CSIEncoder
+            self.encoder = CSIEncoder(**codec)
+        self.encode_errors = 0
         self.save_enabled = False
         self.save_dir = "csi_captures"
         self.file_prefix = "csi"
         self.running = False
         self.recv_sock = None
         self.send_sock = None
+        self.control_sock = None
+        self.sync_port = sync_port
+        self.sync_sock = None
+        self.selector = None
         self.save_file = None
+        self.seq = 0
+        self.frames_out = 0
+        self.telemetry = TelemetrySampler(self.local_port) if telemetry_interval > 0 else None
+        self.telemetry_interval = telemetry_interval
+        self.last_telemetry = time.monotonic()
         
         signal.signal(signal.SIGINT, self._stop)
         signal.signal(signal.SIGTERM, self._stop)
@@ -30,8 +104,32 @@ class CSIForwarderTee:
             self.recv_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             self.recv_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.recv_sock.bind(("127.0.0.1", self.local_port))
+            self.recv_sock.setblocking(False)
+            
+            self.control_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.control_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.control_sock.bind(("127.0.0.1", self.control_port))
+            self.control_sock.setblocking(False)
             
             self.send_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.selector = selectors.DefaultSelector()
+            if self.transport == "tcp":
+                self.batcher = TCPSender((self.remote_ip, self.remote_port),
+                                         max(1, self.batch_frames), self.batch_delay, selector=self.selector)
+            elif self.batch_frames > 0:
+                self.batcher = DatagramBatcher(self.send_sock, (self.remote_ip, self.remote_port),
+                                               self.batch_frames, self.batch_delay)
+            
+            self.selector.register(self.recv_sock, selectors.EVENT_READ, self._on_data)
+            self.selector.register(self.control_sock, selectors.EVENT_READ, self._on_control)
+            
+            if self.sync_port:
+                # reachable from the laptop, not only locally like the control socket
+                self.sync_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                self.sync_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                self.sync_sock.bind(("0.0.0.0", self.sync_port))
+                self.sync_sock.setblocking(False)
+                self.selector.register(self.sync_sock, selectors.EVENT_READ, self._on_sync)
             return True
         except Exception as e:
             print(f"Socket error: {e}")
@@ -46,65 +144,163 @@ class CSIForwarderTee:
             if self.save_file:
                 self.save_file.close()
             
-            self.save_file = open(filename, 'wb')
+            self.save_file = CSIRecordWriter(filename)
             print(f"Saving to: {filename}")
-            return True
+            return filename
         except Exception as e:
             print(f"File error: {e}")
-            return False
+            return None
+    
+    def _on_control(self):
+        try:
+            data, addr = self.control_sock.recvfrom(1024)
+        except BlockingIOError:
+            return
+        
+        reply = self._handle_command(data.decode(errors="replace").strip())
+        try:
+            self.control_sock.sendto(reply.encode(), addr)
+        except OSError as e:
+            print(f"Control reply error: {e}")
     
-    def _check_control(self):
+    def _on_sync(self):
+        try:
+            data, addr = self.sync_sock.recvfrom(64)
+        except BlockingIOError:
+            return
+        receive_time = time.time()
+        if len(data) != SYNC_REQUEST.size:
+            return
+        magic, version, _, request_id, t1 = SYNC_REQUEST.unpack(data)
+        if magic != SYNC_MAGIC or version != SYNC_VERSION:
+            return
         try:
-            if os.path.exists("/tmp/csi_control"):
-                with open("/tmp/csi_control", 'r') as f:
-                    cmd = f.read().strip()
-                os.remove("/tmp/csi_control")
-                
-                if cmd.startswith("ENABLE_SAVE:"):
-                    parts = cmd.split(":")
-                    if len(parts) >= 3:
-                        self.save_dir = parts[1]
-                        self.file_prefix = parts[2]
-                    if self._open_save_file():
-                        self.save_enabled = True
-                        print("Save ON")
-                        
-                elif cmd == "DISABLE_SAVE":
-                    if self.save_file:
-                        self.save_file.close()
-                        self.save_file = None
-                    self.save_enabled = False
-                    print("Save OFF")
-        except:
+            self.sync_sock.sendto(SYNC_REPLY.pack(SYNC_MAGIC, SYNC_VERSION, 0, request_id, t1, receive_time, time.time()), addr)
+        except OSError:
             pass
     
-    def start(self):
-        if not self._setup_sockets():
-            return False
+    def _handle_command(self, cmd):
+        if cmd.startswith("ENABLE_SAVE:"):
+            parts = cmd.split(":")
+            if len(parts) >= 3:
+                self.save_dir = parts[1]
+                self.file_prefix = parts[2]
+            filename = self._open_save_file()
+            if not filename:
+                return "ERR ENABLE_SAVE cannot open file"
+            self.save_enabled = True
+            print("Save ON")
+            return f"ACK ENABLE_SAVE {filename}"
         
-        print(f"Forward {self.local_port} -> {self.remote_ip}:{self.remote_port}")
-        self.running = True
+        if cmd == "DISABLE_SAVE":
+            if self.save_file:
+                self.save_file.close()
+                self.save_file = None
+            self.save_enabled = False
+            print("Save OFF")
+            return "ACK DISABLE_SAVE"
         
-        while self.running:
-            self._check_control()
-            
-            self.recv_sock.settimeout(0.1)
+        if cmd == "STATUS":
+            status = f"ACK STATUS seq={self.seq} save={'on' if self.save_enabled else 'off'}"
+            if self.batcher:
+                status += f" tseq={self.batcher.transport_seq} send_errors={self.batcher.send_errors}"
+                if self.transport == "tcp":
+                    status += f" dropped={self.batcher.dropped} reconnects={self.batcher.reconnects}"
+            if self.encoder:
+                status += f" codec_ratio={self.encoder.ratio():.3f} encode_errors={self.encode_errors}"
+            return status
+        
+        return f"ERR unknown command {cmd!r}"
+    
+    def _on_data(self):
+        # Drain every queued datagram before going back to select
+        while True:
             try:
                 data, addr = self.recv_sock.recvfrom(8192)
-            except socket.timeout:
-                continue
+            except BlockingIOError:
+                return
+            capture_time = time.time()
+            self.seq += 1
             
-            try:
-                self.send_sock.sendto(data, (self.remote_ip, self.remote_port))
-            except:
+            if self.edge_port:
+                try:
+                    self.send_sock.sendto(data, ("127.0.0.1", self.edge_port))
+                except OSError:
+                    pass
+            
+            payload = data if self.forward else None
+            if self.encoder and payload is not None:
+                try:
+                    payload = self.encoder.encode(data)
+                except Exception:
+                    self.encode_errors += 1
+                    payload = None
+            
+            if payload is None:
                 pass
+            elif self.batcher:
+                self.batcher.add(payload, capture_time)
+            else:
+                try:
+                    self.send_sock.sendto(payload, (self.remote_ip, self.remote_port))
+                    self.frames_out += 1
+                except:
+                    pass
             
             if self.save_enabled and self.save_file:
                 try:
-                    self.save_file.write(data)
-                    self.save_file.flush()
+                    self.save_file.write(data, capture_time, self.seq)
                 except:
                     pass
+    
+    def _send_telemetry(self, now):
+        # Sent even with --no-forward, the laptop keeps its health view in edge mode
+        self.last_telemetry = now
+        dropped = self.encode_errors
+        frames_out = self.frames_out
+        if self.batcher:
+            frames_out = self.batcher.frames_sent
+            dropped += self.batcher.send_errors + getattr(self.batcher, "dropped", 0)
+        record = self.telemetry.record(self.seq, frames_out, dropped)
+        if self.batcher and self.forward:
+            self.batcher.add(record, time.time())
+        else:
+            try:
+                self.send_sock.sendto(record, (self.remote_ip, self.remote_port))
+            except OSError:
+                pass
+    
+    def start(self):
+        if not self._setup_sockets():
+            return False
+        
+        print(f"Forward {self.local_port} -> {self.remote_ip}:{self.remote_port}, control on 127.0.0.1:{self.control_port}")
+        if self.batcher:
+            print(f"{self.transport.upper()}: batching up to {self.batch_frames} frames or {self.batch_delay * 1000:.1f} ms per write")
+        self.running = True
+        
+        while self.running:
+            timeout = 0.1
+            if self.batcher:
+                deadline = self.batcher.time_to_deadline()
+                if deadline is not None:
+                    timeout = min(timeout, deadline)
+            try:
+                events = self.selector.select(timeout=timeout)
+            except InterruptedError:
+                continue
+            
+            for key, _ in events:
+                key.data()
+            
+            if self.batcher:
+                self.batcher.poll()
+            if self.save_file:
+                self.save_file.poll(time.time())
+            if self.telemetry:
+                now = time.monotonic()
+                if now - self.last_telemetry >= self.telemetry_interval:
+                    self._send_telemetry(now)
         
         self._cleanup()
         return True
@@ -113,18 +309,74 @@ class CSIForwarderTee:
         self.running = False
     
     def _cleanup(self):
+        if self.batcher:
+            self.batcher.flush()
+            if self.transport == "tcp":
+                self.batcher.close()
+        if self.selector:
+            self.selector.close()
         if self.recv_sock:
             self.recv_sock.close()
+        if self.control_sock:
+            self.control_sock.close()
+        if self.sync_sock:
+            self.sync_sock.close()
         if self.send_sock:
             self.send_sock.close()
         if self.save_file:
             self.save_file.close()
 
+
+def send_control(cmd, control_port=4401, timeout=2.0):
+    # Client side of the control channel, used over SSH by remote/rpi_device.py
+    # prints the forwarder reply and exits non-zero when there is no ACK
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(timeout)
+    try:
+        sock.sendto(cmd.encode(), ("127.0.0.1", control_port))
+        reply, _ = sock.recvfrom(1024)
+        reply = reply.decode(errors="replace")
+    except socket.timeout:
+        reply = "ERR no reply from forwarder"
+    finally:
+        sock.close()
+    print(reply)
+    return 0 if reply.startswith("ACK") else 1
+
+
 def main():
-    remote_ip = sys.argv[1] if len(sys.argv) > 1 else "10.42.0.1"
-    remote_port = int(sys.argv[2]) if len(sys.argv) > 2 else 4400
+    parser = argparse.ArgumentParser(description="Forward nexmon CSI datagrams to the laptop and optionally record them")
+    parser.add_argument("remote_ip", nargs="?", default="10.42.0.1")
+    parser.add_argument("remote_port", nargs="?", type=int, default=4400)
+    parser.add_argument("--control-port", type=int, default=4401)
+    parser.add_argument("--transport", choices=("udp", "tcp"), default="udp")
+    parser.add_argument("--batch", type=int, default=0, help="frames per datagram, 0 sends raw datagrams")
+    parser.add_argument("--batch-delay-ms", type=float, default=5.0)
+    parser.add_argument("--edge-port", type=int, default=None, help="also send raw datagrams to csi_edge.py on this local port")
+    parser.add_argument("--no-forward", action="store_true", help="do not send CSI to the laptop (edge mode)")
+    parser.add_argument("--codec", action="store_true", help="send frames with the compact codec of csi_codec.py")
+    parser.add_argument("--codec-first", type=int, default=0, help="first forwarded subcarrier")
+    parser.add_argument("--codec-count", type=int, default=256, help="number of forwarded subcarriers")
+    parser.add_argument("--codec-delta", action="store_true", help="delta code against the previous frame")
+    parser.add_argument("--codec-zlib", action="store_true")
+    parser.add_argument("--codec-keyframe", type=int, default=50, help="frames between two keyframes")
+    parser.add_argument("--telemetry-interval", type=float, default=1.0, help="seconds between health records, 0 disables")
+    parser.add_argument("--sync-port", type=int, default=None, help="answer clock sync requests from the laptop on this port")
+    parser.add_argument("--control", metavar="CMD", help="send CMD to a running forwarder and print its reply")
+    args = parser.parse_args()
+    
+    if args.control:
+        sys.exit(send_control(args.control, args.control_port))
+    
+    codec = None
+    if args.codec:
+        codec = dict(first_subcarrier=args.codec_first, subcarrier_count=args.codec_count,
+                     delta=args.codec_delta, use_zlib=args.codec_zlib, keyframe_interval=args.codec_keyframe)
     
-    forwarder = CSIForwarderTee(remote_ip, remote_port)
+    forwarder = CSIForwarderTee(args.remote_ip, args.remote_port, args.control_port,
+                                args.batch, args.batch_delay_ms / 1000.0, codec,
+                                args.edge_port, not args.no_forward, args.transport,
+                                args.telemetry_interval, args.sync_port)
     forwarder.start()
 
 if __name__ == "__main__":
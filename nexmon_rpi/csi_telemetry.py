@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# Sniffer health telemetry sent by the forwarder on the data channel, about once per second
+# read from /proc and /sys without extra processes: CPU load (/proc/stat deltas), memory (/proc/meminfo),
+# SoC temperature (thermal_zone0), kernel drops of the capture socket (/proc/net/udp) and UDP buffer errors
+# (/proc/net/snmp), plus the forwarder counters
+# record: <2sBBdIIIIIfff> (magic "CT", version, reserved, timestamp, frames in, frames out, dropped,
+# capture socket drops, udp receive buffer errors, cpu %, memory %, temperature in C)
+# it travels like a CSI frame (inside a batch, a TCP frame or its own datagram)
+# must match csi_io/csi_telemetry.py on the laptop side
+import struct
+import time
+
+TELEMETRY_MAGIC = b"CT"
+TELEMETRY_VERSION = 1
+TELEMETRY_RECORD = struct.Struct("<2sBBdIIIIIfff")
+
+U32 = 0xFFFFFFFF
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return ""
+
+
+class TelemetrySampler:
+    def __init__(self, local_port=4400):
+        self.local_port_hex = f"{local_port:04X}"
+        self.last_cpu = self._cpu_times()
+
+    def _cpu_times(self):
+        line = _read("/proc/stat").split("\n", 1)[0].split()
+        if not line or line[0] != "cpu":
+            return None
+        values = [int(v) for v in line[1:]]
+        idle = values[3] + (values[4] if len(values) > 4 else 0)
+        return sum(values), idle
+
+    def cpu_percent(self):
+        current = self._cpu_times()
+        previous, self.last_cpu = self.last_cpu, current
+        if not current or not previous or current[0] == previous[0]:
+            return 0.0
+        total = current[0] - previous[0]
+        idle = current[1] - previous[1]
+        return 100.0 * (total - idle) / total
+
+    def memory_percent(self):
+        info = {}
+        for line in _read("/proc/meminfo").splitlines():
+            key, _, value = line.partition(":")
+            info[key] = value.split()[0] if value.split() else "0"
+        total = int(info.get("MemTotal", 0))
+        available = int(info.get("MemAvailable", 0))
+        return 100.0 * (total - available) / total if total else 0.0
+
+    def temperature(self):
+        value = _read("/sys/class/thermal/thermal_zone0/temp").strip()
+        return int(value) / 1000.0 if value else 0.0
+
+    def socket_drops(self):
+        # last column of /proc/net/udp for the socket bound to the capture port
+        for line in _read("/proc/net/udp").splitlines()[1:]:
+            fields = line.split()
+            if len(fields) > 12 and fields[1].endswith(":" + self.local_port_hex):
+                return int(fields[-1])
+        return 0
+
+    def udp_buffer_errors(self):
+        lines = [line.split() for line in _read("/proc/net/snmp").splitlines() if line.startswith("Udp:")]
+        if len(lines) < 2 or "RcvbufErrors" not in lines[0]:
+            return 0
+        return int(lines[1][lines[0].index("RcvbufErrors")])
+
+    def record(self, frames_in, frames_out, dropped):
+        return TELEMETRY_RECORD.pack(TELEMETRY_MAGIC, TELEMETRY_VERSION, 0, time.time(),
+                                     frames_in & U32, frames_out & U32, dropped & U32,
+                                     self.socket_drops() & U32, self.udp_buffer_errors() & U32,
+                                     self.cpu_percent(), self.memory_percent(), self.temperature())
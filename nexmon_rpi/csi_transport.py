@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# Transport framing between the RPi forwarders and the laptop
+# several CSI frames are packed into one datagram, flushed on frame count, byte budget or delay
+# datagram: header <2sBBI> (magic "CB", version, frame count, transport seq)
+# then per frame <Hd> (frame length, RPi capture timestamp) followed by the frame bytes
+# must match csi_io/csi_transport.py on the laptop side
+import errno
+import os
+import select
+import selectors
+import socket
+import struct
+import time
+
+BATCH_MAGIC = b"CB"
+BATCH_VERSION = 1
+BATCH_HEADER = struct.Struct("<2sBBI")
+FRAME_HEADER = struct.Struct("<Hd")
+
+
+class DatagramBatcher:
+    def __init__(self, sock, address, max_frames=16, max_delay=0.005, max_bytes=8192):
+        self.sock = sock
+        self.address = address
+        self.max_frames = max(1, min(max_frames, 255))
+        self.max_delay = max_delay
+        self.max_bytes = max_bytes
+        self.transport_seq = 0
+        self.frames_sent = 0
+        self.datagrams_sent = 0
+        self.send_errors = 0
+
+        self.buffer = bytearray(BATCH_HEADER.size)
+        self.count = 0
+        self.first_time = 0.0
+
+    def add(self, data, capture_time):
+        if self.count and len(self.buffer) + FRAME_HEADER.size + len(data) > self.max_bytes:
+            self.flush()
+        if self.count == 0:
+            self.first_time = time.monotonic()
+        self.buffer += FRAME_HEADER.pack(len(data), capture_time)
+        self.buffer += data
+        self.count += 1
+        if self.count >= self.max_frames:
+            self.flush()
+
+    def poll(self, now=None):
+        if self.count and (now if now is not None else time.monotonic()) - self.first_time >= self.max_delay:
+            self.flush()
+
+    def time_to_deadline(self, now=None):
+        if not self.count:
+            return None
+        now = now if now is not None else time.monotonic()
+        return max(0.0, self.first_time + self.max_delay - now)
+
+    def flush(self):
+        if not self.count:
+            return
+        BATCH_HEADER.pack_into(self.buffer, 0, BATCH_MAGIC, BATCH_VERSION, self.count, self.transport_seq)
+        try:
+            self.sock.sendto(self.buffer, self.address)
+            self.frames_sent += self.count
+            self.datagrams_sent += 1
+        except OSError:
+            self.send_errors += 1
+        self.transport_seq = (self.transport_seq + 1) & 0xFFFFFFFF
+        del self.buffer[BATCH_HEADER.size:]
+        self.count = 0
+
+
+# TCP stream: each frame is <Id> (frame length, RPi capture timestamp) followed by the frame bytes
+# frames are queued and written with one sendmsg call on the same count/delay budget as datagrams
+# the connection is re-established with exponential backoff, frames queued while down are dropped
+# connecting never blocks the forwarder loop: connect_ex on a non-blocking socket, registered for EVENT_WRITE in
+# the forwarder selector, the result is read from SO_ERROR when it becomes writable, an attempt still pending
+# after connect_timeout is abandoned
+TCP_FRAME_HEADER = struct.Struct("<Id")
+
+
+class TCPSender:
+    def __init__(self, address, max_frames=16, max_delay=0.005, max_backoff=5.0, selector=None, connect_timeout=2.0):
+        self.address = address
+        self.max_frames = max(1, min(max_frames, 256))    # two iovecs per frame, below IOV_MAX
+        self.max_delay = max_delay
+        self.max_backoff = max_backoff
+        self.selector = selector
+        self.connect_timeout = connect_timeout
+        self.sock = None
+        self.connecting = None      # socket of the pending non-blocking connect
+        self.connect_deadline = 0.0
+        self.backoff = 0.1
+        self.next_attempt = 0.0
+        self.transport_seq = 0
+        self.frames_sent = 0
+        self.send_errors = 0
+        self.dropped = 0
+        self.reconnects = 0
+
+        self.parts = []
+        self.count = 0
+        self.first_time = 0.0
+
+    def _connect(self):
+        now = time.monotonic()
+        if self.connecting or now < self.next_attempt:
+            return
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        err = sock.connect_ex(self.address)
+        if err not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+            sock.close()
+            self._retry(now, os.strerror(err))
+            return
+        self.connecting = sock
+        self.connect_deadline = now + self.connect_timeout
+        if self.selector:
+            self.selector.register(sock, selectors.EVENT_WRITE, self._on_connect)
+        if err == 0:
+            self._on_connect()
+
+    def _on_connect(self):
+        # writable: the connect finished, SO_ERROR holds its result
+        sock = self.connecting
+        self._stop_connecting()
+        err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if err:
+            sock.close()
+            self._retry(time.monotonic(), os.strerror(err))
+            return
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 20)
+        sock.settimeout(1.0)
+        self.sock = sock
+        self.backoff = 0.1
+        self.reconnects += 1
+        print(f"TCP connected to {self.address[0]}:{self.address[1]}")
+
+    def _stop_connecting(self):
+        if self.selector:
+            try:
+                self.selector.unregister(self.connecting)
+            except (KeyError, ValueError):
+                pass
+        self.connecting = None
+
+    def _check_connecting(self, now):
+        if not self.connecting:
+            return
+        if not self.selector and select.select([], [self.connecting], [], 0)[1]:
+            # no event loop reports writability, polled here instead
+            self._on_connect()
+            return
+        if now >= self.connect_deadline:
+            sock = self.connecting
+            self._stop_connecting()
+            sock.close()
+            self._retry(now, "timed out")
+
+    def _retry(self, now, reason):
+        self.next_attempt = now + self.backoff
+        print(f"TCP connect failed ({reason}), retry in {self.backoff:.1f}s")
+        self.backoff = min(self.backoff * 2, self.max_backoff)
+
+    def _disconnect(self):
+        if self.connecting:
+            sock = self.connecting
+            self._stop_connecting()
+            sock.close()
+        if self.sock:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+        self.next_attempt = time.monotonic() + self.backoff
+
+    def add(self, data, capture_time):
+        if self.count == 0:
+            self.first_time = time.monotonic()
+        self.parts.append(TCP_FRAME_HEADER.pack(len(data), capture_time))
+        self.parts.append(data)
+        self.count += 1
+        if self.count >= self.max_frames:
+            self.flush()
+
+    def poll(self, now=None):
+        now = now if now is not None else time.monotonic()
+        self._check_connecting(now)
+        if self.count and now - self.first_time >= self.max_delay:
+            self.flush()
+
+    def time_to_deadline(self, now=None):
+        if not self.count:
+            return None
+        now = now if now is not None else time.monotonic()
+        return max(0.0, self.first_time + self.max_delay - now)
+
+    def flush(self):
+        if not self.count:
+            return
+        parts = self.parts
+        count = self.count
+        self.parts = []
+        self.count = 0
+
+        if self.sock is None:
+            # frames of the attempt are dropped, the next flush sends on the new connection
+            self._connect()
+            if self.sock is None:
+                self.dropped += count
+                return
+        try:
+            total = sum(len(p) for p in parts)
+            sent = self.sock.sendmsg(parts)
+            if sent < total:
+                self.sock.sendall(b"".join(parts)[sent:])
+            self.frames_sent += count
+            self.transport_seq = (self.transport_seq + 1) & 0xFFFFFFFF
+        except OSError as e:
+            print(f"TCP send failed ({e}), reconnecting")
+            self.send_errors += 1
+            self.dropped += count
+            self._disconnect()
+
+    def close(self):
+        self.flush()
+        self._disconnect()
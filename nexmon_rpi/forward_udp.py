@@ -1,4 +1,6 @@
 import socket
+import time
+from csi_transport import DatagramBatcher
 
 LOCAL_IP = "127.0.0.1"
 LOCAL_PORT = 4400
@@ -8,6 +10,9 @@ LAPTOP_PORT = 4400
 
 BUFFER_SIZE = 8192  # Ajust to CSI packets size
 
+BATCH_FRAMES = 0  # Frames per datagram (see csi_transport.py), 0 forwards raw datagrams
+BATCH_DELAY = 0.005
+
 # Local loopback
 recv_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 recv_sock.bind((LOCAL_IP, LOCAL_PORT))
@@ -17,6 +22,18 @@ send_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 
 print(f"Forwarding UDP from {LOCAL_IP}:{LOCAL_PORT} to {LAPTOP_IP}:{LAPTOP_PORT}...")
 
-while True:
-    data, addr = recv_sock.recvfrom(BUFFER_SIZE)
-    send_sock.sendto(data, (LAPTOP_IP, LAPTOP_PORT))
+if BATCH_FRAMES > 0:
+    batcher = DatagramBatcher(send_sock, (LAPTOP_IP, LAPTOP_PORT), BATCH_FRAMES, BATCH_DELAY)
+    while True:
+        deadline = batcher.time_to_deadline()
+        recv_sock.settimeout(None if deadline is None else max(deadline, 0.0001))
+        try:
+            data, addr = recv_sock.recvfrom(BUFFER_SIZE)
+            batcher.add(data, time.time())
+        except socket.timeout:
+            pass
+        batcher.poll()
+else:
+    while True:
+        data, addr = recv_sock.recvfrom(BUFFER_SIZE)
+        send_sock.sendto(data, (LAPTOP_IP, LAPTOP_PORT))
@@ -1,11 +1,18 @@
 # processing/bcm4366c0_parser.py
 # parser for bcm4366c0 broadcom chips
-# receives csi_data signal, accumulates 332-byte packets
-# parses timestamp and raw CSI bytes
-# stores raw CSI data in shared circular buffer for downstream processing
+# receives csi_data signal with a pcap byte stream (live tcpdump -w - or chunks of a capture)
+# records are framed with their pcap header length, every complete record of the buffer is parsed
+# by offset in one pass and the consumed prefix is dropped once, CSI records are 332 bytes
+# parses timestamp, 802.11 sequence number and core of every record, the packed CSI of all the records of a pass
+# is decoded at once (decode_csi)
+# MIMO assembly: the cores of one transmission are grouped by sequence number into an [antennas, subcarriers]
+# tensor, incomplete transmissions are dropped when they leave the reorder window
+# stores {'timestamp', 'seq', 'csi'} frames in shared circular buffer for downstream processing
 
 import struct
 from collections import deque
+import numpy as np
+from config.settings import ROUTER_ANTENNAS, MIMO_REORDER_WINDOW
 from processing.csi_parser import CSIParser
 
 
@@ -15,33 +22,46 @@ class BCM4366C0Parser(CSIParser):
     CSI_INDEX = PACKET_SIZE_BYTES - CSI_SIZE_BYTES
     DATA_INDEX = CSI_INDEX + 18
     DATA_SIZE_BYTES = 256
+    SUBCARRIERS = 64
+    SEQ_INDEX = CSI_INDEX + 10
+
+    RECORD_HEADER = struct.Struct('<IIII')
+    MAX_RECORD_SIZE = 1 << 16
 
     MAGIC_NUM_MICRO = 0xA1B2C3D4
     MAGIC_NUM_NANO = 0xA1B23CD4
 
     CORE_TO_ANTENNA = {0: 2, 1: 0, 2: -1, 3: 1}
 
-    def __init__(self, signals, logger, buffer, mutex, stop_event):
+    def __init__(self, signals, logger, buffer, mutex, stop_event, profiler=None):
         super().__init__()
         self.signals = signals
         self.logger = logger
         self.buffer = buffer
         self.mutex = mutex
         self.stop_event = stop_event
+        self.profiler = profiler
 
         self.time_shift_power = 0
         self.is_setup_complete = False
 
         self.internal_queue = deque()
         self.internal_buffer = bytearray()
+        self.pending = {}
+        self.frame_count = 0
+        self.incomplete_frames = 0
 
         self.signals.csi_data.connect(self.on_new_data)
 
     def run(self):
         while not self.stop_event.is_set():
+            if self.profiler:
+                self.profiler.checkpoint("parser")
             if self.internal_queue:
                 self.process_queued_data()
             self.msleep(1)
+        if self.profiler:
+            self.profiler.finish("parser")
 
     def on_new_data(self, data: bytes, timestamp: float) -> None:
         try:
@@ -57,54 +77,108 @@ class BCM4366C0Parser(CSIParser):
             print(f"Parse error: {e}")
 
     def setup(self, data: bytes):
-        if self.is_setup_complete or len(data) < 32:
+        # a live tcpdump may write the 24-byte global header alone or split over chunks, the queued chunks are
+        # accumulated until it is complete, start_time then comes from the first record
+        if self.is_setup_complete or sum(len(chunk) for chunk in self.internal_queue) < 24:
             return
         try:
-            magic_number = struct.unpack('<I', data[:4])[0]
+            head = b"".join(self.internal_queue)
+            magic_number = struct.unpack('<I', head[:4])[0]
             self.time_shift_power = 6 if magic_number == self.MAGIC_NUM_MICRO else 9
-            time_primary = data[24:28]
-            time_secondary = data[28:32]
-            self.start_time = self.parse_time(time_primary, time_secondary)
-            if self.internal_queue:
-                packet = self.internal_queue.popleft()
-                self.internal_queue.appendleft(packet[24:])
+            self.start_time = None
+            self.internal_queue.clear()
+            self.internal_queue.append(head[24:])
             self.is_setup_complete = True
         except Exception as e:
             self.logger.failure(__file__, "<setup>: setup failed")
             print(f"Setup error: {e}")
 
     def process_queued_data(self):
-        while self.internal_queue or len(self.internal_buffer) >= self.PACKET_SIZE_BYTES:
-            if len(self.internal_buffer) < self.PACKET_SIZE_BYTES:
-                if self.internal_queue:
-                    self.internal_buffer.extend(self.internal_queue.popleft())
-                    continue
-                else:
-                    break
-
-            packet_core = self.internal_buffer[self.CSI_INDEX + 13]
-            antenna = self.CORE_TO_ANTENNA.get(packet_core, -1)
-            if antenna != -1:
-                try:
-                    time_primary = self.internal_buffer[0:4]
-                    time_secondary = self.internal_buffer[4:8]
-                    packet_time = self.parse_time(time_primary, time_secondary)
-                    relative_time = packet_time - self.start_time
-
-                    raw_csi = self.internal_buffer[self.DATA_INDEX:self.DATA_INDEX + self.DATA_SIZE_BYTES]
-
-                    csi_packet = {
-                        'antenna': antenna,
-                        'timestamp': relative_time,
-                        'raw_csi': raw_csi
-                    }
-                    self.buffer.put(csi_packet, self.mutex)
-
-                except Exception as e:
-                    self.logger.failure(__file__, "<process_queued_data>: failed to process")
-                    print(f"Packet processing error: {e}")
-
-            self.internal_buffer = self.internal_buffer[self.PACKET_SIZE_BYTES:]
+        if not self.is_setup_complete:
+            return
+        while self.internal_queue:
+            self.internal_buffer += self.internal_queue.popleft()
+
+        data = self.internal_buffer
+        end = len(data)
+        pos = 0
+        header_size = self.RECORD_HEADER.size
+        time_divisor = 10 ** self.time_shift_power
+        seqs, antennas, times, records = [], [], [], []
+        while pos + header_size <= end:
+            ts_primary, ts_secondary, captured, _ = self.RECORD_HEADER.unpack_from(data, pos)
+            if self.start_time is None:
+                self.start_time = ts_primary + ts_secondary / time_divisor
+            if captured > self.MAX_RECORD_SIZE:
+                self.logger.failure(__file__, f"<process_queued_data>: invalid record length {captured}, resynchronizing")
+                pos = end
+                break
+            record_end = pos + header_size + captured
+            if record_end > end:
+                break
+
+            if header_size + captured == self.PACKET_SIZE_BYTES:
+                antenna = self.CORE_TO_ANTENNA.get(data[pos + self.CSI_INDEX + 13], -1)
+                if 0 <= antenna < ROUTER_ANTENNAS:
+                    start = pos + self.DATA_INDEX
+                    seqs.append((data[pos + self.SEQ_INDEX] | data[pos + self.SEQ_INDEX + 1] << 8) >> 4)
+                    antennas.append(antenna)
+                    times.append(ts_primary + ts_secondary / time_divisor - self.start_time)
+                    records.append(bytes(data[start:start + self.DATA_SIZE_BYTES]))
+
+            pos = record_end
+
+        if pos:
+            del self.internal_buffer[:pos]
+        if records:
+            try:
+                self._assemble(seqs, antennas, times, self.decode_csi(b"".join(records)))
+            except Exception as e:
+                self.logger.failure(__file__, f"<process_queued_data>: failed to process - {e}")
+
+    def _assemble(self, seqs, antennas, times, csi):
+        # the cores of one transmission share its sequence number, their records are collected in a reorder
+        # window keyed by seq and the [antennas, subcarriers] tensor is stored once every antenna is in
+        complete_mask = (1 << ROUTER_ANTENNAS) - 1
+        for seq, antenna, timestamp, row in zip(seqs, antennas, times, csi):
+            frame = self.pending.get(seq)
+            if frame is None:
+                frame = self.pending[seq] = [timestamp, np.zeros((ROUTER_ANTENNAS, self.SUBCARRIERS), dtype=np.complex64), 0]
+            frame[1][antenna] = row
+            frame[2] |= 1 << antenna
+            if frame[2] == complete_mask:
+                del self.pending[seq]
+                self.buffer.put({'timestamp': frame[0], 'seq': seq, 'csi': frame[1]}, self.mutex)
+                self.frame_count += 1
+                if self.frame_count % 1000 == 0:
+                    self.logger.success(__file__, f"<_assemble>: {self.frame_count} frames, {self.incomplete_frames} incomplete")
+            elif len(self.pending) > MIMO_REORDER_WINDOW:
+                # dicts keep insertion order, the oldest transmission will not complete anymore
+                del self.pending[next(iter(self.pending))]
+                self.incomplete_frames += 1
+
+    @classmethod
+    def decode_csi(cls, records: bytes) -> np.ndarray:
+        # bcm packed CSI, [N records x 64 words] -> [N, 64] complex in frequency order
+        # word: 11-bit real and imaginary mantissas with sign bits, shared 6-bit signed exponent per subcarrier,
+        # every record is rescaled so its largest value has 10 significant bits, values under 2^-12 flush to 0
+        words = np.frombuffer(records, dtype='<u4').reshape(-1, cls.SUBCARRIERS).astype(np.int64)
+        real = (words >> 18) & 0x7FF
+        imag = (words >> 6) & 0x7FF
+        exponent = words & 0x3F
+        exponent = np.where(exponent >= 32, exponent - 64, exponent)
+
+        mantissa = real | imag
+        top_bit = np.frexp(mantissa.astype(np.float64))[1] - 1
+        max_bit = np.max(np.where(mantissa > 0, exponent + top_bit, -32), axis=1)
+        shift = exponent + (10 - max_bit)[:, None]
+        scale = np.where(shift < -12, 0.0, np.ldexp(1.0, shift))
+
+        real = np.floor(real * scale)
+        imag = np.floor(imag * scale)
+        real[(words & (1 << 29)) != 0] *= -1
+        imag[(words & (1 << 17)) != 0] *= -1
+        return np.fft.fftshift(real + 1j * imag, axes=-1).astype(np.complex64)
 
     def parse_time(self, time_primary: bytes, time_secondary: bytes) -> float:
         primary = struct.unpack('<I', time_primary)[0]
@@ -114,6 +188,7 @@ class BCM4366C0Parser(CSIParser):
     def reset(self):
         self.internal_queue.clear()
         self.internal_buffer.clear()
+        self.pending.clear()
         self.time_shift_power = 0
         self.start_time = 0.0
         self.is_setup_complete = False
@@ -0,0 +1,155 @@
+# processing/csi_breathing_processor.py
+# CSI breathing processor thread, periodic low-frequency motion (PROCESSING_METHOD = "breathing", RPi4 or ASUS)
+# magnitudes are resampled onto the uniform grid (csi_resampler.py) and decimated to BREATHING_RATE_HZ by the
+# polyphase decimator (csi_decimator.py)
+# breathing signal per decimated frame: mean magnitude of SUBCARRIER_RANGE (RPi4) or of SUBCARRIER over the
+# antennas (ASUS), or with PCA_COMPONENTS > 0 the first streaming PCA projection over all subcarriers (csi_pca.py)
+# a sliding DFT bank (csi_sliding_dft.py) of BREATHING_BINS frequencies between BREATHING_MIN_HZ and
+# BREATHING_MAX_HZ over BREATHING_WINDOW seconds is updated per decimated sample, O(bins) each
+# rate: strongest bin refined by parabolic interpolation, confidence: share of the band power in the peak and
+# its two neighbours
+# emits fft_data with the rate in breaths per minute for the chart ('rate' in Hz and 'confidence' added),
+# threshold_exceeded when a confident rate is above the threshold (breaths per minute)
+# with DETECTOR = "adaptive" the decimated magnitudes also feed the motion detector, no rate during an episode
+
+import numpy as np
+from config.settings import (THRESHOLD_VALUE, THRESHOLD_DISABLED, SUBCARRIER_RANGE, SUBCARRIER, PING_RATE_HZ,
+                             RESAMPLE_RATE_HZ, PCA_COMPONENTS, BREATHING_RATE_HZ, BREATHING_WINDOW,
+                             BREATHING_MIN_HZ, BREATHING_MAX_HZ, BREATHING_BINS, BREATHING_MIN_CONFIDENCE)
+from processing.csi_processor import CSIProcessor
+from processing.csi_resampler import CSIResampler
+from processing.csi_decimator import PolyphaseDecimator
+from processing.csi_pca import StreamingPCA
+from processing.csi_sliding_dft import SlidingDFT
+
+
+class CSIBreathingProcessor(CSIProcessor):
+    SUBCARRIERS = 256
+
+    def __init__(self, signals, buffer, mutex, logger, stop_event, batch_size=10, profiler=None, sniffer=None):
+        super().__init__(signals, buffer, mutex, logger, stop_event, batch_size, profiler, sniffer)
+        self.threshold_value = THRESHOLD_VALUE
+        rate = RESAMPLE_RATE_HZ if RESAMPLE_RATE_HZ > 0 else PING_RATE_HZ
+        self.resampler = CSIResampler(rate)
+        self.restarts = 0
+        self.decimator = PolyphaseDecimator(rate, min(BREATHING_RATE_HZ, rate), logger=logger)
+        self.rate = self.decimator.rate
+        self.pca = StreamingPCA(1) if PCA_COMPONENTS > 0 else None
+        self.frequencies = np.linspace(BREATHING_MIN_HZ, BREATHING_MAX_HZ, BREATHING_BINS)
+        self.bank = SlidingDFT(self.frequencies, self.rate, int(round(BREATHING_WINDOW * self.rate)))
+
+        self.columns = None         # flattened magnitude columns averaged into the breathing signal
+
+    def process_batch(self, data_batch, time_batch):
+        try:
+            packets = [p for p in data_batch if isinstance(p, dict) and ('raw_csi' in p or 'csi' in p)]
+            if not packets:
+                if self.logger:
+                    self.logger.failure(__file__, "<process_batch>: no CSI found")
+                return
+
+            if 'csi' in packets[0]:
+                # [N, antennas, subcarriers] assembled MIMO frames
+                spectra = np.abs(np.stack([p['csi'] for p in packets]))
+            else:
+                csi = np.frombuffer(b"".join(p['raw_csi'] for p in packets), dtype=np.complex64)
+                if csi.size != self.SUBCARRIERS * len(packets):
+                    if self.logger:
+                        self.logger.failure(__file__, f"<process_batch>: expected {self.SUBCARRIERS} complex values per frame")
+                    return
+                spectra = np.abs(csi.reshape(len(packets), self.SUBCARRIERS))
+            if self.columns is None:
+                self._setup_columns(spectra.shape)
+            spectra = spectra.reshape(len(spectra), -1)
+            times = np.fromiter((p['timestamp'] for p in packets), dtype=np.float64, count=len(packets))
+            seqs = [p.get('seq') for p in packets]
+
+            times, spectra, _ = self.resampler.resample(times, spectra, None if None in seqs else seqs)
+            if not len(spectra):
+                return
+            if self.resampler.restarts != self.restarts:
+                # the grid restarted after a long gap, the window must not span it
+                self.restarts = self.resampler.restarts
+                self.bank.reset()
+            if self.t0 is None:
+                self.t0 = float(times[0])
+
+            times, spectra = self.decimator.decimate(times, spectra)
+            if not len(spectra):
+                return
+            relative_times = times - self.t0
+
+            if self.detector:
+                self._detect_motion(spectra, relative_times)
+            signal = self.pca.update(spectra)[:, 0] if self.pca else spectra[:, self.columns].mean(axis=1)
+            self.bank.update(signal)
+            if not self.bank.ready():
+                return
+
+            rate, confidence = self.estimate()
+            if self.detector and self.detector.is_active():
+                confidence = 0.0
+            if not self.detector:
+                self._detect_thresholds(rate, confidence, relative_times[-1])
+            self.signals.fft_data.emit({
+                'time': float(relative_times[-1]),
+                'magnitude': 60.0 * rate,
+                'rate': rate,
+                'confidence': confidence
+            })
+
+        except Exception as e:
+            if self.logger:
+                self.logger.failure(__file__, f"<process_batch>: {e}")
+
+    def estimate(self):
+        # dominant frequency in Hz and its confidence in [0, 1]
+        power = self.bank.power()
+        total = float(power.sum())
+        if total <= 0:
+            return 0.0, 0.0
+        peak = int(np.argmax(power))
+        neighbours = power[max(peak - 1, 0):peak + 2]
+        frequency = self.frequencies[peak]
+        if 0 < peak < len(power) - 1:
+            left, centre, right = power[peak - 1:peak + 2]
+            curvature = left - 2 * centre + right
+            if curvature < 0:
+                step = self.frequencies[1] - self.frequencies[0]
+                frequency += 0.5 * (left - right) / curvature * step
+        return float(frequency), float(neighbours.sum() / total)
+
+    def _setup_columns(self, shape):
+        if len(shape) == 3:
+            # SUBCARRIER of every antenna in the flattened [antennas, subcarriers] frame
+            self.columns = SUBCARRIER + shape[2] * np.arange(shape[1])
+        else:
+            self.columns = np.arange(*SUBCARRIER_RANGE)
+        if self.logger:
+            self.logger.success(__file__, f"<_setup_columns>: {self.rate:.1f} Hz after decimation by "
+                                          f"{self.decimator.factors()}, "
+                                          f"{len(self.frequencies)} bins over {self.bank.window} samples")
+
+    def _detect_thresholds(self, rate, confidence, relative_time):
+        if self.threshold_value == THRESHOLD_DISABLED or confidence < BREATHING_MIN_CONFIDENCE:
+            return
+
+        try:
+            if 60.0 * rate > self.threshold_value:
+                message = f"breathing={60.0 * rate:.1f}/min, confidence={confidence:.2f}, time={relative_time:.2f}s"
+                self.signals.threshold_exceeded.emit(message)
+
+        except Exception as e:
+            if self.logger:
+                self.logger.failure(__file__, f"<_detect_thresholds>: {e}")
+
+    def update_threshold(self, new_threshold):
+        try:
+            if new_threshold == THRESHOLD_DISABLED:
+                self.threshold_value = THRESHOLD_DISABLED
+            else:
+                self.threshold_value = float(new_threshold)
+
+        except Exception as e:
+            if self.logger:
+                self.logger.failure(__file__, f"<update_threshold>: failed to get value: {e}")
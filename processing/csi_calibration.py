@@ -0,0 +1,92 @@
+# processing/csi_calibration.py
+# environment calibration profile computed from a short static capture (Calibrate button, CALIBRATION_SECONDS)
+# per-feature (subcarrier, antenna x subcarrier on ASUS) baseline mean and standard deviation, a mask of null and
+# noisy subcarriers (coefficient of variation above CALIBRATION_NOISY_FACTOR times the median one), gain
+# equalizing scale factors, the steadiest subcarrier, a chart Y range and a threshold for the chart value
+# stored as a compressed npz in CALIBRATION_DIR, one file per processor, sniffer of the fleet, channel, bandwidth
+# and AP MAC
+# processors load it at start: the adaptive detector is seeded and skips its warmup, the slider and the chart
+# range follow the profile
+
+import os
+import time
+import numpy as np
+from config.settings import CHANNEL, BANDWIDTH, AP_MAC, CALIBRATION_DIR, CALIBRATION_NOISY_FACTOR, CALIBRATION_THRESHOLD_SIGMA
+
+
+class CalibrationProfile:
+    VERSION = 1
+
+    def __init__(self, key, mean, std, mask, scale, frames, threshold, y_range, best_feature, created=None):
+        self.key = key
+        self.mean = mean
+        self.std = std
+        self.mask = mask                # True for null or noisy features
+        self.scale = scale
+        self.frames = frames
+        self.threshold = threshold      # chart value threshold
+        self.y_range = y_range
+        self.best_feature = best_feature
+        self.created = created if created is not None else time.time()
+
+    @staticmethod
+    def key_for(device, sniffer=None, channel=CHANNEL, bandwidth=BANDWIDTH, mac=AP_MAC):
+        prefix = f"{device}_{sniffer}" if sniffer else device
+        return f"{prefix}_ch{channel}_bw{bandwidth}_{mac.replace(':', '').lower()}"
+
+    @classmethod
+    def from_capture(cls, key, features):
+        # features [N, F] of a static room, threshold and chart range are set by fit_chart
+        features = np.asarray(features, dtype=np.float64).reshape(len(features), -1)
+        mean = features.mean(axis=0)
+        std = features.std(axis=0, ddof=1)
+
+        active = mean > 1e-9
+        cv = np.divide(std, mean, out=np.full_like(mean, np.inf), where=active)
+        noisy = cv > CALIBRATION_NOISY_FACTOR * np.median(cv[active]) if active.any() else np.ones_like(active)
+        mask = ~active | noisy
+        reference = np.median(mean[~mask]) if (~mask).any() else 1.0
+        scale = np.divide(reference, mean, out=np.zeros_like(mean), where=~mask)
+        best_feature = int(np.argmin(np.where(mask, np.inf, cv)))
+
+        return cls(key, mean.astype(np.float32), std.astype(np.float32), mask, scale.astype(np.float32),
+                   len(features), None, None, best_feature)
+
+    def fit_chart(self, chart_values):
+        # chart_values [N], the value the processor plots for the captured frames once the profile is in use
+        chart_values = np.asarray(chart_values, dtype=np.float64)
+        mean = float(chart_values.mean())
+        std = float(chart_values.std())
+        self.threshold = mean + CALIBRATION_THRESHOLD_SIGMA * std
+        margin = max(5 * std, 0.05 * abs(mean), 1e-3)
+        self.y_range = (float(chart_values.min()) - margin, max(float(chart_values.max()), self.threshold) + margin)
+
+    def save(self, directory=CALIBRATION_DIR):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self.key + ".npz")
+        np.savez_compressed(path, version=self.VERSION, mean=self.mean, std=self.std, mask=np.packbits(self.mask),
+                            features=len(self.mask), scale=self.scale, frames=self.frames, threshold=self.threshold,
+                            y_range=np.asarray(self.y_range), best_feature=self.best_feature, created=self.created)
+        return path
+
+    @classmethod
+    def load(cls, key, directory=CALIBRATION_DIR):
+        path = os.path.join(directory, key + ".npz")
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            if int(data["version"]) != cls.VERSION:
+                return None
+            mask = np.unpackbits(data["mask"])[:int(data["features"])].astype(bool)
+            return cls(key, data["mean"], data["std"], mask, data["scale"], int(data["frames"]),
+                       float(data["threshold"]), tuple(data["y_range"]), int(data["best_feature"]), float(data["created"]))
+
+    def summary(self):
+        return {
+            'key': self.key,
+            'frames': self.frames,
+            'masked': int(np.count_nonzero(self.mask)),
+            'threshold': self.threshold,
+            'y_range': self.y_range,
+            'best_feature': self.best_feature,
+        }
@@ -0,0 +1,113 @@
+# processing/csi_decimator.py
+# anti-aliased polyphase rate change of the uniform grid, rational factor up / down (DECIMATE_RATE_HZ)
+# the processors put it right after the resampler, everything downstream (chart, detector, STFT, PCA) then runs
+# at the decimated rate
+# low-pass: Kaiser windowed sinc at the narrower of the two Nyquist bands, DECIMATE_TAPS taps per input sample
+# of the slower side, split into up phases of taps // up coefficients
+# output m reads input base = m * down // up with phase (m * down) % up, only the computed outputs cost work:
+# one gather of [outputs, taps] frames and one einsum over all features (subcarriers, antennas, complex values)
+# the last taps - 1 inputs are kept across batches, the first sample is repeated before the start so the
+# filter does not ramp up from zero, a jump in the grid (resampler restart) resets the state
+# output times are the grid times of the outputs minus the filter group delay
+# a ratio up / down with down <= DECIMATE_MAX_DENOMINATOR more than RATE_TOLERANCE off the target (small ratios
+# round to 0, 1 kHz to 50 Hz would run at 62.5 Hz) is cascaded: an integer pre-decimation stage, the largest
+# factor up to rate // target whose rational remainder is within RATE_TOLERANCE, then that remainder, no such
+# factor raises ValueError, the rate actually used is logged and kept in rate
+
+import numpy as np
+from fractions import Fraction
+from config.settings import DECIMATE_TAPS, DECIMATE_MAX_DENOMINATOR
+
+
+class PolyphaseDecimator:
+    RATE_TOLERANCE = 0.01       # relative error of the rate actually used
+
+    def __init__(self, rate, target, taps=DECIMATE_TAPS, max_denominator=DECIMATE_MAX_DENOMINATOR, logger=None):
+        if not 0 < target <= rate:
+            raise ValueError(f"decimation to {target} Hz from a {rate} Hz grid, the target must be in (0, {rate}]")
+        self.pre = None
+        ratio = Fraction(target / rate).limit_denominator(max_denominator)
+        if not self._within(ratio, target / rate):
+            # largest integer pre-factor whose remainder has a ratio within the tolerance
+            for factor in range(int(rate // target), 1, -1):
+                remainder = target * factor / rate
+                ratio = Fraction(remainder).limit_denominator(max_denominator)
+                if self._within(ratio, remainder):
+                    self.pre = PolyphaseDecimator(rate, rate / factor, taps, max_denominator=factor)
+                    break
+            else:
+                raise ValueError(f"decimation to {target} Hz from a {rate} Hz grid has no ratio within "
+                                 f"{100 * self.RATE_TOLERANCE:g} % with a denominator up to {max_denominator}")
+
+        grid = self.pre.rate if self.pre else rate
+        self.up = ratio.numerator
+        self.down = ratio.denominator
+        self.rate = grid * self.up / self.down
+        self.period = 1.0 / grid
+
+        # prototype filter at the upsampled rate, gain up to make up for the inserted zeros
+        factor = max(self.up, self.down)
+        self.taps = max(taps, 2) * factor // self.up
+        length = self.taps * self.up
+        cutoff = 0.5 / factor
+        n = np.arange(length) - (length - 1) / 2
+        h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, 8.0)
+        h *= self.up / h.sum()
+        self.phases = h.reshape(self.taps, self.up).T.copy()    # phases[p, k] = h[p + k * up]
+        self.offsets = np.arange(self.taps)
+        self.delay = (length - 1) / 2 / self.up                 # input samples
+        self.reset()
+
+        if logger:
+            logger.info(__file__, f"<__init__>: {rate:g} Hz to {self.rate:g} Hz ({target:g} Hz asked) by {self.factors()}")
+
+    @classmethod
+    def _within(cls, ratio, wanted):
+        return ratio.numerator > 0 and abs(ratio - wanted) <= cls.RATE_TOLERANCE * wanted
+
+    def factors(self):
+        # the stages as text, e.g. "1/20" or "1/3 then 9/10"
+        stage = f"{self.up}/{self.down}"
+        if self.pre:
+            return self.pre.factors() if self.up == self.down else f"{self.pre.factors()} then {stage}"
+        return stage
+
+    def reset(self):
+        if self.pre:
+            self.pre.reset()
+        self.history = None         # last taps - 1 inputs
+        self.history_times = None
+        self.count = 0              # inputs seen, absolute index of the next one
+        self.next_output = 0
+
+    def decimate(self, times: np.ndarray, values: np.ndarray):
+        # [N] grid times and [N, ...] values -> decimated times and values, possibly empty
+        if self.pre:
+            times, values = self.pre.decimate(times, values)
+        if not len(values) or self.up == self.down:
+            return times, values
+        if self.history is not None and abs(times[0] - self.history_times[-1] - self.period) > 0.5 * self.period:
+            self.reset()
+        if self.history is None:
+            self.history = np.repeat(values[:1], self.taps - 1, axis=0)
+            self.history_times = times[0] - self.period * np.arange(self.taps - 1, 0, -1)
+
+        frames = np.concatenate((self.history, values))
+        frame_times = np.concatenate((self.history_times, times))
+        start = self.count - (self.taps - 1)    # absolute index of frames[0]
+        self.count += len(values)
+
+        outputs = np.arange(self.next_output, (self.count * self.up - 1) // self.down + 1)
+        self.next_output += len(outputs)
+        self.history = frames[len(frames) - (self.taps - 1):]
+        self.history_times = frame_times[len(frames) - (self.taps - 1):]
+        if not len(outputs):
+            return times[:0], values[:0]
+
+        position = outputs * self.down
+        phase = position % self.up
+        base = position // self.up - start
+        block = frames[base[:, None] - self.offsets]             # [outputs, taps, ...]
+        decimated = np.einsum('nk,nk...->n...', self.phases[phase], block).astype(values.dtype, copy=False)
+        decimated_times = frame_times[base] + (phase / self.up - self.delay) * self.period
+        return decimated_times, decimated
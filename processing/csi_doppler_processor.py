@@ -0,0 +1,203 @@
+# processing/csi_doppler_processor.py
+# CSI Doppler processor thread, alternative to the magnitude processors (PROCESSING_METHOD = "doppler", RPi4)
+# the common phase of each frame (CFO, SFO, PLL) is removed with the phase of a reference subcarrier, the strongest
+# of the first batch, then the complex CSI is resampled onto the uniform grid (see csi_resampler.py) and
+# decimated to DECIMATE_RATE_HZ if set (csi_decimator.py), the velocity axis follows the decimated rate
+# incremental STFT: samples accumulate in a preallocated [capacity, subcarriers] block, every complete window
+# DOPPLER_HOP apart is cut as a strided view, detrended and tapered into a preallocated frame buffer and
+# transformed with one batched numpy FFT, consumed samples are shifted out once per pass
+# the power is summed over subcarriers and the frequency bins are mapped to velocities v = f * lambda / 2
+# emits doppler_data (frame times, velocities, spectrum in dB) for the spectrogram
+# emits fft_data and threshold_exceeded with the share of power, static paths included, that moves faster than
+# DOPPLER_STATIC_VELOCITY (motion %), the threshold is on the same 0-100 scale (DOPPLER_THRESHOLD, then the slider)
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from config.settings import (THRESHOLD_DISABLED, CHANNEL, PING_RATE_HZ, RESAMPLE_RATE_HZ, DECIMATE_RATE_HZ,
+                             DOPPLER_WINDOW, DOPPLER_HOP, DOPPLER_MAX_VELOCITY, DOPPLER_STATIC_VELOCITY,
+                             DOPPLER_THRESHOLD)
+from processing.csi_processor import CSIProcessor
+from processing.csi_resampler import CSIResampler
+from processing.csi_decimator import PolyphaseDecimator
+
+
+class CSIDopplerProcessor(CSIProcessor):
+    SUBCARRIERS = 256
+    MAX_FRAMES = 16             # STFT frames per FFT call
+    SPEED_OF_LIGHT = 299792458.0
+
+    def __init__(self, signals, buffer, mutex, logger, stop_event, batch_size=10, profiler=None,
+                 window=DOPPLER_WINDOW, hop=DOPPLER_HOP, sniffer=None):
+        super().__init__(signals, buffer, mutex, logger, stop_event, batch_size, profiler, sniffer)
+        self.threshold_value = DOPPLER_THRESHOLD
+        self.window = window
+        self.hop = hop
+        self.rate = RESAMPLE_RATE_HZ if RESAMPLE_RATE_HZ > 0 else PING_RATE_HZ
+        self.resampler = CSIResampler(self.rate)
+        self.decimator = PolyphaseDecimator(self.rate, DECIMATE_RATE_HZ, logger=logger) if 0 < DECIMATE_RATE_HZ < self.rate else None
+        if self.decimator:
+            self.rate = self.decimator.rate
+        self.restarts = 0
+
+        # velocity axis, bins sorted from negative to positive frequencies and cropped
+        wavelength = self.SPEED_OF_LIGHT / self._carrier_frequency(int(CHANNEL))
+        frequencies = np.fft.fftfreq(window, 1.0 / self.rate)
+        order = np.argsort(frequencies)
+        velocities = frequencies[order] * wavelength / 2
+        keep = np.abs(velocities) <= DOPPLER_MAX_VELOCITY
+        self.bins = order[keep]
+        self.velocity = velocities[keep].astype(np.float32)
+        self.static = np.abs(self.velocity) < DOPPLER_STATIC_VELOCITY
+        self.taper = np.hanning(window).astype(np.float32)
+        self.static_gain = float(np.sum(self.taper)) ** 2
+
+        # allocated on the first batch, once the active subcarriers are known
+        self.capacity = window + (self.MAX_FRAMES - 1) * hop
+        self.subcarriers = None
+        self.reference = 0
+        self.samples = None
+        self.sample_times = None
+        self.frames = None
+        self.count = 0
+
+    def process_batch(self, data_batch, time_batch):
+        try:
+            packets = [p for p in data_batch if isinstance(p, dict) and 'raw_csi' in p]
+            if not packets:
+                if self.logger:
+                    self.logger.failure(__file__, "<process_batch>: no CSI found")
+                return
+
+            csi = np.frombuffer(b"".join(p['raw_csi'] for p in packets), dtype=np.complex64)
+            if csi.size != self.SUBCARRIERS * len(packets):
+                if self.logger:
+                    self.logger.failure(__file__, f"<process_batch>: expected {self.SUBCARRIERS} complex values per frame")
+                return
+            csi = csi.reshape(len(packets), self.SUBCARRIERS)
+            times = np.fromiter((p['timestamp'] for p in packets), dtype=np.float64, count=len(packets))
+            seqs = [p.get('seq') for p in packets]
+
+            if self.samples is None:
+                self._allocate(csi)
+
+            # the common phase is random per frame, it goes before interpolating between frames
+            csi = csi[:, self.subcarriers]
+            reference = csi[:, self.reference]
+            csi *= (np.conj(reference) / np.maximum(np.abs(reference), 1e-12))[:, None]
+
+            times, csi, _ = self.resampler.resample(times, csi, None if None in seqs else seqs)
+            if self.resampler.restarts != self.restarts:
+                # the grid restarted after a long gap, windows must not span it
+                self.restarts = self.resampler.restarts
+                self.count = 0
+            if self.decimator:
+                times, csi = self.decimator.decimate(times, csi)
+            if not len(csi):
+                return
+            if self.t0 is None:
+                self.t0 = float(times[0])
+
+            frame_times, power, static_power = self._stft(times, csi)
+            if not len(power):
+                return
+
+            total = power.sum(axis=1) + static_power
+            motion = 100.0 * power[:, ~self.static].sum(axis=1) / np.maximum(total, 1e-30)
+            frame_times -= self.t0
+
+            spectrum = (10.0 * np.log10(power + 1e-12)).astype(np.float32)
+            self.signals.doppler_data.emit({
+                'time': frame_times,
+                'velocity': self.velocity,
+                'spectrum': spectrum,
+            })
+            if self.detector:
+                self._detect_motion(spectrum, frame_times)
+            else:
+                self._detect_thresholds(motion, frame_times)
+            self.signals.fft_data.emit({
+                'time': float(frame_times[-1]),
+                'magnitude': float(motion[-1])
+            })
+
+        except Exception as e:
+            if self.logger:
+                self.logger.failure(__file__, f"<process_batch>: {e}")
+
+    def _allocate(self, csi):
+        # null and guard subcarriers stay zero, they are left out of the transform
+        active = np.flatnonzero(np.any(csi != 0, axis=0))
+        self.subcarriers = active if len(active) else np.arange(self.SUBCARRIERS)
+        self.reference = int(np.argmax(np.mean(np.abs(csi[:, self.subcarriers]), axis=0)))
+        self.samples = np.zeros((self.capacity, len(self.subcarriers)), dtype=np.complex64)
+        self.sample_times = np.zeros(self.capacity, dtype=np.float64)
+        self.frames = np.zeros((self.MAX_FRAMES, len(self.subcarriers), self.window), dtype=np.complex64)
+        if self.logger:
+            self.logger.success(__file__, f"<_allocate>: {len(self.subcarriers)} subcarriers, {self.rate} Hz, "
+                                          f"window {self.window}, hop {self.hop}")
+
+    def _stft(self, times, csi):
+        frame_times = []
+        powers = []
+        static_powers = []
+        pos = 0
+        while pos < len(csi):
+            n = min(len(csi) - pos, self.capacity - self.count)
+            self.samples[self.count:self.count + n] = csi[pos:pos + n]
+            self.sample_times[self.count:self.count + n] = times[pos:pos + n]
+            self.count += n
+            pos += n
+            if self.count < self.window:
+                continue
+
+            frames = (self.count - self.window) // self.hop + 1
+            # [frames, subcarriers, window] view on the sample block, no copy
+            view = sliding_window_view(self.samples[:self.count], self.window, axis=0)[::self.hop][:frames]
+            block = self.frames[:frames]
+            mean = view.mean(axis=-1, keepdims=True)
+            np.subtract(view, mean, out=block)
+            block *= self.taper
+            # power the removed mean would have put in the zero bin
+            static_powers.append(self.static_gain * np.sum(mean.real ** 2 + mean.imag ** 2, axis=(1, 2)))
+
+            spectrum = np.fft.fft(block, axis=-1)[..., self.bins]
+            powers.append(np.sum(spectrum.real ** 2 + spectrum.imag ** 2, axis=1))
+            frame_times.append(self.sample_times[np.arange(frames) * self.hop + self.window // 2])
+
+            consumed = frames * self.hop
+            self.count -= consumed
+            self.samples[:self.count] = self.samples[consumed:consumed + self.count]
+            self.sample_times[:self.count] = self.sample_times[consumed:consumed + self.count]
+
+        if not powers:
+            return np.empty(0), np.empty((0, len(self.bins)), dtype=np.float32), np.empty(0)
+        return np.concatenate(frame_times), np.concatenate(powers), np.concatenate(static_powers)
+
+    def _detect_thresholds(self, motion, frame_times):
+        if self.threshold_value == THRESHOLD_DISABLED:
+            return
+
+        try:
+            peak = int(np.argmax(motion))
+            if motion[peak] >= self.threshold_value:
+                message = f"motion={motion[peak]:.1f}%, time={frame_times[peak]:.2f}s"
+                self.signals.threshold_exceeded.emit(message)
+
+        except Exception as e:
+            if self.logger:
+                self.logger.failure(__file__, f"<_detect_thresholds>: {e}")
+
+    def update_threshold(self, new_threshold):
+        try:
+            if new_threshold == THRESHOLD_DISABLED:
+                self.threshold_value = THRESHOLD_DISABLED
+            else:
+                self.threshold_value = float(new_threshold)
+
+        except Exception as e:
+            if self.logger:
+                self.logger.failure(__file__, f"<update_threshold>: failed to get value: {e}")
+
+    @staticmethod
+    def _carrier_frequency(channel):
+        return 1e6 * (2407 + 5 * channel if channel <= 14 else 5000 + 5 * channel)
@@ -16,8 +16,8 @@ from processing.csi_processor import CSIProcessor
 from core.buffer import CircularBuffer
 
 class CSIMagnitudeProcessor(CSIProcessor):
-    def __init__(self, signals, buffer, mutex, logger, stop_event, batch_size=10, ma_window=5):
-        super().__init__(signals, buffer, mutex, logger, stop_event, batch_size)
+    def __init__(self, signals, buffer, mutex, logger, stop_event, batch_size=10, ma_window=5, profiler=None, sniffer=None):
+        super().__init__(signals, buffer, mutex, logger, stop_event, batch_size, profiler, sniffer)
         self.threshold_value = THRESHOLD_VALUE
         self.ma_window = ma_window
         self.ma_buffer = deque(maxlen=ma_window)
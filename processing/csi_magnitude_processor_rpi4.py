@@ -5,62 +5,120 @@
 # emits fft_data signal for chart visualization
 # emits threshold_exceeded signal when thresholds are breached
 # moving average filtering using deque for performance
+# frames are resampled onto the RESAMPLE_RATE_HZ grid from their capture timestamps (see csi_resampler.py),
+# the chart and alert times are capture times, not processing times
+# with DECIMATE_RATE_HZ the grid is decimated before the moving average, PCA and detector (csi_decimator.py)
+# with PCA_COMPONENTS > 0 the chart and alerts use the norm of the streaming PCA projections across all
+# subcarriers (see csi_pca.py) instead of the mean of SUBCARRIER_RANGE
+# with a calibration profile the noisy subcarriers of SUBCARRIER_RANGE are left out of the mean and the PCA
+# input is gain equalized with the profile scale factors
+# the adaptive detector always scores the per-subcarrier magnitudes, PCA only drives the chart and the slider
+# threshold, so a profile seeds the detector in both modes
 
 import numpy as np
-import time
 from collections import deque
-from config.settings import THRESHOLD_VALUE, THRESHOLD_DISABLED, SUBCARRIER_RANGE, SUBCARRIER
+from config.settings import (THRESHOLD_VALUE, THRESHOLD_DISABLED, SUBCARRIER_RANGE, SUBCARRIER, RESAMPLE_RATE_HZ,
+                             DECIMATE_RATE_HZ, PCA_COMPONENTS)
 from processing.csi_processor import CSIProcessor
+from processing.csi_resampler import CSIResampler
+from processing.csi_decimator import PolyphaseDecimator
+from processing.csi_pca import StreamingPCA
 
 
 class CSIMagnitudeProcessor(CSIProcessor):
-    def __init__(self, signals, buffer, mutex, logger, stop_event, ma_window, batch_size=10):
-        super().__init__(signals, buffer, mutex, logger, stop_event, batch_size)
+    PROFILE_NAME = "rpi4_pca" if PCA_COMPONENTS > 0 else "rpi4_magnitude"
+
+    def __init__(self, signals, buffer, mutex, logger, stop_event, ma_window, batch_size=10, profiler=None, sniffer=None):
+        super().__init__(signals, buffer, mutex, logger, stop_event, batch_size, profiler, sniffer)
         self.threshold_value = THRESHOLD_VALUE
         self.ma_window = ma_window
         self.ma_buffer = deque(maxlen=ma_window)
+        self.resampler = CSIResampler(RESAMPLE_RATE_HZ) if RESAMPLE_RATE_HZ > 0 else None
+        self.decimator = PolyphaseDecimator(RESAMPLE_RATE_HZ, DECIMATE_RATE_HZ, logger=logger) if 0 < DECIMATE_RATE_HZ < RESAMPLE_RATE_HZ else None
+        self.pca = StreamingPCA(PCA_COMPONENTS) if PCA_COMPONENTS > 0 else None
+        self.motion_buffer = deque(maxlen=ma_window)
+        self.columns = np.arange(*SUBCARRIER_RANGE)  # subcarriers averaged for the chart
+        self.scale = None                           # PCA input scale factors of the profile
 
     def process_batch(self, data_batch, time_batch):
         try:
             all_magnitudes = []
-            latest_timestamp = time.time()
-
-            if self.t0 is None:
-                self.t0 = latest_timestamp
+            timestamps = []
+            seqs = []
 
             for csi_packet, _ in zip(data_batch, time_batch):
                 if isinstance(csi_packet, dict) and 'raw_csi' in csi_packet:
                     magnitudes = self.extract_magnitude_data(csi_packet['raw_csi'])
                     all_magnitudes.append(magnitudes)
+                    timestamps.append(csi_packet['timestamp'])
+                    seqs.append(csi_packet.get('seq'))
 
             if not all_magnitudes:
                 if self.logger:
                     self.logger.failure(__file__, "<process_batch>: no magnitudes found")
                 return
 
-            for spectrum in all_magnitudes:
-                self.ma_buffer.append(spectrum)
+            spectra = np.stack(all_magnitudes)
+            times = np.asarray(timestamps, dtype=np.float64)
+            if self.resampler:
+                times, spectra, _ = self.resampler.resample(times, spectra, None if None in seqs else seqs)
+            if self.decimator:
+                times, spectra = self.decimator.decimate(times, spectra)
+            if not len(spectra):
+                return
+
+            latest_timestamp = float(times[-1])
+            if self.t0 is None:
+                self.t0 = float(times[0])
+
+            self._calibrate(spectra, times - self.t0)
+            if self.pca:
+                self._process_components(spectra, times, latest_timestamp)
+                return
+            if self.detector:
+                self._detect_motion(spectra, times - self.t0)
+
+            self.ma_buffer.extend(spectra)
 
             if len(self.ma_buffer) < self.ma_window:
                 return
 
             magnitude_matrix = np.mean(np.stack(self.ma_buffer), axis=0, keepdims=True)
 
-            self._detect_thresholds(magnitude_matrix, latest_timestamp)
+            if not self.detector:
+                self._detect_thresholds(magnitude_matrix, latest_timestamp)
             self._emit_fft_data(magnitude_matrix, latest_timestamp)
 
         except Exception as e:
             if self.logger:
                 self.logger.failure(__file__, f"<process_batch>: {e}")
 
+    def _process_components(self, spectra, times, timestamp):
+        # motion signal: norm of the top-k projections, smoothed over ma_window grid points
+        scores = self.pca.update(spectra if self.scale is None else spectra * self.scale)
+        if self.detector:
+            self._detect_motion(spectra, times - self.t0)
+        self.motion_buffer.extend(np.linalg.norm(scores, axis=1))
+        if len(self.motion_buffer) < self.ma_window:
+            return
+
+        motion = float(np.mean(self.motion_buffer))
+        relative_time = timestamp - self.t0
+        if not self.detector and self.threshold_value != THRESHOLD_DISABLED and motion > self.threshold_value:
+            self.signals.threshold_exceeded.emit(f"motion={motion:.2f}, time={relative_time:.2f}s")
+        self.signals.fft_data.emit({
+            'time': relative_time,
+            'magnitude': motion,
+            'components': scores[-1].tolist()
+        })
+
     def _detect_thresholds(self, magnitude_matrix, timestamp):
         if self.threshold_value == THRESHOLD_DISABLED:
             return
 
         try:
             # magnitude_value = magnitude_matrix[0, SUBCARRIER]           uncomment to use one subcarrier
-            start, end = SUBCARRIER_RANGE
-            magnitude_value = np.mean(magnitude_matrix[0, start:end])   # comment to use one subcarrier
+            magnitude_value = np.mean(magnitude_matrix[0, self.columns])    # comment to use one subcarrier
             if magnitude_value > self.threshold_value:
                 relative_time = timestamp - self.t0 if self.t0 else timestamp
                 message = f"value={magnitude_value:.2f}, time={relative_time:.2f}s"
@@ -78,8 +136,7 @@ class CSIMagnitudeProcessor(CSIProcessor):
 
             relative_time = timestamp - self.t0
             # selected_magnitude = magnitude_matrix[0, SUBCARRIER]           same as above
-            start, end = SUBCARRIER_RANGE
-            selected_magnitude = np.mean(magnitude_matrix[0, start:end])
+            selected_magnitude = np.mean(magnitude_matrix[0, self.columns])
             self.signals.fft_data.emit({
                 'time': relative_time,
                 'magnitude': float(selected_magnitude)
@@ -89,6 +146,18 @@ class CSIMagnitudeProcessor(CSIProcessor):
             if self.logger:
                 self.logger.failure(__file__, f"<_emit_fft_data>: {e}")
 
+    def _select(self, profile):
+        columns = np.arange(*SUBCARRIER_RANGE)
+        steady = columns[~profile.mask[columns]]
+        self.columns = steady if len(steady) else columns
+        self.scale = profile.scale if self.pca else None
+
+    def _chart_values(self, features):
+        if not self.pca:
+            return features[:, self.columns].mean(axis=1)
+        # a fresh basis of the static capture, the live one converges to the same noise subspace
+        return np.linalg.norm(StreamingPCA(self.pca.components).update(features * self.scale), axis=1)
+
     def update_threshold(self, new_threshold):
         try:
             if new_threshold == THRESHOLD_DISABLED:
@@ -0,0 +1,146 @@
+# processing/csi_motion_detector.py
+# adaptive motion detector (DETECTOR = "adaptive"), replaces the fixed slider threshold of the processors
+# baseline: per feature (subcarrier, component or bin) mean and variance, merged batch-wise with the
+# Welford/Chan update from frames classified as quiet, the effective count is capped at
+# DETECTOR_BASELINE_FRAMES so the baseline follows slow changes of the room
+# score: RMS over the features of (x - mean) / std, about 1 on an empty room, no detection during the warmup
+# CFAR-style hysteresis: a candidate starts above DETECTOR_ON_SCORE and becomes an episode after DETECTOR_MIN_DURATION,
+# both end once the score stayed below DETECTOR_OFF_SCORE for DETECTOR_HOLD (motion crosses its baseline often)
+# an episode longer than DETECTOR_MAX_EPISODE is a lasting change of the static room (moved furniture, open door),
+# the baseline only learns from quiet frames and would never catch up: the episode ends with 'rebaselined' set
+# and the statistics are learned again from the following frames, with a new warmup
+# update() returns the episode dicts whose state changed: once when confirmed ('active': True) and once when
+# it ends ('active': False, duration and peak filled), never once per batch
+# seed() starts from the baseline of a calibration profile (csi_calibration.py): no warmup, its noisy features
+# are left out of the score, a baseline of another feature count is dropped and learned again
+
+import numpy as np
+from config.settings import (DETECTOR_ON_SCORE, DETECTOR_OFF_SCORE, DETECTOR_MIN_DURATION, DETECTOR_HOLD,
+                             DETECTOR_BASELINE_FRAMES, DETECTOR_WARMUP_FRAMES, DETECTOR_MAX_EPISODE)
+
+IDLE, PENDING, ACTIVE = 0, 1, 2
+
+
+class MotionDetector:
+    def __init__(self, on_score=DETECTOR_ON_SCORE, off_score=DETECTOR_OFF_SCORE, min_duration=DETECTOR_MIN_DURATION,
+                 hold=DETECTOR_HOLD, baseline_frames=DETECTOR_BASELINE_FRAMES, warmup_frames=DETECTOR_WARMUP_FRAMES,
+                 max_episode=DETECTOR_MAX_EPISODE):
+        self.on_score = on_score
+        self.off_score = off_score
+        self.min_duration = min_duration
+        self.hold = hold
+        self.baseline_frames = baseline_frames
+        self.warmup_frames = warmup_frames
+        self.max_episode = max_episode
+        self.episodes = 0
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = None
+        self.m2 = None
+        self.state = IDLE
+        self.start = None
+        self.below_since = None
+        self.peak = 0.0
+        self.event = None
+        self.mask = None
+
+    def seed(self, mean, std, frames, mask=None):
+        self.reset()
+        self.count = min(max(frames, self.warmup_frames), self.baseline_frames)
+        self.mean = np.asarray(mean, dtype=np.float64).copy()
+        self.m2 = np.asarray(std, dtype=np.float64) ** 2 * max(self.count - 1, 1)
+        self.mask = mask
+
+    def update(self, features: np.ndarray, times: np.ndarray) -> list:
+        features = np.asarray(features, dtype=np.float64).reshape(len(features), -1)
+        if self.mean is not None and len(self.mean) != features.shape[1]:
+            self.reset()
+        if self.mean is None:
+            self.mean = np.zeros(features.shape[1])
+            self.m2 = np.zeros(features.shape[1])
+
+        if self.count < self.warmup_frames:
+            self._merge(features)
+            return []
+
+        scores = self.score(features)
+        events = []
+        quiet = np.zeros(len(scores), dtype=bool)
+        for i, (score, time) in enumerate(zip(scores, times)):
+            if self.state == IDLE:
+                if score > self.on_score:
+                    self.state, self.start, self.peak, self.below_since = PENDING, time, score, None
+                else:
+                    quiet[i] = True
+                continue
+
+            self.peak = max(self.peak, score)
+            if score >= self.off_score:
+                self.below_since = None
+            elif self.below_since is None:
+                self.below_since = time
+
+            if self.state == PENDING:
+                if self.below_since is not None and time - self.below_since >= self.hold:
+                    self.state = IDLE
+                elif self.below_since is None and time - self.start >= self.min_duration:
+                    self.state = ACTIVE
+                    self.episodes += 1
+                    self.event = {'id': self.episodes, 'active': True, 'start': float(self.start),
+                                  'time': float(time), 'score': float(score), 'peak': float(self.peak)}
+                    events.append(dict(self.event))
+            elif self.below_since is not None and time - self.below_since >= self.hold:
+                self.state = IDLE
+                self.event.update({'active': False, 'time': float(self.below_since), 'score': float(score),
+                                   'peak': float(self.peak), 'duration': float(self.below_since - self.start)})
+                events.append(dict(self.event))
+                self.event = None
+            elif self.max_episode and time - self.start >= self.max_episode:
+                self.event.update({'active': False, 'time': float(time), 'score': float(score), 'peak': float(self.peak),
+                                   'duration': float(time - self.start), 'rebaselined': True})
+                events.append(dict(self.event))
+                self._rebaseline()
+                if i + 1 < len(features):
+                    self._merge(features[i + 1:])
+                return events
+
+        # frames inside or around an episode would teach the baseline the motion itself
+        if quiet.any():
+            self._merge(features[quiet])
+        return events
+
+    def score(self, features: np.ndarray) -> np.ndarray:
+        variance = self.m2 / max(self.count - 1, 1)
+        valid = variance > 1e-12
+        if self.mask is not None:
+            valid &= ~self.mask
+        if not valid.any():
+            return np.zeros(len(features))
+        z = (features[:, valid] - self.mean[valid]) / np.sqrt(variance[valid])
+        return np.sqrt(np.mean(z * z, axis=1))
+
+    def _rebaseline(self):
+        # the profile mask marks null and noisy features of the hardware, it stays
+        mask, features = self.mask, len(self.mean)
+        self.reset()
+        self.mask = mask
+        self.mean = np.zeros(features)
+        self.m2 = np.zeros(features)
+
+    def _merge(self, batch):
+        # Chan et al. parallel update of mean and sum of squared deviations
+        n, m = self.count, len(batch)
+        batch_mean = batch.mean(axis=0)
+        delta = batch_mean - self.mean
+        total = n + m
+        self.mean += delta * m / total
+        self.m2 += np.sum((batch - batch_mean) ** 2, axis=0) + delta ** 2 * n * m / total
+        if total > self.baseline_frames:
+            self.m2 *= self.baseline_frames / total
+            total = self.baseline_frames
+        self.count = total
+
+    def is_active(self) -> bool:
+        return self.state == ACTIVE
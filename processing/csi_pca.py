@@ -0,0 +1,55 @@
+# processing/csi_pca.py
+# streaming PCA over the subcarriers of the magnitude stream, motion moves many subcarriers together
+# exponentially weighted mean and covariance, forgotten by PCA_FORGET per frame and updated once per batch
+# the top PCA_COMPONENTS basis follows the covariance by subspace iteration, PCA_ITERATIONS products C @ Q and
+# one thin QR per batch: O(S^2 * (N + k)) per batch, no eigendecomposition
+# basis signs are aligned with the previous basis so the projections stay continuous
+# update() returns the projections of the centered batch on the basis, [N, k]
+
+import numpy as np
+from config.settings import PCA_COMPONENTS, PCA_FORGET, PCA_ITERATIONS
+
+
+class StreamingPCA:
+    def __init__(self, components=PCA_COMPONENTS, forget=PCA_FORGET, iterations=PCA_ITERATIONS):
+        self.components = components
+        self.forget = forget
+        self.iterations = iterations
+        self.reset()
+
+    def reset(self):
+        self.mean = None
+        self.covariance = None
+        self.basis = None
+        self.frames = 0
+
+    def update(self, batch: np.ndarray) -> np.ndarray:
+        batch = np.asarray(batch, dtype=np.float64)
+        if self.mean is None:
+            features = batch.shape[1]
+            self.mean = batch.mean(axis=0)
+            self.covariance = np.zeros((features, features))
+            self.basis, _ = np.linalg.qr(np.random.default_rng(0).standard_normal((features, min(self.components, features))))
+
+        # one weight for the whole batch, as if its frames had been added one by one
+        weight = self.forget ** len(batch)
+        self.mean = weight * self.mean + (1.0 - weight) * batch.mean(axis=0)
+        centered = batch - self.mean
+        self.covariance *= weight
+        self.covariance += (1.0 - weight) / len(batch) * (centered.T @ centered)
+        self.frames += len(batch)
+
+        basis = self.basis
+        for _ in range(self.iterations):
+            basis, _ = np.linalg.qr(self.covariance @ basis)
+        signs = np.sign(np.sum(basis * self.basis, axis=0))
+        signs[signs == 0] = 1.0
+        self.basis = basis * signs
+
+        return centered @ self.basis
+
+    def explained_variance(self) -> np.ndarray:
+        # Rayleigh quotients of the basis, close to the top eigenvalues once converged
+        if self.basis is None:
+            return np.zeros(self.components)
+        return np.sum(self.basis * (self.covariance @ self.basis), axis=0)
@@ -0,0 +1,188 @@
+# processing/csi_phase_processor.py
+# CSI phase processor thread, alternative to the magnitude processors (PROCESSING_METHOD = "phase")
+# RPi4 complex frames, or ASUS [antennas, subcarriers] frames reduced to the CSI ratio of antenna 1 to antenna 0
+# phase sanitization per frame: subcarriers in frequency order, phase unwrapped across subcarriers, then the
+# linear term a * k + b (STO/SFO slope, CFO/PLL offset) removed with the closed-form least-squares fit
+# a = sum((k - mean k) * phi) / sum((k - mean k)^2), the centered indices and their norm are precomputed,
+# so a whole [N, subcarriers] batch is one unwrap, one matrix-vector product and one broadcast subtraction
+# the sanitized phase of SUBCARRIER_RANGE is resampled as unit phasors onto the uniform grid (csi_resampler.py)
+# and decimated to DECIMATE_RATE_HZ if set (csi_decimator.py)
+# phase activity: circular standard deviation over the last ma_window grid points, mean over SUBCARRIER_RANGE,
+# in mrad, phasors keep it free of wrapping at +-pi
+# emits fft_data with the phase activity for the chart, threshold_exceeded when it crosses the threshold
+# with a calibration profile the subcarriers with a noisy spread are left out of the activity
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from config.settings import THRESHOLD_VALUE, THRESHOLD_DISABLED, SUBCARRIER_RANGE, RESAMPLE_RATE_HZ, DECIMATE_RATE_HZ
+from processing.csi_processor import CSIProcessor
+from processing.csi_resampler import CSIResampler
+from processing.csi_decimator import PolyphaseDecimator
+
+
+class CSIPhaseProcessor(CSIProcessor):
+    SUBCARRIERS = 256
+    PROFILE_NAME = "phase"
+
+    def __init__(self, signals, buffer, mutex, logger, stop_event, ma_window, batch_size=10, profiler=None, sniffer=None):
+        super().__init__(signals, buffer, mutex, logger, stop_event, batch_size, profiler, sniffer)
+        self.threshold_value = THRESHOLD_VALUE
+        self.ma_window = max(ma_window, 2)
+        self.resampler = CSIResampler(RESAMPLE_RATE_HZ) if RESAMPLE_RATE_HZ > 0 else None
+        self.decimator = PolyphaseDecimator(RESAMPLE_RATE_HZ, DECIMATE_RATE_HZ, logger=logger) if 0 < DECIMATE_RATE_HZ < RESAMPLE_RATE_HZ else None
+
+        # set on the first batch, once the active subcarriers are known
+        self.order = None           # raw indices of the active subcarriers in frequency order
+        self.k = None               # their subcarrier indices
+        self.k_centered = None
+        self.k_norm = None
+        self.selected = None        # positions of SUBCARRIER_RANGE in self.order
+        self.history = None         # last ma_window - 1 phasors of the selection
+        self.steady = None          # selected subcarriers kept in the activity, all without a profile
+
+    def process_batch(self, data_batch, time_batch):
+        try:
+            packets = [p for p in data_batch if isinstance(p, dict) and ('raw_csi' in p or 'csi' in p)]
+            if not packets:
+                if self.logger:
+                    self.logger.failure(__file__, "<process_batch>: no CSI found")
+                return
+
+            frequency_order = 'csi' in packets[0]
+            if frequency_order:
+                # assembled MIMO frames, the ratio to the first antenna is already free of the common phase terms
+                csi = self.csi_ratio(np.stack([p['csi'] for p in packets]))[:, 0]
+            else:
+                csi = np.frombuffer(b"".join(p['raw_csi'] for p in packets), dtype=np.complex64)
+                if csi.size != self.SUBCARRIERS * len(packets):
+                    if self.logger:
+                        self.logger.failure(__file__, f"<process_batch>: expected {self.SUBCARRIERS} complex values per frame")
+                    return
+                csi = csi.reshape(len(packets), self.SUBCARRIERS)
+            times = np.fromiter((p['timestamp'] for p in packets), dtype=np.float64, count=len(packets))
+            seqs = [p.get('seq') for p in packets]
+
+            if self.order is None:
+                self._setup_indices(csi, frequency_order)
+                if self.order is None:
+                    return
+
+            phase = self.sanitize(csi)
+            phasors = np.exp(1j * phase[:, self.selected]).astype(np.complex64)
+
+            if self.resampler:
+                times, phasors, _ = self.resampler.resample(times, phasors, None if None in seqs else seqs)
+            if self.decimator:
+                times, phasors = self.decimator.decimate(times, phasors)
+            if not len(phasors):
+                return
+            if self.t0 is None:
+                self.t0 = float(times[0])
+
+            spread = self._spread(phasors)
+            if not len(spread):
+                return
+            activity = self._chart_values(spread)
+            relative_times = times[-len(activity):] - self.t0
+
+            self._calibrate(spread, relative_times)
+            if self.detector:
+                self._detect_motion(spread, relative_times)
+            else:
+                self._detect_thresholds(activity, relative_times)
+            self.signals.fft_data.emit({
+                'time': float(relative_times[-1]),
+                'magnitude': float(activity[-1])
+            })
+
+        except Exception as e:
+            if self.logger:
+                self.logger.failure(__file__, f"<process_batch>: {e}")
+
+    @staticmethod
+    def csi_ratio(block: np.ndarray, reference: int = 0) -> np.ndarray:
+        # [N, antennas, subcarriers] -> [N, antennas - 1, subcarriers], H_a / H_reference for the other antennas
+        # the receive chains share oscillator and sampling clock, so CFO, STO and PLL phase cancel
+        others = np.delete(np.arange(block.shape[1]), reference)
+        denominator = block[:, reference:reference + 1]
+        ratio = np.zeros((block.shape[0], len(others), block.shape[2]), dtype=np.complex64)
+        np.divide(block[:, others], denominator, out=ratio, where=denominator != 0)
+        return ratio
+
+    def sanitize(self, csi: np.ndarray) -> np.ndarray:
+        # [N, subcarriers] complex -> [N, active subcarriers] phase in frequency order, linear term removed
+        phase = np.unwrap(np.angle(csi[:, self.order]), axis=1)
+        slope = (phase @ self.k_centered) / self.k_norm
+        phase -= phase.mean(axis=1, keepdims=True)
+        phase -= slope[:, None] * self.k_centered
+        return phase
+
+    def _setup_indices(self, csi, frequency_order=False):
+        # null and guard subcarriers stay zero, they would bias the fit
+        # RPi4 frames are in FFT order, assembled MIMO frames already in frequency order
+        subcarriers = csi.shape[1]
+        active = np.any(csi != 0, axis=0)
+        if frequency_order:
+            index = np.arange(subcarriers) - subcarriers // 2
+        else:
+            index = np.fft.fftfreq(subcarriers, 1.0 / subcarriers).astype(np.int64)
+        order = np.argsort(index)
+        order = order[active[order]]
+        start, end = SUBCARRIER_RANGE
+        selected = np.flatnonzero((order >= start) & (order < end))
+        if len(order) < 2 or not len(selected):
+            if self.logger:
+                self.logger.failure(__file__, "<_setup_indices>: no active subcarrier in SUBCARRIER_RANGE")
+            return
+
+        self.k = index[order].astype(np.float32)
+        self.k_centered = self.k - self.k.mean()
+        self.k_norm = float(np.sum(self.k_centered ** 2))
+        self.order = order
+        self.selected = selected
+        self.history = np.empty((0, len(selected)), dtype=np.complex64)
+        if self.logger:
+            self.logger.success(__file__, f"<_setup_indices>: {len(order)} active subcarriers, {len(selected)} selected")
+
+    def _spread(self, phasors):
+        # circular standard deviation sqrt(-2 ln R) of every ma_window run ending at a new grid point, per subcarrier
+        frames = np.concatenate((self.history, phasors))
+        self.history = frames[-(self.ma_window - 1):]
+        if len(frames) < self.ma_window:
+            return np.empty(0)
+        windows = sliding_window_view(frames, self.ma_window, axis=0)
+        resultant = np.abs(windows.mean(axis=-1))
+        return np.sqrt(-2.0 * np.log(np.clip(resultant, 1e-6, 1.0)))
+
+    def _select(self, profile):
+        self.steady = ~profile.mask if np.any(~profile.mask) else None
+
+    def _chart_values(self, features):
+        if self.steady is None or len(self.steady) != features.shape[1]:
+            return 1e3 * features.mean(axis=1)
+        return 1e3 * features[:, self.steady].mean(axis=1)
+
+    def _detect_thresholds(self, activity, relative_times):
+        if self.threshold_value == THRESHOLD_DISABLED:
+            return
+
+        try:
+            peak = int(np.argmax(activity))
+            if activity[peak] > self.threshold_value:
+                message = f"phase={activity[peak]:.0f}mrad, time={relative_times[peak]:.2f}s"
+                self.signals.threshold_exceeded.emit(message)
+
+        except Exception as e:
+            if self.logger:
+                self.logger.failure(__file__, f"<_detect_thresholds>: {e}")
+
+    def update_threshold(self, new_threshold):
+        try:
+            if new_threshold == THRESHOLD_DISABLED:
+                self.threshold_value = THRESHOLD_DISABLED
+            else:
+                self.threshold_value = float(new_threshold)
+
+        except Exception as e:
+            if self.logger:
+                self.logger.failure(__file__, f"<update_threshold>: failed to get value: {e}")
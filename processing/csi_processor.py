@@ -3,13 +3,27 @@
 # retrieves CSI packets from circular buffer in batches
 # defines abstract interface for processing CSI data
 # concrete subclasses should implement specific signal extraction (magnitude, phase, Doppler)
+# with DETECTOR = "adaptive" subclasses pass their per-frame features to _detect_motion instead of comparing
+# against the slider threshold, motion_event is emitted when an episode starts and when it ends
+# calibration: start_calibration records CALIBRATION_SECONDS of the features subclasses pass to _calibrate,
+# the profile (csi_calibration.py) gets the subclass selection (_select), the threshold and chart range of the
+# values _chart_values computes from the capture, it is saved under PROFILE_NAME and the sniffer name (one file
+# per device of a fleet) and applied at once
+# the saved profile is loaded at construction and applied at every start: threshold, seeded detector and
+# calibration signal with the chart range
 
+import numpy as np
 from abc import ABC, abstractmethod
 from PyQt5.QtCore import QThread
+from config.settings import DETECTOR, THRESHOLD_DISABLED, CALIBRATION_SECONDS
+from processing.csi_motion_detector import MotionDetector
+from processing.csi_calibration import CalibrationProfile
 
 
 class CSIProcessor(QThread):
-    def __init__(self, signals, buffer, mutex, logger, stop_event, batch_size=10):
+    PROFILE_NAME = None         # calibration profile prefix, None disables calibration
+
+    def __init__(self, signals, buffer, mutex, logger, stop_event, batch_size=10, profiler=None, sniffer=None):
         super().__init__()
         self.signals = signals
         self.buffer = buffer
@@ -17,7 +31,20 @@ class CSIProcessor(QThread):
         self.logger = logger
         self.stop_event = stop_event
         self.batch_size = batch_size
+        self.profiler = profiler
+        self.sniffer = sniffer      # name of the SNIFFERS entry, None for the single SOURCE_DEVICE setup
         self.t0 = None
+        self.detector = MotionDetector() if DETECTOR == "adaptive" else None
+        self.threshold_value = None
+        self.calibration = None     # feature batches while recording
+        self.calibration_start = None
+        self.profile = None
+        if self.PROFILE_NAME:
+            try:
+                self.profile = CalibrationProfile.load(CalibrationProfile.key_for(self.PROFILE_NAME, self.sniffer))
+            except Exception as e:
+                if self.logger:
+                    self.logger.failure(__file__, f"<__init__>: unreadable calibration profile: {e}")
 
         # if self.logger:
         #     self.logger.success(__file__, "<__init__>")
@@ -26,7 +53,11 @@ class CSIProcessor(QThread):
         # if self.logger:
         #     self.logger.success(__file__, "<run>: processing")
 
+        if self.profile:
+            self._apply_profile(self.profile)
         while not self.stop_event.is_set():
+            if self.profiler:
+                self.profiler.checkpoint("processor")
             try:
                 if not self._retrieve_batch():
                     self.msleep(10)
@@ -34,6 +65,8 @@ class CSIProcessor(QThread):
                 if self.logger:
                     self.logger.failure(__file__, f"<run>: exception: {e}")
                 self.msleep(100)
+        if self.profiler:
+            self.profiler.finish("processor")
 
     def _retrieve_batch(self):
         buffer_size = self.buffer.size(self.mutex)
@@ -47,6 +80,75 @@ class CSIProcessor(QThread):
         self.process_batch(data_batch, time_batch)
         return True
 
+    def _detect_motion(self, features, relative_times):
+        try:
+            for event in self.detector.update(features, relative_times):
+                if event.get('rebaselined') and self.logger:
+                    self.logger.failure(__file__, f"<_detect_motion>: episode {event['id']} lasted {event['duration']:.0f}s, "
+                                                  f"learning the baseline again")
+                self.signals.motion_event.emit(event)
+        except Exception as e:
+            if self.logger:
+                self.logger.failure(__file__, f"<_detect_motion>: {e}")
+
+    def start_calibration(self):
+        if not self.PROFILE_NAME:
+            if self.logger:
+                self.logger.failure(__file__, "<start_calibration>: processor has no calibration")
+            return
+        self.calibration_start = None
+        self.calibration = []
+        if self.logger:
+            self.logger.success(__file__, f"<start_calibration>: recording {CALIBRATION_SECONDS}s, keep the room empty")
+
+    def _calibrate(self, features, relative_times):
+        if self.calibration is None or not len(features):
+            return
+        try:
+            if self.calibration_start is None:
+                self.calibration_start = float(relative_times[0])
+            self.calibration.append(np.reshape(features, (len(features), -1)))
+            if relative_times[-1] - self.calibration_start < CALIBRATION_SECONDS:
+                return
+
+            features = np.concatenate(self.calibration)
+            self.calibration = None
+            profile = CalibrationProfile.from_capture(CalibrationProfile.key_for(self.PROFILE_NAME, self.sniffer), features)
+            self._select(profile)
+            profile.fit_chart(self._chart_values(features))
+            path = profile.save()
+            self._apply_profile(profile)
+            if self.logger:
+                self.logger.success(__file__, f"<_calibrate>: {len(features)} frames, {np.count_nonzero(profile.mask)} "
+                                              f"noisy features, saved to {path}")
+        except Exception as e:
+            self.calibration = None
+            if self.logger:
+                self.logger.failure(__file__, f"<_calibrate>: {e}")
+
+    def _apply_profile(self, profile):
+        try:
+            self.profile = profile
+            self._select(profile)
+            if self.threshold_value != THRESHOLD_DISABLED:
+                self.threshold_value = profile.threshold
+            if self.detector:
+                self.detector.seed(profile.mean, profile.std, profile.frames, profile.mask)
+            self.signals.calibration.emit(profile.summary())
+        except Exception as e:
+            if self.logger:
+                self.logger.failure(__file__, f"<_apply_profile>: {e}")
+
+    def _select(self, profile):
+        # Pick subcarriers, weights or scales from a profile
+        # Overridden by the processors that support calibration
+        pass
+
+    def _chart_values(self, features):
+        # [N, F] calibration features -> [N] chart values, with the profile selection applied
+        # Overridden by the processors that support calibration, the default charts the feature mean
+        return np.asarray(features, dtype=np.float64).reshape(len(features), -1).mean(axis=1)
+
     @abstractmethod
     def process_batch(self, data_batch, time_batch):
         # Process a CSI data batch
@@ -0,0 +1,119 @@
+# processing/csi_resampler.py
+# resamples CSI frames onto a uniform time grid of RESAMPLE_RATE_HZ from their capture timestamps
+# frames arrive irregularly (contention, batching, losses) while FFT and Doppler stages assume a fixed rate
+# linear or nearest interpolation, vectorized per batch with searchsorted, values may be (N,) or (N, subcarriers)
+# the last frame of a batch and the index of the next grid point are kept, so grid points between two
+# batches are interpolated like any other and no window is reprocessed
+# grid points between two frames further apart than RESAMPLE_MAX_GAP, or across a seq_num jump, are filled
+# (interpolated over lost frames) and flagged in the returned mask
+# a jump of more than RESAMPLE_RESTART_GAP in either direction (capture restart, parser reset) restarts the grid,
+# late or duplicate timestamps are dropped
+
+import numpy as np
+from config.settings import RESAMPLE_RATE_HZ, RESAMPLE_METHOD, RESAMPLE_MAX_GAP, RESAMPLE_RESTART_GAP, RESAMPLE_SEQ_MODULO
+
+
+class CSIResampler:
+    def __init__(self, rate=RESAMPLE_RATE_HZ, method=RESAMPLE_METHOD, max_gap=RESAMPLE_MAX_GAP,
+                 restart_gap=RESAMPLE_RESTART_GAP, seq_modulo=RESAMPLE_SEQ_MODULO):
+        if method not in ("linear", "nearest"):
+            raise ValueError(f"unknown resampling method {method}")
+        self.period = 1.0 / rate
+        self.method = method
+        self.max_gap = max_gap
+        self.restart_gap = restart_gap
+        self.seq_modulo = seq_modulo
+
+        self.produced = 0
+        self.filled = 0
+        self.dropped = 0
+        self.restarts = 0
+        self.restart()
+
+    def restart(self):
+        self.origin = None
+        self.next_index = 0
+        self.last_time = None
+        self.last_value = None
+        self.last_seq = None
+
+    def resample(self, times, values, seqs=None):
+        # returns (grid times, grid values, filled mask), possibly empty when the batch ends before the next grid point
+        times = np.asarray(times, dtype=np.float64)
+        values = np.asarray(values)
+        seqs = None if seqs is None else np.asarray(seqs, dtype=np.int64)
+
+        previous = np.concatenate(([self.last_time if self.last_time is not None else times[0]], times[:-1])) \
+            if len(times) else times
+        breaks = np.flatnonzero(np.abs(times - previous) > self.restart_gap)
+
+        results = []
+        start = 0
+        for b in breaks:
+            if b > start:
+                results.append(self._segment(times[start:b], values[start:b], None if seqs is None else seqs[start:b]))
+            self.restart()
+            self.restarts += 1
+            start = b
+        results.append(self._segment(times[start:], values[start:], None if seqs is None else seqs[start:]))
+
+        if len(results) == 1:
+            return results[0]
+        return tuple(np.concatenate(parts) for parts in zip(*results))
+
+    def _segment(self, times, values, seqs):
+        # late or duplicate frames would make the interpolation intervals negative
+        floor = -np.inf if self.last_time is None else self.last_time
+        keep = times > np.maximum.accumulate(np.concatenate(([floor], times[:-1])))
+        self.dropped += int(len(times) - np.count_nonzero(keep))
+        if not keep.all():
+            times, values = times[keep], values[keep]
+            seqs = None if seqs is None else seqs[keep]
+        if not len(times):
+            return self._empty(values)
+
+        if self.last_time is not None:
+            times = np.concatenate(([self.last_time], times))
+            values = np.concatenate((self.last_value[None], values))
+            if seqs is not None and self.last_seq is not None:
+                seqs = np.concatenate(([self.last_seq], seqs))
+            else:
+                seqs = None
+        if self.origin is None:
+            self.origin = times[0]
+            self.next_index = 0
+
+        self.last_time = times[-1]
+        self.last_value = values[-1].copy()
+        self.last_seq = None if seqs is None else seqs[-1]
+
+        # grid indices are absolute, origin + k * period does not accumulate rounding over a long capture
+        last_index = int(np.floor((times[-1] - self.origin) / self.period + 1e-9))
+        count = last_index - self.next_index + 1
+        if count <= 0:
+            return self._empty(values)
+        grid = self.origin + (self.next_index + np.arange(count)) * self.period
+        self.next_index += count
+
+        lo = np.clip(np.searchsorted(times, grid, side="right") - 1, 0, max(len(times) - 2, 0))
+        hi = np.minimum(lo + 1, len(times) - 1)
+        span = times[hi] - times[lo]
+        weight = np.clip((grid - times[lo]) / np.where(span > 0, span, 1.0), 0.0, 1.0)
+
+        if self.method == "nearest":
+            grid_values = values[np.where(weight < 0.5, lo, hi)]
+        else:
+            shape = (-1,) + (1,) * (values.ndim - 1)
+            weight = weight.astype(values.real.dtype if np.issubdtype(values.dtype, np.inexact) else np.float64)
+            grid_values = values[lo] + (values[hi] - values[lo]) * weight.reshape(shape)
+
+        filled = span > self.max_gap
+        if seqs is not None:
+            filled |= (seqs[hi] - seqs[lo]) % self.seq_modulo > 1
+
+        self.produced += count
+        self.filled += int(np.count_nonzero(filled))
+        return grid, grid_values, filled
+
+    def _empty(self, values):
+        return np.empty(0), np.empty((0,) + values.shape[1:], dtype=values.dtype), np.empty(0, dtype=bool)
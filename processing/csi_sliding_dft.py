@@ -0,0 +1,75 @@
+# processing/csi_sliding_dft.py
+# bank of sliding DFT filters at arbitrary frequencies, used by the breathing processor (csi_breathing_processor.py)
+# each bin keeps S(n) = sum over the last window samples of x(i) * exp(-j w i), with absolute sample indices:
+# a new sample adds x(n) * exp(-j w n) and removes x(n - W) * exp(-j w (n - W)), O(bins) per sample, a batch is
+# two [samples, bins] products, no FFT over the window
+# the twiddles come from the absolute index instead of a recursive rotation, so no pole sits on the unit circle,
+# rounding of the running sums is flushed by an exact recomputation once per window (O(bins) amortized)
+# the window mean is removed analytically: its leakage mean * sum(exp(-j w i)) is subtracted from every bin
+
+import numpy as np
+
+
+class SlidingDFT:
+    def __init__(self, frequencies, rate, window):
+        self.frequencies = np.asarray(frequencies, dtype=np.float64)
+        self.omega = 2 * np.pi * self.frequencies / rate
+        self.window = int(window)
+        self.outgoing = np.exp(1j * self.omega * self.window)    # exp(-j w (n - W)) = exp(-j w n) * outgoing
+        self.reset()
+
+    def reset(self):
+        self.samples = np.zeros(self.window)        # ring of the last window samples, zeros before the first ones
+        self.count = 0                              # samples seen since the reset
+        self.sums = np.zeros(len(self.omega), dtype=np.complex128)
+        self.total = 0.0
+        self.since_refresh = 0
+
+    def update(self, x: np.ndarray):
+        x = np.asarray(x, dtype=np.float64)
+        pos = 0
+        # chunks no longer than the window, the samples they push out are still in the ring
+        while pos < len(x):
+            chunk = x[pos:pos + self.window]
+            n = np.arange(self.count, self.count + len(chunk))
+            slots = n % self.window
+            old = self.samples[slots]
+            twiddles = np.exp(-1j * np.outer(n, self.omega))
+            self.sums += chunk @ twiddles - self.outgoing * (old @ twiddles)
+            self.total += chunk.sum() - old.sum()
+            self.samples[slots] = chunk
+            self.count += len(chunk)
+            self.since_refresh += len(chunk)
+            pos += len(chunk)
+
+        if self.since_refresh >= self.window:
+            self._refresh()
+
+    def ready(self) -> bool:
+        return self.count >= self.window
+
+    def power(self) -> np.ndarray:
+        # [bins] power of the mean-free window, normalized by the window length
+        length = min(self.count, self.window)
+        if not length:
+            return np.zeros(len(self.omega))
+        first = self.count - length
+        leak = np.exp(-1j * self.omega * first) * self._geometric(length)
+        spectrum = self.sums - (self.total / length) * leak
+        return np.abs(spectrum) ** 2 / length
+
+    def _geometric(self, length):
+        # sum of exp(-j w i) for i in [0, length), w = 0 handled by its limit
+        ratio = np.exp(-1j * self.omega)
+        result = np.full(len(self.omega), float(length), dtype=np.complex128)
+        regular = np.abs(1 - ratio) > 1e-12
+        result[regular] = (1 - ratio[regular] ** length) / (1 - ratio[regular])
+        return result
+
+    def _refresh(self):
+        length = min(self.count, self.window)
+        n = np.arange(self.count - length, self.count)
+        window = self.samples[n % self.window]
+        self.sums = window @ np.exp(-1j * np.outer(n, self.omega))
+        self.total = float(window.sum())
+        self.since_refresh = 0
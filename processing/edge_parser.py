@@ -0,0 +1,121 @@
+# processing/edge_parser.py
+# parser for results of the RPi4 edge runtime (see nexmon_rpi/csi_edge.py)
+# the RPi already ran magnitude extraction, moving average and threshold detection
+# value records go straight to the chart through fft_data, motion start events to threshold_exceeded
+# edge cost and counters are published to metrics, nothing is stored in the circular buffer
+# with a ClockSync, the capture times stamped by the sniffer are mapped to the laptop clock
+
+import struct
+from collections import deque
+from processing.csi_parser import CSIParser
+
+
+class EdgeParser(CSIParser):
+    EDGE_MAGIC = b"CE"
+    EDGE_VERSION = 1
+    EDGE_HEADER = struct.Struct("<2sBBI")
+    VALUE_RECORD = struct.Struct("<df")
+    EVENT_RECORD = struct.Struct("<Bdf")
+    STATS_RECORD = struct.Struct("<IIff")
+
+    KIND_VALUES = 1
+    KIND_EVENT = 2
+    KIND_STATS = 3
+
+    def __init__(self, signals, logger, buffer, mutex, stop_event, profiler=None, metrics=None, clock=None):
+        super().__init__()
+        self.clock = clock
+        self.signals = signals
+        self.logger = logger
+        self.buffer = buffer
+        self.mutex = mutex
+        self.stop_event = stop_event
+        self.profiler = profiler
+        self.metrics = metrics
+
+        self.is_setup_complete = False
+        self.start_time = 0.0
+        self.internal_queue = deque()
+
+        self.signals.csi_data.connect(self.on_new_data)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            if self.profiler:
+                self.profiler.checkpoint("parser")
+            if self.internal_queue:
+                self.process_queued_data()
+            self.msleep(1)
+        if self.profiler:
+            self.profiler.finish("parser")
+
+    def on_new_data(self, data: bytes, timestamp: float) -> None:
+        if data[:2] == self.EDGE_MAGIC:
+            self.internal_queue.append(data)
+
+    def process_queued_data(self):
+        while self.internal_queue:
+            data = self.internal_queue.popleft()
+            try:
+                _, version, kind, _ = self.EDGE_HEADER.unpack_from(data, 0)
+                if version != self.EDGE_VERSION:
+                    if self.logger:
+                        self.logger.failure(__file__, f"<process_queued_data>: unsupported edge version {version}")
+                    continue
+                payload = memoryview(data)[self.EDGE_HEADER.size:]
+
+                if kind == self.KIND_VALUES:
+                    self._on_values(payload)
+                elif kind == self.KIND_EVENT:
+                    self._on_event(payload)
+                elif kind == self.KIND_STATS:
+                    self._on_stats(payload)
+
+            except Exception as e:
+                if self.logger:
+                    self.logger.failure(__file__, f"<process_queued_data>: failed to process edge record - {e}")
+
+    def _on_values(self, payload):
+        for capture_time, value in self.VALUE_RECORD.iter_unpack(payload):
+            if self.clock:
+                capture_time = self.clock.to_local(capture_time)
+            if not self.is_setup_complete:
+                self.start_time = capture_time
+                self.is_setup_complete = True
+            self.signals.fft_data.emit({
+                'time': capture_time - self.start_time,
+                'magnitude': float(value)
+            })
+
+    def _on_event(self, payload):
+        state, capture_time, value = self.EVENT_RECORD.unpack_from(payload, 0)
+        if self.clock:
+            capture_time = self.clock.to_local(capture_time)
+        if not self.is_setup_complete:
+            # the laptop may start in the middle of an episode, before the first value datagram
+            self.start_time = capture_time
+            self.is_setup_complete = True
+        if state == 1:
+            relative_time = capture_time - self.start_time
+            self.signals.threshold_exceeded.emit(f"value={value:.2f}, time={relative_time:.2f}s (edge)")
+
+    def _on_stats(self, payload):
+        frames, events, mean_us, max_us = self.STATS_RECORD.unpack_from(payload, 0)
+        if self.metrics:
+            self.metrics.update({
+                "edge.frames": frames,
+                "edge.events": events,
+                "edge.cost_us": round(mean_us, 1),
+                "edge.cost_max_us": round(max_us, 1),
+            })
+
+    def reset(self):
+        self.internal_queue.clear()
+        self.start_time = 0.0
+        self.is_setup_complete = False
+
+    def is_valid_subcarrier(self, subcarrier: int) -> bool:
+        return False
+
+    def is_valid_antenna(self, antenna: int) -> bool:
+        return antenna == 0
@@ -0,0 +1,134 @@
+# processing/rpi4_codec_parser.py
+# parser for BCM43455c0 chipset (Raspberry Pi 4) with compact codec frames (see nexmon_rpi/csi_codec.py)
+# variant of RPI4Parser used when the forwarder runs with --codec
+# drains the whole internal queue at once, headers are unpacked per frame and the int16 payloads
+# are dequantized and delta accumulated as one [N, subcarriers] NumPy block
+# delta frames whose reference frame was lost are dropped until the next keyframe
+# stores raw CSI data in shared circular buffer with the same packet format as RPI4Parser
+
+import struct
+import zlib
+import numpy as np
+from processing.rpi4_parser import RPI4Parser
+
+
+class RPI4CodecParser(RPI4Parser):
+    CODEC_MAGIC = b"CZ"
+    CODEC_VERSION = 1
+    CODEC_HEADER = struct.Struct("<2sBBIIQhHHHHf")
+    FLAG_DELTA = 0x01
+    FLAG_ZLIB = 0x02
+    SUBCARRIERS = 256
+
+    def __init__(self, signals, logger, buffer, mutex, stop_event, profiler=None):
+        super().__init__(signals, logger, buffer, mutex, stop_event, profiler)
+        self.last_index = None
+        self.reference = None
+        self.dropped_frames = 0
+        self.null_mask = np.zeros(self.SUBCARRIERS, dtype=bool)
+        self.null_mask[self.NULL_SUBCARRIERS_256] = True
+
+    def process_queued_data(self):
+        frames = []
+        while self.internal_queue:
+            frames.append(self.internal_queue.popleft())
+        if not frames:
+            return
+        try:
+            self.decode_frames(frames)
+        except Exception as e:
+            if self.logger:
+                self.logger.failure(__file__, f"<process_queued_data>: failed to decode {len(frames)} frames - {e}")
+
+    def decode_frames(self, frames):
+        header_size = self.CODEC_HEADER.size
+        rows = []
+        scales = []
+        deltas = []
+        stamps = []
+        selection = None
+
+        for data, timestamp in frames:
+            if len(data) < header_size or data[:2] != self.CODEC_MAGIC:
+                if self.logger:
+                    self.logger.failure(__file__, f"<decode_frames>: not a codec frame ({len(data)} bytes)")
+                continue
+
+            (_, version, flags, index, reference_index, source_mac, rssi, _fctl,
+             seq_num, first, count, scale) = self.CODEC_HEADER.unpack_from(data, 0)
+            if version != self.CODEC_VERSION:
+                if self.logger:
+                    self.logger.failure(__file__, f"<decode_frames>: unsupported codec version {version}")
+                continue
+
+            is_delta = bool(flags & self.FLAG_DELTA)
+            if is_delta and reference_index != self.last_index:
+                # reference lost, wait for the next keyframe
+                self.dropped_frames += 1
+                self.last_index = None
+                continue
+            if selection is not None and selection != (first, count):
+                self._store(rows, scales, deltas, stamps, selection)
+                rows, scales, deltas, stamps = [], [], [], []
+            selection = (first, count)
+
+            payload = data[header_size:]
+            if flags & self.FLAG_ZLIB:
+                payload = zlib.decompress(payload)
+            rows.append(payload)
+            scales.append(scale)
+            deltas.append(is_delta)
+            stamps.append((timestamp, seq_num >> 4))
+            self.last_index = index
+
+            self.packet_count += 1
+            if self.logger and self.packet_count % 1000 == 0:
+                mac_addr = ':'.join(['{}{}'.format(a, b) for a, b in zip(*[iter('{:012x}'.format(source_mac))]*2)])
+                self.logger.success(__file__, f"<parse>: seq={seq_num}, MAC={mac_addr}, RSSI={rssi}, dropped={self.dropped_frames}")
+
+        if rows:
+            self._store(rows, scales, deltas, stamps, selection)
+
+    def _store(self, rows, scales, deltas, stamps, selection):
+        first, count = selection
+        quantized = np.frombuffer(b"".join(rows), dtype=np.int16).reshape(len(rows), 2 * count)
+        values = (quantized[:, 0::2] + 1j * quantized[:, 1::2]).astype(np.complex64)
+        values *= np.asarray(scales, dtype=np.float32)[:, None]
+
+        # a delta row adds to the row before it, so each keyframe-led run is a cumulative sum
+        deltas = np.asarray(deltas, dtype=bool)
+        if deltas[0]:
+            if self.reference is None or self.reference.shape[0] != count:
+                leading = int(np.argmax(~deltas)) if not deltas.all() else len(deltas)
+                self.dropped_frames += leading
+                values = values[leading:]
+                deltas = deltas[leading:]
+                stamps = stamps[leading:]
+                if not len(values):
+                    return
+            else:
+                values[0] += self.reference
+        run_id = np.cumsum(~deltas)
+        for run in np.unique(run_id):
+            members = run_id == run
+            values[members] = np.cumsum(values[members], axis=0)
+        self.reference = values[-1].copy()
+
+        csi = np.zeros((len(values), self.SUBCARRIERS), dtype=np.complex64)
+        csi[:, first:first + count] = values
+        csi[:, self.null_mask] = 0
+
+        for row, (timestamp, seq) in zip(csi, stamps):
+            csi_packet = {
+                'antenna': 0,
+                'timestamp': timestamp - self.start_time,
+                'seq': seq,
+                'raw_csi': row.tobytes()
+            }
+            self.buffer.put(csi_packet, self.mutex)
+
+    def reset(self):
+        super().reset()
+        self.last_index = None
+        self.reference = None
+        self.dropped_frames = 0
@@ -2,6 +2,7 @@
 # parser for BCM43455c0 chipset (Raspberry Pi 4) with protobuf data
 # receives csi_data signal with protobuf-encoded CSI packets from port 4400
 # parses protobuf format using csi_pb2.NexmonData
+# packets carry the 802.11 sequence number, seq_num is the sequence control field (low 4 bits: fragment)
 # stores raw CSI data in shared circular buffer for downstream processing
 
 import numpy as np
@@ -13,13 +14,14 @@ import proto.csi_pb2 as csi_pb2
 class RPI4Parser(CSIParser):
     NULL_SUBCARRIERS_256 = [0, 1, 2, 3, 4, 5, 127, 128, 129, 130, 131, 251, 252, 253, 254, 255]
     
-    def __init__(self, signals, logger, buffer, mutex, stop_event):
+    def __init__(self, signals, logger, buffer, mutex, stop_event, profiler=None):
         super().__init__()
         self.signals = signals
         self.logger = logger
         self.buffer = buffer
         self.mutex = mutex
         self.stop_event = stop_event
+        self.profiler = profiler
         
         self.is_setup_complete = False
         self.internal_queue = deque()
@@ -29,9 +31,13 @@ class RPI4Parser(CSIParser):
 
     def run(self):
         while not self.stop_event.is_set():
+            if self.profiler:
+                self.profiler.checkpoint("parser")
             if self.internal_queue:
                 self.process_queued_data()
             self.msleep(1)
+        if self.profiler:
+            self.profiler.finish("parser")
 
     def on_new_data(self, data: bytes, timestamp: float) -> None:
         try:
@@ -113,6 +119,7 @@ class RPI4Parser(CSIParser):
             csi_packet = {
                 'antenna': antenna_id,
                 'timestamp': relative_time,
+                'seq': nexmon_data.seq_num >> 4,
                 'raw_csi': raw_csi
             }
             
@@ -1,73 +1,166 @@
 # remote/laptop_ping.py
-# pings AP at given frequency
+# generates probe traffic towards the AP at PING_RATE_HZ so the sniffers see a steady CSI frame rate
+# ICMP echo requests on an unprivileged ICMP datagram socket, small UDP datagrams when the kernel refuses it
+# drift-free scheduler: probe n is due at start + n / rate, the thread sleeps until PING_BUSY_WAIT_US
+# before the deadline and spins only for the rest, slots missed after a stall are skipped, not bursted
+# replies are drained without blocking, achieved rate, send jitter and lateness go to metrics once per second
 
+import socket
+import struct
 import time
-import subprocess
+import numpy as np
 from PyQt5.QtCore import QThread
 import config.settings as Settings
 
 
 class LaptopPing(QThread):
-    def __init__(self, logger, stop_event):
+    ICMP_ECHO_REQUEST = struct.Struct("!BBHHH")
+
+    def __init__(self, logger, stop_event, profiler=None, metrics=None):
         super().__init__()
         self.logger = logger
         self.stop_event = stop_event
+        self.profiler = profiler
+        self.metrics = metrics
         self.ping_active = False
-        self.ping_frequency = Settings.PING_FREQUENCY
+        self.ping_rate = Settings.PING_RATE_HZ
         self.router_ip = Settings.Router_IP
-    
+
+        self.sock = None
+        self.mode = None
+        self.sent = 0
+        self.replies = 0
+        self.missed = 0
+        self.send_errors = 0
+        self.send_times = []
+        self.lateness = []
+
     def start_ping(self):
         if not self.ping_active:
             self.ping_active = True
             if self.logger:
-                self.logger.success(__file__, f"<start_ping>: Ping started to {self.router_ip}")
-    
+                self.logger.success(__file__, f"<start_ping>: Ping started to {self.router_ip} at {self.ping_rate} Hz")
+
     def stop_ping(self):
         if self.ping_active:
             self.ping_active = False
             if self.logger:
-                self.logger.success(__file__, f"<stop_ping>: Ping stopped to {self.router_ip}")
-    
+                self.logger.success(__file__, f"<stop_ping>: Ping stopped to {self.router_ip} "
+                                              f"({self.sent} sent, {self.replies} replies, {self.missed} slots missed)")
+
     def toggle_ping(self):
         if self.ping_active:
             self.stop_ping()
         else:
             self.start_ping()
-    
+
     def run(self):
         while not self.stop_event.is_set():
+            if self.profiler:
+                self.profiler.checkpoint("laptop_ping")
             if self.ping_active:
-                self._perform_ping()
-                time.sleep(1.0 / self.ping_frequency)
+                self._generate()
             else:
                 time.sleep(0.1)
-    
-    def _perform_ping(self):
+        self._close_socket()
+        if self.profiler:
+            self.profiler.finish("laptop_ping")
+
+    def _open_socket(self):
         try:
-            result = subprocess.run(
-                ['ping', '-c', '1', '-W', '2', self.router_ip],
-                capture_output=True,
-                text=True,
-                timeout=3
-            )
-            
-            if result.returncode == 0:
-                output = result.stdout
-                if "time=" in output:
-                    time_part = output.split("time=")[1].split(" ")[0]
-                else:
-                    if self.logger:
-                        self.logger.failure(__file__, f"<_perform_ping>: Ping successful but no time found")
-            else:
-                if self.logger:
-                    self.logger.failure(__file__, f"<_perform_ping>: Ping failed to {self.router_ip}")
-                    
-        except subprocess.TimeoutExpired:
-            if self.logger:
-                self.logger.failure(__file__, f"<_perform_ping>: Ping timeout to {self.router_ip}")
-        except Exception as e:
-            if self.logger:
-                self.logger.failure(__file__, f"<_perform_ping>: {str(e)}")
-    
+            # unprivileged ping socket (net.ipv4.ping_group_range), the kernel sets id and checksum
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+            self.mode = "icmp"
+        except OSError:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.mode = "udp"
+        self.sock.setblocking(False)
+        if self.logger:
+            self.logger.info(__file__, f"<_open_socket>: probing {self.router_ip} with {self.mode} frames")
+
+    def _close_socket(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+    def _generate(self):
+        if self.sock is None:
+            self._open_socket()
+
+        period = 1.0 / self.ping_rate
+        busy_wait = Settings.PING_BUSY_WAIT_US * 1e-6
+        payload = bytes(Settings.PING_PAYLOAD_SIZE)
+        address = (self.router_ip, 0 if self.mode == "icmp" else Settings.PING_UDP_PORT)
+
+        start = time.perf_counter()
+        slot = 0
+        last_report = start
+        while self.ping_active and not self.stop_event.is_set():
+            deadline = start + slot * period
+            remaining = deadline - time.perf_counter()
+            if remaining > busy_wait:
+                time.sleep(remaining - busy_wait)
+            while time.perf_counter() < deadline:
+                pass
+
+            now = time.perf_counter()
+            self._send(payload, address, slot)
+            self.send_times.append(now)
+            self.lateness.append(now - deadline)
+            self._drain_replies()
+
+            slot += 1
+            behind = int((now - deadline) / period)
+            if behind:
+                # stalled (GC, scheduler), skip the missed slots instead of bursting them
+                slot += behind
+                self.missed += behind
+
+            if now - last_report >= 1.0:
+                self._report(now - last_report)
+                last_report = now
+                if self.profiler:
+                    self.profiler.checkpoint("laptop_ping")
+
+    def _send(self, payload, address, slot):
+        if self.mode == "icmp":
+            packet = self.ICMP_ECHO_REQUEST.pack(8, 0, 0, 0, slot & 0xFFFF) + payload
+        else:
+            packet = payload
+        try:
+            self.sock.sendto(packet, address)
+            self.sent += 1
+        except (BlockingIOError, OSError):
+            self.send_errors += 1
+
+    def _drain_replies(self):
+        while True:
+            try:
+                self.sock.recv(2048)
+                self.replies += 1
+            except (BlockingIOError, OSError):
+                return
+
+    def _report(self, elapsed):
+        if len(self.send_times) > 1:
+            intervals = np.diff(self.send_times)
+            rate = len(intervals) / elapsed
+            jitter_us = 1e6 * float(np.std(intervals))
+            late_max_us = 1e6 * float(np.max(self.lateness))
+        else:
+            rate = jitter_us = late_max_us = 0.0
+        self.send_times = self.send_times[-1:]
+        self.lateness.clear()
+
+        if self.metrics:
+            self.metrics.update({
+                "ping.rate_hz": round(rate, 1),
+                "ping.jitter_us": round(jitter_us, 1),
+                "ping.late_max_us": round(late_max_us, 1),
+                "ping.missed": self.missed,
+                "ping.replies": self.replies,
+                "ping.errors": self.send_errors,
+            })
+
     def is_ping_active(self):
-        return self.ping_active
\ No newline at end of file
+        return self.ping_active
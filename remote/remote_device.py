@@ -1,9 +1,14 @@
 # remote/remote_device.py
 # Abstract base class for remote devices controlling CSI collection
+# UI signals call request("action"), the action runs on the device SSHExecutor and not in the GUI thread
+# disconnect_sniffer cancels queued and running actions before it is queued itself: queued ones are dropped,
+# a running one has the SSH command it is waiting on closed and fails
 
+import threading
 from PyQt5.QtCore import QThread
 from abc import ABC, abstractmethod
 from remote.ssh_manager import SSHManager
+from remote.ssh_executor import SSHExecutor
 
 class RemoteDevice(QThread):
     def __init__(self, ip, username, stop_event, password=None, keyfile=None, logger=None):
@@ -15,8 +20,24 @@ class RemoteDevice(QThread):
         self.logger = logger
         self.stop_event = stop_event
         self.ssh = SSHManager(ip, username, password, keyfile, logger)
+        self.executor = SSHExecutor(logger, name=f"ssh-{ip}")
         self.connected = False
 
+    def request(self, action):
+        if action == "disconnect_sniffer":
+            self.executor.cancel_all()
+        cancel_event = threading.Event()
+        return self.executor.submit(self._run_action, getattr(self, action), cancel_event,
+                                    name=action, cancel_event=cancel_event)
+
+    def _run_action(self, action, cancel_event):
+        # the commands the action runs on this worker watch its cancel_event
+        self.ssh.bind_cancel(cancel_event)
+        try:
+            return action()
+        finally:
+            self.ssh.bind_cancel(None)
+
     def connect_sniffer(self):
         self.connected = self.ssh.connect()
         if not self.connected and self.logger:
@@ -45,5 +66,8 @@ class RemoteDevice(QThread):
         if self.logger:
             self.logger.success(__file__, "<disconnect_sniffer>: SSH session closed")
 
+    def shutdown(self):
+        self.executor.shutdown()
+
     def run(self):
         pass
@@ -1,25 +1,39 @@
 # remote/router_device.py
 # router device implementation for CSI collection control
+# save_data pulls the pcaps of /tmp/stream over the SSH session (exec backend, gzip on the fly)
+# with ROUTER_LIVE set, start_stream runs tcpdump -U -w - instead of writing /tmp/stream:
+# "ssh" mode hands the exec channel to on_stream (CSIStreamReceiver.attach), "tcp" mode pipes it into nc
 
+import os
 from remote.remote_device import RemoteDevice
+from remote.sftp_transfer import SFTPTransfer
 import config.settings as Settings
 
 class RouterDevice(RemoteDevice):
-    def __init__(self, stop_event, logger):
+    LIVE_CAPTURE_CMD = "tcpdump -i eth6 -U -s 0 -w - udp port 4400"
+
+    def __init__(self, stop_event, logger, on_stream=None, config=None):
+        # config: one entry of Settings.SNIFFERS, the Router_* macros otherwise
+        config = config or {}
         super().__init__(
-            ip=Settings.ROUTER_IP,
-            username=Settings.ROUTER_ID,
+            ip=config.get("ip", Settings.Router_IP),
+            username=config.get("username", Settings.Router_ID),
             stop_event=stop_event,
-            password=Settings.ROUTER_PASSWORD,
+            password=config.get("password", Settings.Router_PASSWORD),
             logger=logger
         )
+        self.port = config.get("port", Settings.ROUTER_LIVE_PORT)
+        self.laptop_ip = config.get("laptop_ip", Settings.Laptop_IP)
+        self.stream_dir = os.path.join("./stream", config["name"]) if "name" in config else "./stream/"
         self.nexutil_running = False
+        self.on_stream = on_stream
+        self.live_channel = None
     
     def connect_sniffer(self):
         try:
             result = super().connect_sniffer()
             if result and self.logger:
-                self.logger.success(__file__, f"<connect_sniffer>: connected to Router at {Settings.ROUTER_IP}")
+                self.logger.success(__file__, f"<connect_sniffer>: connected to Router at {self.ip}")
             return result
         except Exception as e:
             if self.logger:
@@ -70,12 +84,16 @@ class RouterDevice(RemoteDevice):
                     self.logger.failure(__file__, f"<start_stream>: nexutil failed - {stderr}")
                 return False
             
-            stdout, stderr = self.ssh.exec("cd /jffs && source ./setup_env && source ./start_stream")
-            
-            if "SUCCESS:" not in stdout:
-                if self.logger:
-                    self.logger.failure(__file__, f"<start_stream>: {stdout}{stderr}")
-                return False
+            if Settings.ROUTER_LIVE:
+                if not self._start_live_capture():
+                    return False
+            else:
+                stdout, stderr = self.ssh.exec("cd /jffs && source ./setup_env && source ./start_stream")
+                
+                if "SUCCESS:" not in stdout:
+                    if self.logger:
+                        self.logger.failure(__file__, f"<start_stream>: {stdout}{stderr}")
+                    return False
             
             self.stream_active = True
             self.nexutil_running = True
@@ -95,7 +113,10 @@ class RouterDevice(RemoteDevice):
             return False
         
         try:
-            stdout, stderr = self.ssh.exec("cd /jffs && source ./setup_env && source ./stop_stream")
+            if self.live_channel is not None:
+                self._stop_live_capture()
+            else:
+                stdout, stderr = self.ssh.exec("cd /jffs && source ./setup_env && source ./stop_stream")
             
             self.ssh.exec("pkill -f nexutil")
             
@@ -110,34 +131,53 @@ class RouterDevice(RemoteDevice):
                 self.logger.failure(__file__, f"<stop_stream>: {str(e)}")
             return False
     
-    def save_data(self, laptop_ip=None, port=5000):
+    def save_data(self):
+        local_dir = self.stream_dir
         if not self.connected:
             if self.logger:
                 self.logger.failure(__file__, "<save_data>: not connected to Router")
             return False
         
         try:
-            if laptop_ip:
-                cmd = f"cd /jffs && source ./setup_env && source ./save_data {laptop_ip} {port}"
-            else:
-                cmd = "cd /jffs && source ./setup_env && source ./save_data"
-            
-            stdout, stderr = self.ssh.exec(cmd)
-            
-            if "SUCCESS:" in stdout or "INFO:" in stdout:
-                if self.logger:
-                    self.logger.success(__file__, f"<save_data>: {stdout.strip()}")
-                return True
-            else:
+            # dropbear on the router has no sftp server, files are streamed over exec channels
+            transfer = SFTPTransfer(self.ssh, self.logger, backend="exec", compress=Settings.ROUTER_TRANSFER_COMPRESS)
+            files = transfer.pull("/tmp/stream", "*.pcap", local_dir)
+            if not files:
                 if self.logger:
-                    self.logger.failure(__file__, f"<save_data>: {stdout}{stderr}")
+                    self.logger.failure(__file__, "<save_data>: no pcap transferred")
                 return False
             
+            if self.logger:
+                self.logger.success(__file__, f"<save_data>: {len(files)} pcaps saved to {local_dir}")
+            return True
+            
         except Exception as e:
             if self.logger:
                 self.logger.failure(__file__, f"<save_data>: {str(e)}")
             return False
     
+    def _start_live_capture(self):
+        # no pty: the pcap bytes must pass through the channel unmodified
+        channel = self.ssh.channel()
+        if Settings.ROUTER_LIVE_MODE == "tcp":
+            channel.exec_command(f"cd /jffs && {self.LIVE_CAPTURE_CMD} | nc {self.laptop_ip} {self.port}")
+        else:
+            channel.exec_command(f"cd /jffs && {self.LIVE_CAPTURE_CMD}")
+            if self.on_stream:
+                self.on_stream(channel)
+        self.live_channel = channel
+        if self.logger:
+            self.logger.success(__file__, f"<_start_live_capture>: live capture over {Settings.ROUTER_LIVE_MODE}")
+        return True
+
+    def _stop_live_capture(self):
+        if self.on_stream and Settings.ROUTER_LIVE_MODE == "ssh":
+            self.on_stream(None)
+        self.live_channel.close()
+        self.live_channel = None
+        # closing the channel ends tcpdump on its next write, pkill covers an idle capture and the nc pipe
+        self.ssh.exec("pkill tcpdump")
+
     def disconnect_sniffer(self):
         if not self.connected:
             if self.logger:
@@ -1,24 +1,35 @@
 # remote/rpi_device.py
 # RPi device implementation for CSI collection control
+# the forwarder (and edge runtime) run as processes on channels of the device SSH session
+# their health is read from the channel state, no second connection and no pgrep round trip
+# in edge mode slider changes are forwarded to the edge runtime, only the latest value is sent
 
 from remote.remote_device import RemoteDevice
-from remote.ssh_manager import SSHManager
-from PyQt5.QtCore import QTimer
+from remote.sftp_transfer import SFTPTransfer
+from PyQt5.QtCore import QTimer, QMetaObject, Qt, Q_ARG
 import config.settings as Settings
 from datetime import datetime
 import os
-import time
 
 class RPiDevice(RemoteDevice):
-    def __init__(self, stop_event, logger):
+    def __init__(self, stop_event, logger, config=None):
+        # config: one entry of Settings.SNIFFERS, the RPi_* macros otherwise
+        config = config or {}
         super().__init__(
-            ip=Settings.RPi_IP,
-            username=Settings.RPi_ID,
+            ip=config.get("ip", Settings.RPi_IP),
+            username=config.get("username", Settings.RPi_ID),
             stop_event=stop_event,
-            password=Settings.RPi_PASSWORD,
+            password=config.get("password", Settings.RPi_PASSWORD),
             logger=logger
         )
-        self.forward_ssh = None 
+        self.port = config.get("port", Settings.PORT)
+        self.laptop_ip = config.get("laptop_ip", Settings.Laptop_IP_FROM_RPi)
+        self.stream_dir = os.path.join("./stream", config["name"]) if "name" in config else "./stream/"
+        self.transport = config.get("transport", Settings.RPi_TRANSPORT)
+        self.mode = config.get("mode", Settings.RPi_MODE)
+        self.codec = config.get("codec", Settings.RPi_CODEC)
+        self.forward_process = None
+        self.edge_process = None
         self.forward_timer = QTimer()
         self.forward_timer.timeout.connect(self._check_forward_status)
         self.forward_timer.moveToThread(self)
@@ -28,12 +39,14 @@ class RPiDevice(RemoteDevice):
         self.setup_done = False
         self.current_save_dir = None
         self.current_experiment_name = None
+        self.threshold = Settings.THRESHOLD_VALUE
+        self.threshold_pending = False
     
     def connect_sniffer(self):
         try:
             result = super().connect_sniffer()
             if result and self.logger:
-                self.logger.success(__file__, f"<connect_sniffer>: connected to RPi at {Settings.RPi_IP}")
+                self.logger.success(__file__, f"<connect_sniffer>: connected to RPi at {self.ip}")
             return result
         except Exception as e:
             if self.logger:
@@ -47,7 +60,7 @@ class RPiDevice(RemoteDevice):
             return False
         
         try:
-            stdout, stderr = self.ssh.exec("sudo cspi apply")
+            stdout, stderr = self.ssh.exec("sudo cspi apply", on_output=self._log_remote_line)
             
             if stderr and "error" in stderr.lower():
                 if self.logger:
@@ -84,18 +97,6 @@ class RPiDevice(RemoteDevice):
                     self.logger.failure(__file__, f"<start_stream>: cspi start failed - {stderr}")
                 return False
             
-            self.forward_ssh = SSHManager(
-                Settings.RPi_IP, 
-                Settings.RPi_ID, 
-                Settings.RPi_PASSWORD, 
-                logger=self.logger
-            )
-            
-            if not self.forward_ssh.connect():
-                if self.logger:
-                    self.logger.failure(__file__, "<start_stream>: failed to create forward SSH connection")
-                return False
-            
             if self._start_csi_forwarder():
                 self.stream_active = True
                 if self.logger:
@@ -123,15 +124,16 @@ class RPiDevice(RemoteDevice):
             self.current_save_dir = "csi_captures"
             self.current_experiment_name = experiment_name
         
-            save_control_cmd = f"echo 'ENABLE_SAVE:{self.current_save_dir}:{experiment_name}' > /tmp/csi_control"
-            stdout, stderr = self.forward_ssh.exec(save_control_cmd)
-            
-            time.sleep(0.2)
+            reply = self._send_control(f"ENABLE_SAVE:{self.current_save_dir}:{experiment_name}")
+            if not reply.startswith("ACK"):
+                if self.logger:
+                    self.logger.failure(__file__, f"<start_save>: forwarder refused - {reply}")
+                return False
         
             self.save_enabled = True
         
             if self.logger:
-                self.logger.success(__file__, f"<start_save>: Saving enabled - {experiment_name}")
+                self.logger.success(__file__, f"<start_save>: Saving enabled - {reply[len('ACK ENABLE_SAVE '):]}")
             return True
         
         except Exception as e:
@@ -144,10 +146,11 @@ class RPiDevice(RemoteDevice):
             return True
         
         try:
-            save_control_cmd = "echo 'DISABLE_SAVE' > /tmp/csi_control"
-            stdout, stderr = self.forward_ssh.exec(save_control_cmd)
-            
-            time.sleep(0.2)
+            reply = self._send_control("DISABLE_SAVE")
+            if not reply.startswith("ACK"):
+                if self.logger:
+                    self.logger.failure(__file__, f"<stop_save>: forwarder refused - {reply}")
+                return False
         
             self.save_enabled = False
         
@@ -160,6 +163,35 @@ class RPiDevice(RemoteDevice):
                 self.logger.failure(__file__, f"<stop_save>: {str(e)}")
             return False
 
+    def update_threshold(self, value):
+        # slot of threshold_value (GUI thread), the slider emits on every step so pushes are coalesced
+        self.threshold = value
+        if self.mode != "edge" or self.threshold_pending:
+            return
+        self.threshold_pending = True
+        self.executor.submit(self._push_threshold, name="update_threshold")
+
+    def _push_threshold(self):
+        self.threshold_pending = False
+        if not (self.edge_process and self.forward_running):
+            return True
+        reply = self._send_control(f"THRESHOLD:{self._edge_threshold()}", Settings.RPi_EDGE_CONTROL_PORT)
+        if not reply.startswith("ACK"):
+            if self.logger:
+                self.logger.failure(__file__, f"<_push_threshold>: edge runtime refused - {reply}")
+            return False
+        return True
+
+    def _edge_threshold(self):
+        return "off" if self.threshold == Settings.THRESHOLD_DISABLED else float(self.threshold)
+
+    def _send_control(self, cmd, port=Settings.RPi_CONTROL_PORT):
+        # The forwarder answers on its local control socket, the reply doubles as the acknowledgement
+        # its --control client also talks to the edge runtime control socket
+        control_cmd = f"python3 csi_forwarder_tee.py --control-port {port} --control '{cmd}'"
+        stdout, stderr = self.ssh.exec(control_cmd)
+        return stdout.strip() or stderr.strip() or "ERR empty reply"
+
     def save_data(self):
         if self.save_enabled:
             success = self.stop_save()
@@ -205,24 +237,16 @@ class RPiDevice(RemoteDevice):
             return False
 
         try:
-            os.makedirs("./stream/", exist_ok=True)
-            
-            remote_path = f"{self.current_save_dir}/{self.current_experiment_name}_*.bin"
-            local_path = "./stream/"
-
-            scp_cmd = (
-                f"sshpass -p '{Settings.RPi_PASSWORD}' "
-                f"scp {Settings.RPi_ID}@{Settings.RPi_IP}:{remote_path} {local_path}"
-            )
-
-            result = os.system(scp_cmd)
-            if result != 0:
+            local_path = self.stream_dir
+            transfer = SFTPTransfer(self.ssh, self.logger)
+            files = transfer.pull(self.current_save_dir, f"{self.current_experiment_name}_*.bin", local_path)
+            if not files:
                 if self.logger:
-                    self.logger.failure(__file__, f"<transfer_data>: SCP failed with code {result}")
+                    self.logger.failure(__file__, "<transfer_data>: SFTP transfer failed")
                 return False
 
             if self.logger:
-                self.logger.success(__file__, f"<transfer_data>: file transferred to {local_path}")
+                self.logger.success(__file__, f"<transfer_data>: {len(files)} files transferred to {local_path}")
             return True
 
         except Exception as e:
@@ -263,14 +287,40 @@ class RPiDevice(RemoteDevice):
             if self.logger:
                 self.logger.success(__file__, "<_start_csi_forwarder>: starting csi_forwarder_tee.py")
             
-            forwarder_cmd = f"python3 csi_forwarder_tee.py {Settings.Laptop_IP_FROM_RPi} {Settings.PORT}"
+            forwarder_cmd = (
+                f"python3 csi_forwarder_tee.py {self.laptop_ip} {self.port} "
+                f"--control-port {Settings.RPi_CONTROL_PORT} --transport {self.transport} "
+                f"--sync-port {Settings.RPi_SYNC_PORT} "
+                f"--batch {Settings.RPi_BATCH_FRAMES} --batch-delay-ms {Settings.RPi_BATCH_DELAY_MS}"
+            )
+            if self.codec:
+                forwarder_cmd += f" --codec --codec-first {Settings.RPi_CODEC_FIRST} --codec-count {Settings.RPi_CODEC_COUNT}"
+                if Settings.RPi_CODEC_DELTA:
+                    forwarder_cmd += " --codec-delta"
+                if Settings.RPi_CODEC_ZLIB:
+                    forwarder_cmd += " --codec-zlib"
+            
+            if self.mode == "edge":
+                # processing runs on the RPi, the forwarder only records and tees to the edge runtime
+                forwarder_cmd += f" --edge-port {Settings.RPi_EDGE_PORT} --no-forward"
+                start, end = Settings.SUBCARRIER_RANGE
+                edge_cmd = (
+                    f"python3 csi_edge.py {self.laptop_ip} {self.port} "
+                    f"--listen-port {Settings.RPi_EDGE_PORT} --ma-window {Settings.MA_WINDOW} "
+                    f"--range {start}:{end} --threshold {self._edge_threshold()} "
+                    f"--control-port {Settings.RPi_EDGE_CONTROL_PORT}"
+                )
+                self.edge_process = self.ssh.start_process(edge_cmd)
+                if self.logger:
+                    self.logger.success(__file__, "<_start_csi_forwarder>: csi_edge.py started")
             
-            stdin, stdout, stderr = self.forward_ssh.client.exec_command(forwarder_cmd)
+            self.forward_process = self.ssh.start_process(forwarder_cmd)
             
             self.forward_running = True
             self.forward_process_started = True
             
-            self.forward_timer.start(2000)
+            # actions run on the SSH executor, the timer lives in the device thread
+            QMetaObject.invokeMethod(self.forward_timer, "start", Qt.QueuedConnection, Q_ARG(int, 2000))
             
             return True
                 
@@ -285,16 +335,17 @@ class RPiDevice(RemoteDevice):
             return
         
         try:
-            stdout, stderr = self.forward_ssh.exec("pgrep -f csi_forwarder_tee.py")
-            
-            if not stdout.strip():
+            if self.edge_process:
+                self.edge_process.poll()
+            if not self.forward_process.poll():
                 if self.logger:
-                    self.logger.failure(__file__, "<_check_forward_status>: csi_forwarder_tee.py process not found")
+                    last_line = self.forward_process.tail[-1] if self.forward_process.tail else ""
+                    self.logger.failure(__file__, f"<_check_forward_status>: csi_forwarder_tee.py exited "
+                                                  f"(status {self.forward_process.exit_status()}) {last_line}")
                 self.forward_running = False
                 self.forward_timer.stop()
-            else:
-                if self.logger:
-                    self.logger.success(__file__, "<_check_forward_status>: csi_forwarder_tee.py running normally")
+            elif self.logger:
+                self.logger.debug(__file__, "<_check_forward_status>: csi_forwarder_tee.py running normally")
                     
         except Exception as e:
             if self.logger:
@@ -302,24 +353,31 @@ class RPiDevice(RemoteDevice):
     
     def _stop_csi_forwarder(self):
         try:
-            self.forward_timer.stop()
+            QMetaObject.invokeMethod(self.forward_timer, "stop", Qt.QueuedConnection)
             self.forward_running = False
             
-            if self.forward_ssh and self.forward_process_started:
-                stdout, stderr = self.forward_ssh.exec("pkill -f csi_forwarder_tee.py")
+            if self.forward_process and self.forward_process_started:
+                # the pty delivers SIGINT, pkill only if the process ignored it
+                # the pattern is anchored on the streaming command line, --control clients must not match
+                if not self.forward_process.stop():
+                    self.ssh.exec(f"pkill -f '^python3 csi_forwarder_tee.py {self.laptop_ip} {self.port} '")
+                if self.edge_process and not self.edge_process.stop():
+                    self.ssh.exec(f"pkill -f '^python3 csi_edge.py {self.laptop_ip} {self.port} '")
                 
                 if self.logger:
                     self.logger.success(__file__, "<_stop_csi_forwarder>: csi_forwarder_tee.py stopped")
             
-            if self.forward_ssh:
-                self.forward_ssh.close()
-                self.forward_ssh = None
-            
+            self.forward_process = None
+            self.edge_process = None
             self.forward_process_started = False
             
         except Exception as e:
             if self.logger:
                 self.logger.failure(__file__, f"<_stop_csi_forwarder>: {str(e)}")
     
+    def _log_remote_line(self, line):
+        if line.strip() and self.logger:
+            self.logger.info(__file__, f"<rpi>: {line.strip()}")
+
     def run(self):
         self.exec_()
\ No newline at end of file
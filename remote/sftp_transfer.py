@@ -0,0 +1,178 @@
+# remote/sftp_transfer.py
+# pulls capture files from a remote device over the device SSH session (see ssh_manager.py)
+# several files are fetched at once, each worker on its own channel of the shared transport
+# sftp backend: pipelined reads (prefetch keeps many read requests in flight), resume from a local .part file
+# exec backend for devices without an sftp server (router busybox): cat, or gzip -1 when compress is set,
+# streamed over an exec channel, resume with tail -c
+# progress and throughput are logged once per second, the .part file is renamed when complete
+# reads stop at the listed size: a pcap still written by tcpdump grows during the transfer, the bytes appended
+# after the listing are left for the next pull
+
+import fnmatch
+import os
+import posixpath
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import paramiko
+from config.settings import SFTP_TRANSFER_WORKERS, SFTP_CHUNK_SIZE, SFTP_MAX_REQUESTS
+
+
+class SFTPTransfer:
+    def __init__(self, ssh, logger=None, backend="sftp", workers=SFTP_TRANSFER_WORKERS, compress=False):
+        self.ssh = ssh
+        self.logger = logger
+        self.backend = backend
+        self.workers = workers
+        self.compress = compress
+
+        self.lock = threading.Lock()
+        self.total_bytes = 0
+        self.done_bytes = 0
+        self.skipped_bytes = 0
+        self.last_report = 0.0
+        self.start_time = 0.0
+
+    def pull(self, remote_dir, pattern, local_dir):
+        os.makedirs(local_dir, exist_ok=True)
+        files = self._list(remote_dir, pattern)
+        if not files:
+            if self.logger:
+                self.logger.failure(__file__, f"<pull>: no file matching {remote_dir}/{pattern}")
+            return []
+
+        self.total_bytes = sum(size for _, size in files)
+        self.done_bytes = 0
+        self.skipped_bytes = 0
+        self.start_time = time.monotonic()
+        self.last_report = self.start_time
+        if self.logger:
+            self.logger.info(__file__, f"<pull>: fetching {len(files)} files, {self.total_bytes / 1e6:.1f} MB")
+
+        fetch = self._fetch_sftp if self.backend == "sftp" else self._fetch_exec
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(files)), thread_name_prefix="sftp") as pool:
+            futures = [pool.submit(fetch, path, size, os.path.join(local_dir, posixpath.basename(path)))
+                       for path, size in files]
+            results = []
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    if self.logger:
+                        self.logger.failure(__file__, f"<pull>: {e}")
+
+        elapsed = max(time.monotonic() - self.start_time, 1e-6)
+        fetched = self.done_bytes - self.skipped_bytes
+        if self.logger:
+            self.logger.success(__file__, f"<pull>: {len(results)}/{len(files)} files, "
+                                          f"{fetched / 1e6:.1f} MB in {elapsed:.1f}s "
+                                          f"({fetched / 1e6 / elapsed:.1f} MB/s)")
+        return results
+
+    def _list(self, remote_dir, pattern):
+        if self.backend == "sftp":
+            entries = self.ssh.sftp().listdir_attr(remote_dir)
+            return sorted((posixpath.join(remote_dir, e.filename), e.st_size)
+                          for e in entries if fnmatch.fnmatch(e.filename, pattern))
+
+        stdout, stderr, status = self.ssh.exec_status(
+            f'for f in {remote_dir}/{pattern}; do [ -f "$f" ] && echo "$(wc -c < "$f") $f"; done')
+        files = []
+        for line in stdout.splitlines():
+            size, _, path = line.strip().partition(" ")
+            if path:
+                files.append((path, int(size)))
+        return sorted(files)
+
+    def _fetch_sftp(self, remote_path, size, local_path):
+        part_path = local_path + ".part"
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if offset > size:
+            offset = 0
+        self._skip(offset)
+
+        # an sftp channel per worker, SFTPClient serializes the requests of one channel
+        sftp = paramiko.SFTPClient.from_transport(self.ssh.transport())
+        try:
+            with sftp.open(remote_path, "rb") as remote, open(part_path, "ab" if offset else "wb") as local:
+                remote.seek(offset)
+                try:
+                    remote.prefetch(size, max_concurrent_requests=SFTP_MAX_REQUESTS)
+                except TypeError:
+                    remote.prefetch(size)
+                remaining = size - offset
+                while remaining > 0:
+                    data = remote.read(min(SFTP_CHUNK_SIZE, remaining))
+                    if not data:
+                        break
+                    local.write(data)
+                    remaining -= len(data)
+                    self._progress(len(data))
+        finally:
+            sftp.close()
+
+        return self._finish(part_path, local_path, size)
+
+    def _fetch_exec(self, remote_path, size, local_path):
+        part_path = local_path + ".part"
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if offset > size:
+            offset = 0
+        self._skip(offset)
+
+        source = f"tail -c +{offset + 1} '{remote_path}'" if offset else f"cat '{remote_path}'"
+        source += f" | head -c {size - offset}"
+        if self.compress:
+            source += " | gzip -1 -c"
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if self.compress else None
+
+        channel = self.ssh.channel()
+        try:
+            channel.exec_command(source)
+            with open(part_path, "ab" if offset else "wb") as local:
+                while True:
+                    data = channel.recv(SFTP_CHUNK_SIZE)
+                    if not data:
+                        break
+                    if decompressor:
+                        data = decompressor.decompress(data)
+                    local.write(data)
+                    self._progress(len(data))
+                if decompressor:
+                    local.write(decompressor.flush())
+            status = channel.recv_exit_status()
+        finally:
+            channel.close()
+        if status != 0:
+            raise IOError(f"'{source}' exited with status {status}")
+
+        return self._finish(part_path, local_path, size)
+
+    def _finish(self, part_path, local_path, size):
+        received = os.path.getsize(part_path)
+        if received != size:
+            raise IOError(f"{os.path.basename(local_path)}: got {received} of {size} bytes, kept {part_path} for resume")
+        os.replace(part_path, local_path)
+        return local_path
+
+    def _skip(self, n):
+        # bytes already on disk from an interrupted transfer
+        with self.lock:
+            self.done_bytes += n
+            self.skipped_bytes += n
+
+    def _progress(self, n):
+        with self.lock:
+            self.done_bytes += n
+            now = time.monotonic()
+            if now - self.last_report < 1.0:
+                return
+            self.last_report = now
+            done = self.done_bytes
+            fetched = done - self.skipped_bytes
+        elapsed = max(now - self.start_time, 1e-6)
+        percent = 100.0 * done / self.total_bytes if self.total_bytes else 100.0
+        if self.logger:
+            self.logger.info(__file__, f"<pull>: {percent:.0f}% {done / 1e6:.1f}/{self.total_bytes / 1e6:.1f} MB "
+                                       f"({fetched / 1e6 / elapsed:.1f} MB/s)")
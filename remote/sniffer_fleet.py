@@ -0,0 +1,65 @@
+# remote/sniffer_fleet.py
+# runs the same control action on every sniffer at once
+# each device already owns an SSHExecutor, request() queues the action on all of them and returns
+# so connect/setup/start/stop cost one round trip of the slowest device instead of the sum
+# per-device status goes to metrics as "<name>.status", a summary is logged when every device answered
+
+import threading
+
+
+class SnifferFleet:
+    ACTION_STATES = {
+        "connect_sniffer": "connected",
+        "setup_sniffer": "ready",
+        "start_stream": "streaming",
+        "stop_stream": "stopped",
+        "save_data": "saved",
+        "disconnect_sniffer": "disconnected",
+    }
+
+    def __init__(self, devices, logger=None, metrics=None):
+        # devices: {name: RemoteDevice}
+        self.devices = devices
+        self.logger = logger
+        self.metrics = metrics
+        self.lock = threading.Lock()
+        for name in devices:
+            self._set_status(name, "idle")
+
+    def request(self, action):
+        results = {}
+        for name, device in self.devices.items():
+            self._set_status(name, f"{action}...")
+            future = device.request(action)
+            future.add_done_callback(lambda f, name=name: self._done(action, name, f, results))
+        return results
+
+    def _done(self, action, name, future, results):
+        if future.cancelled():
+            ok = False
+        else:
+            ok = future.exception() is None and bool(future.result())
+        self._set_status(name, self.ACTION_STATES.get(action, action) if ok else f"{action} failed")
+
+        with self.lock:
+            results[name] = ok
+            complete = len(results) == len(self.devices)
+        if complete and self.logger:
+            succeeded = sum(results.values())
+            message = f"<{action}>: {succeeded}/{len(results)} sniffers ok"
+            if succeeded == len(results):
+                self.logger.success(__file__, message)
+            else:
+                failed = ", ".join(n for n, r in results.items() if not r)
+                self.logger.failure(__file__, f"{message}, failed: {failed}")
+
+    def _set_status(self, name, status):
+        if self.metrics:
+            self.metrics.set(f"{name}.status", status)
+
+    def names(self):
+        return list(self.devices)
+
+    def shutdown(self):
+        for device in self.devices.values():
+            device.shutdown()
@@ -0,0 +1,74 @@
+# remote/ssh_executor.py
+# runs blocking SSH work (device actions, remote commands) on a worker pool so the GUI thread never waits
+# submit() and exec() return concurrent.futures.Future objects, an optional callback gets the result
+# exec() streams output lines through on_output while the command runs and honours a timeout
+# cancel() drops a queued task or closes the channel of a running command, cancel_all() does it for every task
+# instantiate one per remote device, shutdown() when the app exits
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import SSH_COMMAND_TIMEOUT, SSH_EXECUTOR_WORKERS
+
+
+class SSHExecutor:
+    def __init__(self, logger=None, max_workers=SSH_EXECUTOR_WORKERS, name="ssh"):
+        self.logger = logger
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self.pending = set()
+        self.lock = threading.Lock()
+
+    def submit(self, fn, *args, callback=None, name=None, cancel_event=None, **kwargs):
+        name = name or getattr(fn, "__name__", "task")
+        future = self.pool.submit(fn, *args, **kwargs)
+        future.cancel_event = cancel_event
+        with self.lock:
+            self.pending.add(future)
+        future.add_done_callback(lambda f: self._done(f, name, callback))
+        return future
+
+    def exec(self, ssh, cmd, timeout=SSH_COMMAND_TIMEOUT, on_output=None, callback=None):
+        # Future result is (stdout, stderr, exit_status)
+        cancel_event = threading.Event()
+        return self.submit(ssh.exec_status, cmd, timeout, on_output, cancel_event,
+                           callback=callback, name=cmd, cancel_event=cancel_event)
+
+    def cancel(self, future):
+        if future.cancel():
+            return True
+        if future.cancel_event is not None:
+            future.cancel_event.set()
+            return True
+        return False
+
+    def cancel_all(self):
+        with self.lock:
+            futures = list(self.pending)
+        cancelled = sum(1 for future in futures if self.cancel(future))
+        if cancelled and self.logger:
+            self.logger.info(__file__, f"<cancel_all>: cancelled {cancelled} pending SSH tasks")
+        return cancelled
+
+    def busy(self):
+        with self.lock:
+            return len(self.pending)
+
+    def shutdown(self):
+        self.cancel_all()
+        self.pool.shutdown(wait=False)
+
+    def _done(self, future, name, callback):
+        with self.lock:
+            self.pending.discard(future)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            if self.logger:
+                self.logger.failure(__file__, f"<{name}>: {error}")
+            return
+        if callback:
+            try:
+                callback(future.result())
+            except Exception as e:
+                if self.logger:
+                    self.logger.failure(__file__, f"<_done>: callback of {name} failed - {e}")
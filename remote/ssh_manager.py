@@ -2,8 +2,20 @@
 # SSH connection handler using Paramiko
 # encapsulates SSH setup, command execution and closing
 # supports both password and key-based authentication
+# one authenticated transport per device is kept alive (keepalive packets) and reused:
+# commands, long-running processes and sftp each open a cheap channel on it instead of a new connection
+# a dropped transport is re-established on next use, with exponential backoff between attempts
+# exec_status reads the channel incrementally: output can be streamed line by line through on_output,
+# a timeout or a cancel_event closes the channel instead of blocking on stdout.read()
+# bind_cancel() gives the commands of the calling thread a default cancel_event (the running device action)
 
+import select
+import threading
+import time
+from collections import deque
 import paramiko
+from config.settings import (SSH_CONNECT_TIMEOUT, SSH_COMMAND_TIMEOUT, SSH_KEEPALIVE_INTERVAL,
+                             SSH_RECONNECT_MAX_BACKOFF)
 
 class SSHManager:
     def __init__(self, ip, username, password=None, keyfile=None, logger=None):
@@ -12,33 +24,200 @@ class SSHManager:
         self.password = password
         self.keyfile = keyfile
         self.logger = logger
-        self.client = paramiko.SSHClient()
-        self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        self.client = None
+        self.sftp_client = None
+        self.lock = threading.Lock()
+        self.wanted = False
+        self.backoff = 0.5
+        self.next_attempt = 0.0
+        self.reconnects = 0
+        self.local = threading.local()
+
+    def bind_cancel(self, cancel_event):
+        self.local.cancel_event = cancel_event
 
     def connect(self):
+        with self.lock:
+            self.wanted = True
+            self.next_attempt = 0.0
+            return self._open()
+
+    def _open(self):
+        now = time.monotonic()
+        if now < self.next_attempt:
+            return False
+        self._drop()
         try:
+            client = paramiko.SSHClient()
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
             if self.keyfile:
-                self.client.connect(self.ip, username=self.username, key_filename=self.keyfile)
+                client.connect(self.ip, username=self.username, key_filename=self.keyfile,
+                               timeout=SSH_CONNECT_TIMEOUT)
             else:
-                self.client.connect(self.ip, username=self.username, password=self.password)
+                client.connect(self.ip, username=self.username, password=self.password,
+                               timeout=SSH_CONNECT_TIMEOUT)
+            client.get_transport().set_keepalive(SSH_KEEPALIVE_INTERVAL)
+            self.client = client
+            self.backoff = 0.5
             return True
         except Exception as e:
+            self.next_attempt = now + self.backoff
+            self.backoff = min(self.backoff * 2, SSH_RECONNECT_MAX_BACKOFF)
             if self.logger:
                 self.logger.failure(__file__, f"<connect>: {e}")
             return False
 
-    def exec(self, cmd):
+    def _drop(self):
+        if self.sftp_client:
+            try:
+                self.sftp_client.close()
+            except Exception:
+                pass
+            self.sftp_client = None
+        if self.client:
+            try:
+                self.client.close()
+            except Exception:
+                pass
+            self.client = None
+
+    def is_active(self):
+        transport = self.client.get_transport() if self.client else None
+        return transport is not None and transport.is_active()
+
+    def transport(self):
+        # Returns the live transport, reconnecting a dropped one while the device is wanted connected
+        with self.lock:
+            if self.is_active():
+                return self.client.get_transport()
+            if not self.wanted:
+                raise ConnectionError("SSH session not connected")
+            if self.client and self.logger:
+                self.logger.failure(__file__, f"<transport>: SSH session to {self.ip} lost, reconnecting")
+            if not self._open():
+                raise ConnectionError(f"SSH session to {self.ip} unavailable, retry in {self.backoff:.1f}s")
+            self.reconnects += 1
+            if self.logger:
+                self.logger.success(__file__, f"<transport>: SSH session to {self.ip} re-established")
+            return self.client.get_transport()
+
+    def channel(self):
+        return self.transport().open_session()
+
+    def exec(self, cmd, timeout=SSH_COMMAND_TIMEOUT, on_output=None, cancel_event=None):
+        stdout, stderr, _ = self.exec_status(cmd, timeout, on_output, cancel_event)
+        return stdout, stderr
+
+    def exec_status(self, cmd, timeout=SSH_COMMAND_TIMEOUT, on_output=None, cancel_event=None):
+        # Returns (stdout, stderr, exit_status), exit_status is -1 when the command did not complete
+        out, err = [], []
+        partial = {"out": "", "err": ""}
+        if cancel_event is None:
+            cancel_event = getattr(self.local, "cancel_event", None)
         try:
-            stdin, stdout, stderr = self.client.exec_command(cmd)
-            return stdout.read().decode(), stderr.read().decode()
+            channel = self.channel()
+            channel.exec_command(cmd)
+            deadline = time.monotonic() + timeout if timeout else None
+
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    channel.close()
+                    return "".join(out), "".join(err) + "cancelled", -1
+                if deadline is not None and time.monotonic() > deadline:
+                    channel.close()
+                    if self.logger:
+                        self.logger.failure(__file__, f"<exec_status>: '{cmd}' timed out after {timeout}s")
+                    return "".join(out), "".join(err) + f"timeout after {timeout}s", -1
+
+                select.select([channel], [], [], 0.1)
+                while channel.recv_ready():
+                    self._collect(channel.recv(32768), out, partial, "out", on_output)
+                while channel.recv_stderr_ready():
+                    self._collect(channel.recv_stderr(32768), err, partial, "err", on_output)
+                if channel.exit_status_ready() and not channel.recv_ready() and not channel.recv_stderr_ready():
+                    break
+
+            if on_output:
+                for key in ("out", "err"):
+                    if partial[key]:
+                        on_output(partial[key])
+            status = channel.recv_exit_status()
+            channel.close()
+            return "".join(out), "".join(err), status
         except Exception as e:
             if self.logger:
                 self.logger.failure(__file__, f"<exec>: {e}")
-            return "", str(e)
+            return "".join(out), str(e), -1
+
+    def _collect(self, data, chunks, partial, key, on_output):
+        text = data.decode(errors="replace")
+        chunks.append(text)
+        if on_output:
+            lines = (partial[key] + text).split("\n")
+            partial[key] = lines.pop()
+            for line in lines:
+                on_output(line)
+
+    def start_process(self, cmd):
+        # Long-running command on its own channel with a pty, so the process ends with the channel
+        channel = self.channel()
+        channel.get_pty()
+        channel.exec_command(cmd)
+        return RemoteProcess(channel, cmd)
+
+    def sftp(self):
+        with self.lock:
+            if self.sftp_client is not None and self.is_active():
+                return self.sftp_client
+        transport = self.transport()
+        with self.lock:
+            if self.sftp_client is None or self.sftp_client.get_channel().get_transport() is not transport:
+                self.sftp_client = paramiko.SFTPClient.from_transport(transport)
+            return self.sftp_client
 
     def close(self):
+        with self.lock:
+            self.wanted = False
+            try:
+                self._drop()
+            except Exception as e:
+                if self.logger:
+                    self.logger.failure(__file__, f"<close>: {e}")
+
+
+class RemoteProcess:
+    # Handle on a command started with SSHManager.start_process
+    # poll() drains the output (a full channel window would block the remote process) and reports liveness
+    # from the channel state, no pgrep round trip needed
+
+    def __init__(self, channel, cmd, tail_lines=50):
+        self.channel = channel
+        self.cmd = cmd
+        self.tail = deque(maxlen=tail_lines)
+        self.partial = ""
+
+    def poll(self):
+        while self.channel.recv_ready():
+            lines = (self.partial + self.channel.recv(32768).decode(errors="replace")).split("\n")
+            self.partial = lines.pop()
+            self.tail.extend(line.rstrip("\r") for line in lines)
+        return self.running()
+
+    def running(self):
+        return not self.channel.closed and not self.channel.exit_status_ready()
+
+    def exit_status(self):
+        return self.channel.recv_exit_status() if self.channel.exit_status_ready() else None
+
+    def stop(self, timeout=3.0):
+        # Ctrl-C through the pty gives the process its SIGINT cleanup (recording flush, socket close)
         try:
-            self.client.close()
-        except Exception as e:
-            if self.logger:
-                self.logger.failure(__file__, f"<close>: {e}")
\ No newline at end of file
+            if self.running():
+                self.channel.send(b"\x03")
+                deadline = time.monotonic() + timeout
+                while self.running() and time.monotonic() < deadline:
+                    self.poll()
+                    time.sleep(0.05)
+            return not self.running()
+        finally:
+            self.channel.close()